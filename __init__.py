@@ -2,7 +2,8 @@
 See: https://docs.python.org/3/library/time.html#time.strftime
 """
 
-from collections import namedtuple
+from array import array
+from collections import OrderedDict, namedtuple
 
 ###############################################################################
 # Constants
@@ -13,15 +14,23 @@ WEEKDAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday',
 
 ABBREVIATED_WEEKDAY_NAMES = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
 
-MONTH_NAMES = ('January', 'February', 'March', 'April', 'May', 'June', 'July'
+MONTH_NAMES = ('January', 'February', 'March', 'April', 'May', 'June', 'July',
                'August', 'September', 'October', 'November', 'December')
 
-ABBREVIATED_MONTH_NAMES = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul'
+ABBREVIATED_MONTH_NAMES = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul',
                            'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
 
 # January 1, 2000 was a saturday.
 JAN_1_2000_DAY_NUM = 5
 
+# January 1, 1970, the epoch, was a thursday.
+EPOCH_DAY_NUM = 3
+
+# The number of days between January 1 of the year 1 and the epoch.
+EPOCH_DAYS_BEFORE_YEAR = 719162
+
+SECONDS_PER_DAY = 86400
+
 ABBREV_MONTH_NUM_DAYS_PAIRS = (
     ('Jan', 31),
     ('Feb', 28),
@@ -37,6 +46,18 @@ ABBREV_MONTH_NUM_DAYS_PAIRS = (
     ('Dec', 31),
 )
 
+# The number of days in a common year preceding the first day of each month,
+# indexed by month number. Index 0 is 0 so that a month of 0 is treated like
+# January, and index 13 is the total number of days in the year.
+DAYS_BEFORE_MONTH = (
+    0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334, 365
+)
+
+# The number of days in a leap year preceding the first day of each month.
+LEAP_DAYS_BEFORE_MONTH = (
+    0, 0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335, 366
+)
+
 NOT_IMPLEMENTED = None
 
 class DIRECTIVES:
@@ -46,6 +67,7 @@ class DIRECTIVES:
     MONTH_NAME = 'B'
     LOCALE_DATETIME = 'c'
     DAY_OF_MONTH = 'd'
+    MICROSECOND = 'f'
     HOUR_24 = 'H'
     HOUR_12 = 'I'
     DAY_OF_YEAR = 'j'
@@ -64,6 +86,30 @@ class DIRECTIVES:
     TIME_ZONE = 'Z'
     PERCENT = '%'
 
+class ERRORS:
+    # Yield None for a string that fails to parse.
+    NONE = 'none'
+    # Yield nothing for a string that fails to parse.
+    SKIP = 'skip'
+    # Raise a ValueError for a string that fails to parse.
+    RAISE = 'raise'
+
+class FAILURES:
+    # A literal char doesn't match.
+    LITERAL_MISMATCH = 'literal_mismatch'
+    # A directive doesn't match, e.g. a non-digit in an integer.
+    DIRECTIVE_MISMATCH = 'directive_mismatch'
+    # An integer directive's value is out of range.
+    INTEGER_RANGE = 'integer_range'
+    # The input ends before the format does.
+    TRUNCATED_INPUT = 'truncated_input'
+    # The input continues after the format ends.
+    LEFTOVER_INPUT = 'leftover_input'
+    # The month and day, or day of year, aren't valid for the year.
+    INVALID_MONTH_DAY = 'invalid_month_day'
+    # A 'PM' pushes a 24-hour hour beyond 23.
+    HOUR_OVERFLOW = 'hour_overflow'
+
 class STRUCT_TIME:
     TM_YEAR = 'tm_year'
     TM_MON = 'tm_mon'
@@ -73,6 +119,8 @@ class STRUCT_TIME:
     TM_SEC = 'tm_sec'
     TM_WDAY = 'tm_wday'
     TM_YDAY = 'tm_yday'
+    TM_USEC = 'tm_usec'
+    TM_GMTOFF = 'tm_gmtoff'
 
 STRUCT_TIME_FIELDS = (
     'tm_year',
@@ -85,12 +133,107 @@ STRUCT_TIME_FIELDS = (
     'tm_yday'
 )
 
+# The fields of the struct_time_usec that's returned for a format that
+# includes microseconds.
+STRUCT_TIME_USEC_FIELDS = STRUCT_TIME_FIELDS + ('tm_usec',)
+
+# The fields of the struct_time_gmtoff that's returned for a format compiled
+# with utc=False, whose tm_gmtoff is the parsed UTC offset in seconds east of
+# UTC and whose other fields are the local time at that offset.
+STRUCT_TIME_GMTOFF_FIELDS = STRUCT_TIME_USEC_FIELDS + ('tm_gmtoff',)
+
+# Define the indices of the struct_time fields.
+TM_YEAR_I, TM_MON_I, TM_MDAY_I, TM_HOUR_I, TM_MIN_I, TM_SEC_I, TM_WDAY_I, \
+    TM_YDAY_I, TM_USEC_I, TM_GMTOFF_I = range(len(STRUCT_TIME_GMTOFF_FIELDS))
+
 ###############################################################################
 # Types
 ###############################################################################
 
 struct_time = namedtuple('struct_time', STRUCT_TIME_FIELDS)
 
+struct_time_usec = namedtuple('struct_time_usec', STRUCT_TIME_USEC_FIELDS)
+
+struct_time_gmtoff = namedtuple('struct_time_gmtoff',
+                                STRUCT_TIME_GMTOFF_FIELDS)
+
+class lazy_struct_time:
+    """A struct_time of a valid date, or a struct_time_usec or
+    struct_time_gmtoff if it's constructed with their extra fields, whose
+    tm_wday and tm_yday are derived from its date when either is first read,
+    ignoring the values it's constructed with.
+    It supports the same attribute access, indexing, unpacking and equality,
+    including with struct_time and plain tuples.
+    """
+    def __init__(self, *values):
+        self._values = values
+        self._resolved = False
+
+    def _resolve(self):
+        # Return the values, deriving the day of week and day of year first if
+        # they're yet to be.
+        values = self._values
+        if not self._resolved:
+            fields = calendar_fields(values[TM_YEAR_I], values[TM_MON_I],
+                                     values[TM_MDAY_I])
+            self._values = values = \
+                values[:TM_WDAY_I] + fields[:2] + values[TM_YDAY_I + 1:]
+            self._resolved = True
+        return values
+
+    tm_year = property(lambda self: self._values[TM_YEAR_I])
+    tm_mon = property(lambda self: self._values[TM_MON_I])
+    tm_mday = property(lambda self: self._values[TM_MDAY_I])
+    tm_hour = property(lambda self: self._values[TM_HOUR_I])
+    tm_min = property(lambda self: self._values[TM_MIN_I])
+    tm_sec = property(lambda self: self._values[TM_SEC_I])
+    tm_wday = property(lambda self: self._resolve()[TM_WDAY_I])
+    tm_yday = property(lambda self: self._resolve()[TM_YDAY_I])
+
+    @property
+    def tm_usec(self):
+        if len(self._values) <= TM_USEC_I:
+            raise AttributeError('tm_usec')
+        return self._values[TM_USEC_I]
+
+    @property
+    def tm_gmtoff(self):
+        if len(self._values) <= TM_GMTOFF_I:
+            raise AttributeError('tm_gmtoff')
+        return self._values[TM_GMTOFF_I]
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, i):
+        # Only derive the day of week and day of year if they may be read.
+        if type(i) is int and 0 <= i < TM_WDAY_I:
+            return self._values[i]
+        return self._resolve()[i]
+
+    def __iter__(self):
+        return iter(self._resolve())
+
+    def __eq__(self, other):
+        if isinstance(other, lazy_struct_time):
+            other = other._resolve()
+        elif not isinstance(other, tuple):
+            return NotImplemented
+        return self._resolve() == tuple(other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self):
+        return hash(self._resolve())
+
+    def __repr__(self):
+        return 'lazy_struct_time({})'.format(', '.join(
+            '{}={}'.format(k, repr(v))
+            for k, v in zip(STRUCT_TIME_GMTOFF_FIELDS, self._resolve())
+        ))
+
 def time_delta(**kwargs):
     if any(k not in STRUCT_TIME_FIELDS for k in kwargs):
         raise AssertionError
@@ -112,47 +255,257 @@ days_in_year = lambda year: 366 if is_leap_year(year) else 365
 
 is_valid_month_day = lambda year, month, day: day <= days_in_month(year, month)
 
+days_before_month_table = lambda year: (
+    LEAP_DAYS_BEFORE_MONTH if is_leap_year(year) else DAYS_BEFORE_MONTH
+)
+
 def date_to_day_of_year(year, month, day):
     """Return the day of year for the specified date in the range 1 - 366.
     """
-    # If month is January, just return the day.
-    if month == 1:
-        return day
-    # Accumulate days from all months prior to the specified month.
-    num_days = 0
-    for i in range(1, month):
-        num_days += ABBREV_MONTH_NUM_DAYS_PAIRS[i - 1][1]
-    # Maybe add a leap day.
-    if month > 2 and is_leap_year(year):
-        num_days += 1
-    # Return the sum of day and prior months' days.
-    return num_days + day
+    return days_before_month_table(year)[month] + day
+
+def day_of_year_to_month_day(year, day_of_year):
+    """Return the (<month>, <day>) pair for the specified day of year in the
+    range 1 - 366.
+    """
+    table = days_before_month_table(year)
+    # No month is longer than 31 days, so this estimate is either the correct
+    # month or the one before it.
+    month = (day_of_year + 30) // 31
+    if day_of_year > table[month + 1]:
+        month += 1
+    return month, day_of_year - table[month]
+
+def days_before_year(year):
+    """Return the number of days in the proleptic Gregorian calendar between
+    January 1 of the year 1 and January 1 of the specified year.
+    """
+    y = year - 1
+    return y * 365 + y // 4 - y // 100 + y // 400
 
 def date_to_day_of_week(year, month, day):
     """Return the day number for the specified date.
     """
-    # Calculate the day offset from Jan, 1 in the specified year.
-    day_num = date_to_day_of_year(year, month, day)
+    # January 1 of the year 1 was a Monday, so the day number is just the
+    # number of days elapsed since then modulus 7.
+    return (days_before_year(year) + date_to_day_of_year(year, month, day)
+            - 1) % 7
 
-    is_pre_2k = year < 2000
-    if is_pre_2k:
-        # Calculate the number of days from the end of the year.
-        num_days = days_in_year(year) - day_num + 1
-        start, step = 1999, -1
-    else:
-        # Calculate the number of days from the beginning of the year.
-        num_days = day_num - 1
-        start, step = 2000, 1
+# The days of week on which the WEEK_OF_YEAR_MONDAY and WEEK_OF_YEAR_SUNDAY
+# weeks start.
+MONDAY = 0
+SUNDAY = 6
+
+def week_of_year_to_day_of_year(year, week, day_of_week, first_day_of_week):
+    """Return the day of year for the specified week of year, where week 1
+    starts on the first first_day_of_week of the year and any preceding days
+    are in week 0, and day of week. The result is outside of the range 1 - 366
+    if the date falls in the previous or next year.
+    """
+    # The offset of week 1 from January 1 depends only on the day of week of
+    # January 1, which is the number of days before the year modulus 7.
+    first_weekday = (days_before_year(year) - first_day_of_week) % 7
+    weekday = (day_of_week - first_day_of_week) % 7
+    if week == 0:
+        # As with the built-in datetime.strptime(), count week 0 back from
+        # January 1, so that it's week 1 if that's first_day_of_week.
+        return 1 + weekday - first_weekday
+    return 1 + (7 - first_weekday) % 7 + (week - 1) * 7 + weekday
 
-    for _year in range(start, year, step):
-        num_days += days_in_year(_year)
+date_to_week_of_year = lambda day_of_year, day_of_week, first_day_of_week: \
+    (day_of_year + 6 - (day_of_week - first_day_of_week) % 7) // 7
 
-    # Add the number of days to the day number for Jan 1, 2000 modulus 7
-    # to get the current day number.
-    if is_pre_2k:
-        num_days = -num_days
+def days_from_civil(year, month, day):
+    """Return the number of days from the epoch to the specified date, which is
+    negative for dates that precede it.
+    """
+    return (days_before_year(year) + date_to_day_of_year(year, month, day)
+            - 1 - EPOCH_DAYS_BEFORE_YEAR)
+
+def civil_from_days(days):
+    """Return the (<year>, <month>, <day>) tuple for the date that is the
+    specified number of days from the epoch.
+    """
+    # See: http://howardhinnant.github.io/date_algorithms.html#civil_from_days
+    # Shift the day count to be relative to March 1 of the year 0 so that leap
+    # days fall at the end of the (March-based) year, then split it into
+    # 400-year eras of 146097 days each.
+    days += 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524
+                   - day_of_era // 146096) // 365
+    day_of_march_year = day_of_era - (
+        365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    march_month = (5 * day_of_march_year + 2) // 153
+    day = day_of_march_year - (153 * march_month + 2) // 5 + 1
+    month = march_month + 3 if march_month < 10 else march_month - 9
+    year = year_of_era + era * 400 + (1 if month <= 2 else 0)
+    return year, month, day
 
-    return (JAN_1_2000_DAY_NUM + num_days) % 7
+days_to_day_of_week = lambda days: (days + EPOCH_DAY_NUM) % 7
+
+def calendar_fields(year, month, day):
+    """Return the (<day of week>, <day of year>, <days from epoch>) tuple for
+    the specified date, or None if the month or day is not valid.
+    """
+    if not (1 <= month <= 12 and 1 <= day <= days_in_month(year, month)):
+        return None
+    day_of_year = days_before_month_table(year)[month] + day
+    days = days_before_year(year) + day_of_year - 1 - EPOCH_DAYS_BEFORE_YEAR
+    return days_to_day_of_week(days), day_of_year, days
+
+###############################################################################
+# Year Table
+###############################################################################
+
+# The default window of years covered by the optional year table.
+YEAR_TABLE_FIRST_YEAR = 1970
+YEAR_TABLE_LAST_YEAR = 2099
+
+# Each year table entry holds the weekday of January 1 in its low 3 bits and
+# this leap year flag.
+YEAR_TABLE_WEEKDAY_MASK = 0x07
+YEAR_TABLE_LEAP_BIT = 0x08
+
+def build_year_table(first_year=YEAR_TABLE_FIRST_YEAR,
+                     last_year=YEAR_TABLE_LAST_YEAR):
+    """Return a bytes object, which is compact enough to freeze into firmware,
+    with one entry for each year from first_year to last_year inclusive.
+    """
+    # January 1 of the year 1 was a Monday, so the weekday of January 1 is
+    # just the number of days before the year modulus 7.
+    return bytes([
+        days_before_year(year) % 7
+        | (YEAR_TABLE_LEAP_BIT if arithmetic_is_leap_year(year) else 0)
+        for year in range(first_year, last_year + 1)
+    ])
+
+# Keep the arithmetic helpers that the year table helpers fall back on for
+# years outside of the table.
+arithmetic_is_leap_year = is_leap_year
+arithmetic_date_to_day_of_week = date_to_day_of_week
+
+def year_table_helpers(table, first_year):
+    """Return the ( <is_leap_year>, <date_to_day_of_week> ) helpers that look
+    up the years covered by a build_year_table() table that starts at
+    first_year.
+    """
+    size = len(table)
+
+    def _is_leap_year(year):
+        i = year - first_year
+        if 0 <= i < size:
+            return table[i] & YEAR_TABLE_LEAP_BIT != 0
+        return arithmetic_is_leap_year(year)
+
+    def _date_to_day_of_week(year, month, day):
+        i = year - first_year
+        if 0 <= i < size:
+            entry = table[i]
+            days_before_month = LEAP_DAYS_BEFORE_MONTH \
+                if entry & YEAR_TABLE_LEAP_BIT else DAYS_BEFORE_MONTH
+            return ((entry & YEAR_TABLE_WEEKDAY_MASK)
+                    + days_before_month[month] + day - 1) % 7
+        return arithmetic_date_to_day_of_week(year, month, day)
+
+    return _is_leap_year, _date_to_day_of_week
+
+###############################################################################
+# Caches
+###############################################################################
+
+class LRUCache:
+    """A mapping of bounded size that evicts its least recently used item when
+    a new item is added at capacity.
+    """
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError('capacity must be >= 1, got: {}'.format(capacity))
+        self.capacity = capacity
+        self._d = OrderedDict()
+
+    def __len__(self):
+        return len(self._d)
+
+    def __contains__(self, k):
+        return k in self._d
+
+    def get(self, k, default=None):
+        d = self._d
+        if k not in d:
+            return default
+        # Pop and reinsert the item to mark it as the most recently used.
+        v = d.pop(k)
+        d[k] = v
+        return v
+
+    def put(self, k, v):
+        d = self._d
+        if k in d:
+            d.pop(k)
+        elif len(d) >= self.capacity:
+            # Evict the least recently used, i.e. first inserted, item.
+            del d[next(iter(d))]
+        d[k] = v
+
+    def clear(self):
+        self._d.clear()
+
+# The default capacity of the opt-in calendar cache, which is kept small
+# because a log stream tends to repeat a handful of dates.
+CALENDAR_CACHE_SIZE = 8
+
+class CalendarCache:
+    """A bounded cache of calendar_fields() results keyed on (year, month, day)
+    that counts its hits and misses.
+    """
+    def __init__(self, capacity=CALENDAR_CACHE_SIZE):
+        self._cache = LRUCache(capacity)
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        # Remember the last lookup so that a run of the same date skips the
+        # LRU bookkeeping.
+        self._last_key = None
+        self._last_fields = None
+
+    def __len__(self):
+        return len(self._cache)
+
+    def get(self, year, month, day):
+        # Pack the date into a single int key, which is only unique while the
+        # month and day are within the ranges of their directives, so don't
+        # cache anything else.
+        if not (0 <= month <= 12 and 0 <= day <= 31):
+            return calendar_fields(year, month, day)
+        key = (year * 13 + month) * 32 + day
+        if key == self._last_key:
+            self.hits += 1
+            return self._last_fields
+        # Use False as the missing value since a cached result is either a
+        # tuple or None.
+        fields = self._cache.get(key, False)
+        if fields is False:
+            self.misses += 1
+            fields = calendar_fields(year, month, day)
+            self._cache.put(key, fields)
+        else:
+            self.hits += 1
+        self._last_key = key
+        self._last_fields = fields
+        return fields
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+        self._last_key = None
+        self._last_fields = None
+
+# The calendar cache used by strptime() and add_struct_time_time_delta(), which
+# is None unless enabled via enable_calendar_cache().
+_calendar_cache = None
 
 ###############################################################################
 # struct_time Helpers
@@ -165,303 +518,1925 @@ def struct_time_replace(_struct_time, **kwargs):
         *[kwargs.get(k, getattr(_struct_time, k)) for k in STRUCT_TIME_FIELDS]
     )
 
+def timegm(_struct_time):
+    """Return the number of seconds from the epoch to the specified UTC
+    struct_time, like calendar.timegm(), or to the specified local
+    struct_time_gmtoff, whose offset is subtracted.
+    """
+    seconds = (
+        days_from_civil(
+            _struct_time.tm_year, _struct_time.tm_mon, _struct_time.tm_mday
+        ) * SECONDS_PER_DAY
+        + _struct_time.tm_hour * 3600
+        + _struct_time.tm_min * 60
+        + _struct_time.tm_sec
+    )
+    if len(_struct_time) > TM_GMTOFF_I:
+        seconds -= _struct_time[TM_GMTOFF_I]
+    return seconds
+
+def gmtime(seconds):
+    """Return the UTC struct_time for the specified number of seconds from the
+    epoch, like time.gmtime() but without requiring a clock.
+    """
+    days, seconds = divmod(int(seconds), SECONDS_PER_DAY)
+    year, month, day = civil_from_days(days)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return struct_time(
+        year, month, day, hours, minutes, seconds, days_to_day_of_week(days),
+        date_to_day_of_year(year, month, day)
+    )
+
 def add_struct_time_time_delta(_struct_time, _time_delta):
     # Return the result of adding a time_delta to a struct_time.
     # Check that time_delta doesn't specify tm_wday or tm_yday.
     if (_time_delta.tm_wday != 0 or _time_delta.tm_yday != 0):
         raise NotImplementedError
-    # Sum seconds.
-    seconds = _struct_time.tm_sec + _time_delta.tm_sec
-    minutes = 0
-    if seconds < 0:
-        minutes -= int(-seconds / 60) + 1
-        seconds = seconds % 60
-    elif seconds > 59:
-        minutes += int(seconds / 60)
-        seconds = seconds % 60
-    # Sum minutes.
-    minutes += _struct_time.tm_min + _time_delta.tm_min
-    hours = 0
-    if minutes < 0:
-        hours -= int(-minutes / 60) + 1
-        minutes = minutes % 60
-    elif minutes > 59:
-        hours += int(minutes / 60)
-        minutes = minutes % 60
-    # Sum hours.
-    hours += _struct_time.tm_hour + _time_delta.tm_hour
-    day = 0
-    if hours < 0:
-        day -= int(-hours / 24) + 1
-        hours = hours % 24
-    elif hours > 23:
-        day += int(hours / 24)
-        hours = hours % 24
-    # Sum days.
-    day += _struct_time.tm_mday + _time_delta.tm_mday
-    month = 0
-    if day < 1:
-        month -= int(-day / 32) + 1
-        day = 31 - (-day % 32)
-    elif day > 31:
-        month += int(day / 32)
-        day = day % 32
-    # Sum months.
-    month += _struct_time.tm_mon + _time_delta.tm_mon
-    year = 0
-    if month < 1:
-        year -= int(month / 13) + 1
-        month = 12 - (-month % 13)
-    elif month > 12:
-        year += int(month / 13)
-        month = month % 13
-    # Sum years.
-    year += _struct_time.tm_year + _time_delta.tm_year
-    # Increment month if day exceeds max.
-    last_day = days_in_month(year, month)
-    if day > last_day:
-        month += int(day % last_day + 1)
-        day = day % last_day + 1
-    if month > 12:
-        year += int(month / 13)
-        month = month % 13
-    # Calc day of week / year and return struct_time.
-    dyear = date_to_day_of_year(year, month, day)
-    dweek = date_to_day_of_week(year, month, day)
-    return struct_time(year, month, day, hours, minutes, seconds, dweek, dyear)
+    year = _struct_time.tm_year
+    month = _struct_time.tm_mon
+    day = _struct_time.tm_mday
+    # Add any years and months as a separate calendar step, clamping the day
+    # to the last day of the resulting month.
+    if _time_delta.tm_year != 0 or _time_delta.tm_mon != 0:
+        year, month = divmod(
+            (year + _time_delta.tm_year) * 12 + month - 1 + _time_delta.tm_mon,
+            12
+        )
+        month += 1
+        day = min(day, days_in_month(year, month))
+    # Add the days and seconds to the epoch seconds of the date and convert the
+    # sum back to a struct_time. Note that the epoch day is linear in the day
+    # of month, so an out-of-range day sum simply carries into the following
+    # months.
+    fields = None if _calendar_cache is None \
+        else _calendar_cache.get(year, month, day)
+    days = days_from_civil(year, month, day) if fields is None else fields[2]
+    return gmtime(
+        (days + _time_delta.tm_mday) * SECONDS_PER_DAY
+        + (_struct_time.tm_hour + _time_delta.tm_hour) * 3600
+        + (_struct_time.tm_min + _time_delta.tm_min) * 60
+        + _struct_time.tm_sec + _time_delta.tm_sec
+    )
 
 ###############################################################################
 # Parser
 ###############################################################################
 
-def match_choice(s, choices):
-    # Find the first value in choices that is a prefix of s and return a tuple
-    # in the format: ( <choice>, <rest-of-s> ) where <rest-of-s> is
-    # s[len(choice):], or return False if no match is found.
+# Each parser takes a string, or a bytes-like object, and the offset within it
+# at which to start parsing and, rather than slicing the input, returns a tuple
+# in the format: ( <value>, <offset> ) where <offset> is that of the first
+# unparsed char, or returns False if no match is found.
+# Indexing a str yields a str while indexing a bytes-like object yields an int,
+# so the tables below that map input chars to values are keyed by both.
+
+# Map each decimal digit char and byte to its value.
+DIGIT_VALUES = dict(
+    [(str(n), n) for n in range(10)] + [(ord(str(n)), n) for n in range(10)]
+)
+
+# Map each time zone offset sign char and byte to its multiplier.
+TIME_ZONE_OFFSET_SIGNS = {'+': 1, '-': -1, ord('+'): 1, ord('-'): -1}
+
+TIME_ZONE_OFFSET_SEPARATORS = (':', ord(':'))
+
+def match_choice(s, i, choices):
+    # Find the first value in choices that occurs in s at offset i and return a
+    # tuple in the format: ( <choice>, <offset> ) where <offset> is
+    # i + len(choice), or return False if no match is found.
     for choice in choices:
-        if s.startswith(choice):
-            return choice, s[len(choice):]
+        if s.startswith(choice, i):
+            return choice, i + len(choice)
     return False
 
-def parse_integer(s, _len, _min, _max):
-    # Attempt to parse an integer of specified length and range and return a
-    # tuple in the format: ( <number>, <rest-of-s> ) where <rest-of-s> is
-    # s[_len:], or return False if no match is found.
-    if len(s) >= _len:
-        num_s = s[:_len]
-        if all(c.isdigit() for c in num_s):
-            num = int(num_s)
-            if _min <= num <= _max:
-                return num, s[_len:]
+def match_name(s, i, table):
+    # Find the first name in a compile_names() table that occurs in the str or
+    # bytes-like s at offset i and return a tuple in the format:
+    # ( <value>, <offset> ) where <value> is the name's value and <offset> is
+    # that of the char following the name, or return False if no match is
+    # found.
+    end = len(s)
+    if i >= end:
+        return False
+    candidates = table.get(s[i])
+    if candidates is None:
+        return False
+    for lower, upper, value in candidates:
+        n = len(lower)
+        if i + n > end:
+            continue
+        # Compare the remaining chars, the first having matched the key.
+        k = 1
+        while k < n:
+            c = s[i + k]
+            if c != lower[k] and c != upper[k]:
+                break
+            k += 1
+        else:
+            return value, i + n
     return False
 
-def parse_time_zone_offset(s):
-    # Attempt to parse a positive or negative time zone offset and return a
-    # tuple in the format: ( <offset-minutes>, <rest-of-s> ), or return False
-    # if no match is found.
-    if (len(s) == 6
-        and (s[0] == '-' or s[0] == '+')
-        and s[1].isdigit()
-        and s[2].isdigit()
-        and s[3] == ':'
-        and s[4].isdigit()
-        and s[5].isdigit()):
-        return int(s[:3]) * 60 + int(s[4:6]), s[6:]
+def parse_integer(s, i, _len, _min, _max):
+    # Attempt to parse an integer of specified length and range at offset i
+    # and return a tuple in the format: ( <number>, <offset> ) where <offset>
+    # is i + _len, or return False if no match is found.
+    end = i + _len
+    if end > len(s):
+        return False
+    # Accumulate the digits without creating a substring.
+    num = 0
+    while i < end:
+        digit = DIGIT_VALUES.get(s[i])
+        if digit is None:
+            return False
+        num = num * 10 + digit
+        i += 1
+    if _min <= num <= _max:
+        return num, end
     return False
 
-choice_parser = lambda choices: lambda s: match_choice(s, choices)
+def parse_time_zone_offset(s, i):
+    # Attempt to parse a positive or negative time zone offset in the format
+    # +HH:MM or -HH:MM at offset i and return a tuple in the format:
+    # ( <offset-minutes>, <offset> ), or return False if no match is found.
+    if len(s) - i < 6:
+        return False
+    sign = TIME_ZONE_OFFSET_SIGNS.get(s[i])
+    if sign is None or s[i + 3] not in TIME_ZONE_OFFSET_SEPARATORS:
+        return False
+    hours = parse_integer(s, i + 1, 2, 0, 99)
+    minutes = parse_integer(s, i + 4, 2, 0, 99)
+    if hours is False or minutes is False:
+        return False
+    return sign * (hours[0] * 60 + minutes[0]), i + 6
+
+# Map the number of digits of a fraction of a second to the multiplier that
+# converts it to microseconds.
+MICROSECOND_MULTIPLIERS = (None, 100000, 10000, 1000, 100, 10, 1)
 
-positive_integer_parser = lambda _len, _max, _min=0: lambda s: parse_integer(
-    s, _len, _min=_min, _max=_max)
+def parse_microseconds(s, i):
+    # Attempt to parse 1 to 6 digits at offset i as a fraction of a second and
+    # return a tuple in the format: ( <microseconds>, <offset> ), or return
+    # False if no match is found.
+    end = min(len(s), i + 6)
+    num = 0
+    j = i
+    while j < end:
+        digit = DIGIT_VALUES.get(s[j])
+        if digit is None:
+            break
+        num = num * 10 + digit
+        j += 1
+    if j == i:
+        return False
+    return num * MICROSECOND_MULTIPLIERS[j - i], j
+
+def parse_percent(s, i):
+    # Attempt to match a literal '%' at offset i.
+    if i < len(s) and (s[i] == '%' or s[i] == 37):
+        return '', i + 1
+    return False
+
+choice_parser = lambda choices: lambda s, i: match_choice(s, i, choices)
+
+def compile_names(names, values, ignore_case=False):
+    """Return a table for match_name() that maps the first char of each name,
+    as both a str char and a UTF-8 byte, to the list of candidate
+    ( <lower>, <upper>, <value> ) tuples that start with it, in the order of
+    names, where <lower> and <upper> are the lower- and upper-case forms of
+    the name if ignore_case, otherwise both just the name, as str for the str
+    keys and as bytes for the byte keys.
+    """
+    table = {}
+    for name, value in zip(names, values):
+        lower, upper = (name.lower(), name.upper()) if ignore_case else \
+            (name, name)
+        for lower, upper in ((lower, upper),
+                             (lower.encode(), upper.encode())):
+            for first in set((lower[0], upper[0])):
+                table.setdefault(first, []).append((lower, upper, value))
+    return table
+
+name_parser = lambda table: lambda s, i: match_name(s, i, table)
+
+positive_integer_parser = lambda _len, _max, _min=0: \
+    lambda s, i: parse_integer(s, i, _len, _min, _max)
+
+# Map each name directive to its ( <names>, <values> ) pair, where each value
+# is the number to use for the directive's struct_time field.
+DIRECTIVE_NAMES_MAP = {
+    DIRECTIVES.ABBREV_WEEKDAY_NAME: (ABBREVIATED_WEEKDAY_NAMES, range(7)),
+    DIRECTIVES.WEEKDAY_NAME: (WEEKDAY_NAMES, range(7)),
+    DIRECTIVES.ABBREV_MONTH_NAME: (ABBREVIATED_MONTH_NAMES, range(1, 13)),
+    DIRECTIVES.MONTH_NAME: (MONTH_NAMES, range(1, 13)),
+    # AM_PM values are the number of hours to add to TM_HOUR.
+    DIRECTIVES.AM_PM: (('AM', 'PM'), (0, 12)),
+    DIRECTIVES.TIME_ZONE: (('Z',), (0,)),
+}
+
+# Map each integer directive to its ( <length>, <max>, <min> ) spec.
+DIRECTIVE_INTEGER_SPEC_MAP = {
+    DIRECTIVES.DAY_OF_MONTH: (2, 31, 0),
+    DIRECTIVES.HOUR_24: (2, 23, 0),
+    DIRECTIVES.HOUR_12: (2, 12, 1),
+    DIRECTIVES.DAY_OF_YEAR: (3, 366, 0),
+    DIRECTIVES.MONTH: (2, 12, 0),
+    DIRECTIVES.MINUTE: (2, 59, 0),
+    DIRECTIVES.SECOND: (2, 59, 0),
+    DIRECTIVES.DAY_OF_WEEK: (1, 6, 0),
+    DIRECTIVES.WEEK_OF_YEAR_SUNDAY: (2, 53, 0),
+    DIRECTIVES.WEEK_OF_YEAR_MONDAY: (2, 53, 0),
+    DIRECTIVES.YEAR_NO_CENTURY: (2, 99, 0),
+    DIRECTIVES.YEAR: (4, 9999, 0),
+}
 
 DIRECTIVE_PARSER_MAP = {
-    DIRECTIVES.ABBREV_WEEKDAY_NAME: choice_parser(ABBREVIATED_WEEKDAY_NAMES),
-    DIRECTIVES.WEEKDAY_NAME: choice_parser(WEEKDAY_NAMES),
-    DIRECTIVES.ABBREV_MONTH_NAME: choice_parser(ABBREVIATED_MONTH_NAMES),
-    DIRECTIVES.MONTH_NAME: choice_parser(MONTH_NAMES),
     DIRECTIVES.LOCALE_DATETIME: NOT_IMPLEMENTED,
-    DIRECTIVES.DAY_OF_MONTH: positive_integer_parser(_len=2, _max=31),
-    DIRECTIVES.HOUR_24: positive_integer_parser(_len=2, _max=23),
-    DIRECTIVES.HOUR_12: positive_integer_parser(_len=2, _min=1, _max=12),
-    DIRECTIVES.DAY_OF_YEAR: positive_integer_parser(_len=3, _max=366),
-    DIRECTIVES.MONTH: positive_integer_parser(_len=2, _max=12),
-    DIRECTIVES.MINUTE: positive_integer_parser(_len=2, _max=59),
-    DIRECTIVES.AM_PM: choice_parser(('AM', 'PM')),
-    DIRECTIVES.SECOND: positive_integer_parser(_len=2, _max=59),
-    DIRECTIVES.WEEK_OF_YEAR_SUNDAY: NOT_IMPLEMENTED,
-    DIRECTIVES.DAY_OF_WEEK: positive_integer_parser(_len=1, _max=6),
-    DIRECTIVES.WEEK_OF_YEAR_MONDAY: NOT_IMPLEMENTED,
     DIRECTIVES.LOCALE_DATE: NOT_IMPLEMENTED,
     DIRECTIVES.LOCALE_TIME: NOT_IMPLEMENTED,
-    DIRECTIVES.YEAR_NO_CENTURY: positive_integer_parser(_len=2, _max=99),
-    DIRECTIVES.YEAR: positive_integer_parser(_len=4, _max=9999),
     DIRECTIVES.TIME_ZONE_OFFSET: parse_time_zone_offset,
-    DIRECTIVES.TIME_ZONE: choice_parser(('Z',)),
-    DIRECTIVES.PERCENT: lambda s: s.startswith('%') and ('', s[2:]),
+    DIRECTIVES.MICROSECOND: parse_microseconds,
+    DIRECTIVES.PERCENT: parse_percent,
+}
+
+# Add the name and integer directive parsers.
+DIRECTIVE_PARSER_MAP.update({
+    directive: name_parser(compile_names(names, values))
+    for directive, (names, values) in DIRECTIVE_NAMES_MAP.items()
+})
+DIRECTIVE_PARSER_MAP.update({
+    directive: positive_integer_parser(*spec)
+    for directive, spec in DIRECTIVE_INTEGER_SPEC_MAP.items()
+})
+
+# Map each name directive to its case-insensitive parser.
+DIRECTIVE_IGNORE_CASE_PARSER_MAP = {
+    directive: name_parser(compile_names(names, values, ignore_case=True))
+    for directive, (names, values) in DIRECTIVE_NAMES_MAP.items()
 }
 
 ###############################################################################
-# API
+# Directive Conversions
 ###############################################################################
 
-def directive_to_struct_time_item(directive, value):
-    """Return the struct_time (<key>, <value>) pair for the given matched
-    directive and value.
+# Map each directive to a (<struct_time-key>, <convert-func>) pair describing
+# how its parsed value contributes to the struct_time, where <convert-func> is
+# None if the value can be used as-is. Directives that contribute nothing map
+# to None.
+DIRECTIVE_STRUCT_TIME_ITEM_MAP = {
+    # Return YEAR as TM_YEAR.
+    DIRECTIVES.YEAR: (STRUCT_TIME.TM_YEAR, None),
+    # Return YEAR_NO_CENTURY as TM_YEAR.
+    # Assume that a two-digit year is relative to the year 2000.
+    DIRECTIVES.YEAR_NO_CENTURY: (STRUCT_TIME.TM_YEAR, lambda v: v + 2000),
+    # Return MONTH as TM_MON.
+    DIRECTIVES.MONTH: (STRUCT_TIME.TM_MON, None),
+    # Return ABBREV_MONTH_NAME as TM_MON.
+    DIRECTIVES.ABBREV_MONTH_NAME: (STRUCT_TIME.TM_MON, None),
+    # Return MONTH_NAME as TM_MON.
+    DIRECTIVES.MONTH_NAME: (STRUCT_TIME.TM_MON, None),
+    # Return DAY_OF_MONTH as TM_MDAY
+    DIRECTIVES.DAY_OF_MONTH: (STRUCT_TIME.TM_MDAY, None),
+    # Return HOUR_24 as TM_HOUR
+    DIRECTIVES.HOUR_24: (STRUCT_TIME.TM_HOUR, None),
+    # Return HOUR_12 as 0-based TM_HOUR
+    DIRECTIVES.HOUR_12: (STRUCT_TIME.TM_HOUR, lambda v: 0 if v == 12 else v),
+    # Return MINUTE as TM_MIN
+    DIRECTIVES.MINUTE: (STRUCT_TIME.TM_MIN, None),
+    # Return SECOND as TM_SEC
+    DIRECTIVES.SECOND: (STRUCT_TIME.TM_SEC, None),
+    # Return MICROSECOND as TM_USEC
+    DIRECTIVES.MICROSECOND: (STRUCT_TIME.TM_USEC, None),
+    # Return DAY_OF_WEEK as TM_WDAY
+    DIRECTIVES.DAY_OF_WEEK: (STRUCT_TIME.TM_WDAY, None),
+    # Return ABBREV_WEEKDAY_NAME as TM_WDAY
+    DIRECTIVES.ABBREV_WEEKDAY_NAME: (STRUCT_TIME.TM_WDAY, None),
+    # Return WEEKDAY_NAME as TM_WDAY
+    DIRECTIVES.WEEKDAY_NAME: (STRUCT_TIME.TM_WDAY, None),
+    # Return DAY_OF_YEAR as TM_YDAY
+    DIRECTIVES.DAY_OF_YEAR: (STRUCT_TIME.TM_YDAY, None),
+    # Return WEEK_OF_YEAR_SUNDAY and WEEK_OF_YEAR_MONDAY as TM_YDAY, from
+    # which resolve_values() replaces them with the resolved day of year.
+    DIRECTIVES.WEEK_OF_YEAR_SUNDAY: (STRUCT_TIME.TM_YDAY, None),
+    DIRECTIVES.WEEK_OF_YEAR_MONDAY: (STRUCT_TIME.TM_YDAY, None),
+    # Take no action for TIME_ZONE.
+    DIRECTIVES.TIME_ZONE: None,
+    # Return TIME_ZONE_OFFSET as TM_MIN - to be subtracted from any
+    # existing minute value to arrive at UTC.
+    DIRECTIVES.TIME_ZONE_OFFSET: (STRUCT_TIME.TM_MIN, lambda v: -v),
+    # Return AM_PM as TM_HOUR
+    # The value for 'PM' is +12 to update hour value to 24-hour format.
+    DIRECTIVES.AM_PM: (STRUCT_TIME.TM_HOUR, None),
+    # Take no action for PERCENT.
+    DIRECTIVES.PERCENT: None,
+}
+
+# Map each directive whose parsed value contributes differently to the
+# local time of a format compiled with utc=False to its
+# (<struct_time-key>, <convert-func>) pair.
+DIRECTIVE_LOCAL_STRUCT_TIME_ITEM_MAP = {
+    # Return TIME_ZONE_OFFSET as TM_GMTOFF in seconds, leaving the local time
+    # as-is.
+    DIRECTIVES.TIME_ZONE_OFFSET: (STRUCT_TIME.TM_GMTOFF, lambda v: v * 60),
+}
+
+# Map each week of year directive to the day of week on which its weeks start.
+DIRECTIVE_FIRST_DAY_OF_WEEK_MAP = {
+    DIRECTIVES.WEEK_OF_YEAR_SUNDAY: SUNDAY,
+    DIRECTIVES.WEEK_OF_YEAR_MONDAY: MONDAY,
+}
+
+###############################################################################
+# Directive Formatters
+###############################################################################
+
+# Map each value from 0 to 99 to its zero-padded 2-digit string so that
+# formatting a field is a table lookup rather than a str.format() call.
+TWO_DIGIT_STRINGS = tuple('{:02d}'.format(n) for n in range(100))
+
+def format_year(year):
+    # Return the year as a zero-padded 4-digit string, or as-is if it has
+    # more than 4 digits or is negative.
+    if 0 <= year <= 9999:
+        return TWO_DIGIT_STRINGS[year // 100] + TWO_DIGIT_STRINGS[year % 100]
+    return str(year)
+
+def format_gmtoff(gmtoff):
+    # Return the UTC offset in seconds as +HH:MM or -HH:MM.
+    hours, minutes = divmod(abs(gmtoff) // 60, 60)
+    return '{}{:02d}:{:02d}'.format('-' if gmtoff < 0 else '+', hours,
+                                    minutes)
+
+def format_microseconds(usec):
+    # Return the microseconds as a zero-padded 6-digit string.
+    if not 0 <= usec <= 999999:
+        raise ValueError('tm_usec out of range: {}'.format(usec))
+    return (TWO_DIGIT_STRINGS[usec // 10000]
+            + TWO_DIGIT_STRINGS[usec // 100 % 100]
+            + TWO_DIGIT_STRINGS[usec % 100])
+
+two_digit_formatter = lambda index: \
+    lambda _struct_time: TWO_DIGIT_STRINGS[_struct_time[index]]
+
+name_formatter = lambda table, index: \
+    lambda _struct_time: table[_struct_time[index]]
+
+week_of_year_formatter = lambda first_day_of_week: \
+    lambda _struct_time: TWO_DIGIT_STRINGS[date_to_week_of_year(
+        _struct_time[TM_YDAY_I], _struct_time[TM_WDAY_I], first_day_of_week)]
+
+# Map each directive to a function that returns the string for its field of a
+# struct_time.
+DIRECTIVE_FORMATTER_MAP = {
+    DIRECTIVES.LOCALE_DATETIME: NOT_IMPLEMENTED,
+    DIRECTIVES.DAY_OF_MONTH: two_digit_formatter(TM_MDAY_I),
+    DIRECTIVES.HOUR_24: two_digit_formatter(TM_HOUR_I),
+    DIRECTIVES.HOUR_12: lambda _struct_time:
+        TWO_DIGIT_STRINGS[(_struct_time[TM_HOUR_I] + 11) % 12 + 1],
+    DIRECTIVES.DAY_OF_YEAR: lambda _struct_time: (
+        TWO_DIGIT_STRINGS[_struct_time[TM_YDAY_I] // 100][1]
+        + TWO_DIGIT_STRINGS[_struct_time[TM_YDAY_I] % 100]
+    ),
+    DIRECTIVES.MONTH: two_digit_formatter(TM_MON_I),
+    DIRECTIVES.MINUTE: two_digit_formatter(TM_MIN_I),
+    DIRECTIVES.AM_PM: lambda _struct_time:
+        'PM' if _struct_time[TM_HOUR_I] >= 12 else 'AM',
+    DIRECTIVES.SECOND: two_digit_formatter(TM_SEC_I),
+    DIRECTIVES.MICROSECOND: lambda _struct_time:
+        format_microseconds(_struct_time[TM_USEC_I])
+        if len(_struct_time) > TM_USEC_I else '000000',
+    DIRECTIVES.WEEK_OF_YEAR_SUNDAY: week_of_year_formatter(SUNDAY),
+    DIRECTIVES.DAY_OF_WEEK: lambda _struct_time:
+        TWO_DIGIT_STRINGS[_struct_time[TM_WDAY_I]][1],
+    DIRECTIVES.WEEK_OF_YEAR_MONDAY: week_of_year_formatter(MONDAY),
+    DIRECTIVES.LOCALE_DATE: NOT_IMPLEMENTED,
+    DIRECTIVES.LOCALE_TIME: NOT_IMPLEMENTED,
+    DIRECTIVES.YEAR_NO_CENTURY: lambda _struct_time:
+        TWO_DIGIT_STRINGS[_struct_time[TM_YEAR_I] % 100],
+    DIRECTIVES.YEAR: lambda _struct_time: format_year(_struct_time[TM_YEAR_I]),
+    # A struct_time is in UTC, while a struct_time_gmtoff is at its offset,
+    # which only %z can express unless it's zero.
+    DIRECTIVES.TIME_ZONE_OFFSET: lambda _struct_time:
+        format_gmtoff(_struct_time[TM_GMTOFF_I])
+        if len(_struct_time) > TM_GMTOFF_I else '+00:00',
+    DIRECTIVES.TIME_ZONE: lambda _struct_time:
+        format_gmtoff(_struct_time[TM_GMTOFF_I])
+        if len(_struct_time) > TM_GMTOFF_I and _struct_time[TM_GMTOFF_I]
+        else 'Z',
+    DIRECTIVES.PERCENT: lambda _struct_time: '%',
+}
+
+# Add the name directive formatters, which look up the name of the value that
+# each parses to.
+DIRECTIVE_FORMATTER_MAP.update({
+    directive: name_formatter(
+        dict(zip(values, names)),
+        STRUCT_TIME_USEC_FIELDS.index(
+            DIRECTIVE_STRUCT_TIME_ITEM_MAP[directive][0])
+    )
+    for directive, (names, values) in DIRECTIVE_NAMES_MAP.items()
+    if directive not in (DIRECTIVES.AM_PM, DIRECTIVES.TIME_ZONE)
+})
+
+# Map each directive to the ( <index>, <min>, <max> ) ranges of the fields
+# that strftime() formats for it, which, as with the built-in time.strftime(),
+# allow a zero month, day of month or day of year, e.g. of a time-only
+# strptime() result, except where it has no name, and a leap second of 61.
+# format_microseconds() checks the optional tm_usec field itself.
+DIRECTIVE_FORMATTER_RANGE_MAP = {
+    DIRECTIVES.ABBREV_WEEKDAY_NAME: ((TM_WDAY_I, 0, 6),),
+    DIRECTIVES.WEEKDAY_NAME: ((TM_WDAY_I, 0, 6),),
+    DIRECTIVES.ABBREV_MONTH_NAME: ((TM_MON_I, 1, 12),),
+    DIRECTIVES.MONTH_NAME: ((TM_MON_I, 1, 12),),
+    DIRECTIVES.DAY_OF_MONTH: ((TM_MDAY_I, 0, 31),),
+    DIRECTIVES.HOUR_24: ((TM_HOUR_I, 0, 23),),
+    DIRECTIVES.HOUR_12: ((TM_HOUR_I, 0, 23),),
+    DIRECTIVES.DAY_OF_YEAR: ((TM_YDAY_I, 0, 366),),
+    DIRECTIVES.MONTH: ((TM_MON_I, 0, 12),),
+    DIRECTIVES.MINUTE: ((TM_MIN_I, 0, 59),),
+    DIRECTIVES.AM_PM: ((TM_HOUR_I, 0, 23),),
+    DIRECTIVES.SECOND: ((TM_SEC_I, 0, 61),),
+    DIRECTIVES.WEEK_OF_YEAR_SUNDAY: ((TM_YDAY_I, 0, 366), (TM_WDAY_I, 0, 6)),
+    DIRECTIVES.DAY_OF_WEEK: ((TM_WDAY_I, 0, 6),),
+    DIRECTIVES.WEEK_OF_YEAR_MONDAY: ((TM_YDAY_I, 0, 366), (TM_WDAY_I, 0, 6)),
+}
+
+###############################################################################
+# ISO 8601 Parser
+###############################################################################
+
+# Define the parse_iso8601_fields() zone option value that accepts either or
+# no zone designator. The DIRECTIVES.TIME_ZONE_OFFSET and DIRECTIVES.TIME_ZONE
+# values require a +HH:MM/-HH:MM offset and a 'Z' respectively, and None
+# requires that there be no zone designator.
+ISO8601_ANY_ZONE = '*'
+
+# The chars that parse_iso8601_fields() matches, as str chars and as bytes
+# items: ( <date-sep>, <time-sep>, <T>, <Z>, <+>, <->, <.>, <,>, <t>, <z>,
+# <space> )
+ISO8601_STR_CHARS = ('-', ':', 'T', 'Z', '+', '-', '.', ',', 't', 'z', ' ')
+ISO8601_BYTES_CHARS = tuple(ord(c) for c in ISO8601_STR_CHARS)
+
+# Map each strptime() format that the ISO 8601 fast path can handle to its
+# ( <extended>, <zone>, <fraction> ) parse_iso8601_fields() options.
+ISO8601_FORMATS = {
+    '%Y-%m-%dT%H:%M:%S': (True, None, False),
+    '%Y-%m-%dT%H:%M:%S%z': (True, DIRECTIVES.TIME_ZONE_OFFSET, False),
+    '%Y-%m-%dT%H:%M:%S%Z': (True, DIRECTIVES.TIME_ZONE, False),
+    '%Y%m%dT%H%M%S': (False, None, False),
+    '%Y%m%dT%H%M%S%z': (False, DIRECTIVES.TIME_ZONE_OFFSET, False),
+    '%Y%m%dT%H%M%S%Z': (False, DIRECTIVES.TIME_ZONE, False),
+    '%Y-%m-%dT%H:%M:%S.%f': (True, None, True),
+    '%Y-%m-%dT%H:%M:%S.%f%z': (True, DIRECTIVES.TIME_ZONE_OFFSET, True),
+    '%Y-%m-%dT%H:%M:%S.%f%Z': (True, DIRECTIVES.TIME_ZONE, True),
+    '%Y%m%dT%H%M%S.%f': (False, None, True),
+    '%Y%m%dT%H%M%S.%f%z': (False, DIRECTIVES.TIME_ZONE_OFFSET, True),
+    '%Y%m%dT%H%M%S.%f%Z': (False, DIRECTIVES.TIME_ZONE, True),
+}
+
+def parse_two_digits(s, i):
+    # Return the value of the two digits at offset i of the str or bytes-like
+    # s, or -1 if they're not both digits.
+    tens = DIGIT_VALUES.get(s[i])
+    ones = DIGIT_VALUES.get(s[i + 1])
+    if tens is None or ones is None:
+        return -1
+    return tens * 10 + ones
+
+def parse_iso8601_fields(s, values, extended=None, zone=ISO8601_ANY_ZONE,
+                         lenient=True, fraction=None, gmtoff=False):
+    """Attempt to parse the str or bytes-like s as an ISO 8601 date and time
+    into values, a zero-initialized mutable sequence of struct_time field
+    values, and return a bool indicating whether it matched.
+    Unlike strptime(), this reads each field at its fixed position instead of
+    interpreting a format.
+    extended specifies whether s is in the extended format, i.e.
+    YYYY-MM-DDTHH:MM:SS, or the basic format, i.e. YYYYMMDDTHHMMSS, or None to
+    detect it, and zone is one of the ISO8601_ANY_ZONE, DIRECTIVES or None
+    zone designator options.
+    If lenient, the RFC 3339 variations are also accepted: a fractional
+    second of any number of digits, a lower-case 't' or space date/time
+    separator, a lower-case 'z', and a +HHMM/-HHMM offset in the basic
+    format. Otherwise, s must match exactly as the equivalent ISO8601_FORMATS
+    format would, with a '.' and 1 - 6 digit fractional second if fraction.
+    Any fractional second is truncated to microseconds and stored in the
+    TM_USEC field of values if it has one.
+    As with %z, an offset is subtracted from tm_min, to be normalized by
+    resolve_values(), or if gmtoff, stored in seconds in the TM_GMTOFF field
+    of values.
     """
-    if directive == DIRECTIVES.YEAR:
-        # Return YEAR as TM_YEAR.
-        return STRUCT_TIME.TM_YEAR, value
-    elif directive == DIRECTIVES.YEAR_NO_CENTURY:
-        # Return YEAR_NO_CENTURY as TM_YEAR.
-        # Assume that a two-digit year is relative to the year 2000.
-        return STRUCT_TIME.TM_YEAR, value + 2000
-    elif directive == DIRECTIVES.MONTH:
-        # Return MONTH as TM_MON.
-        return STRUCT_TIME.TM_MON, value
-    elif directive == DIRECTIVES.ABBREV_MONTH_NAME:
-        # Return ABBREV_MONTH_NAME as TM_MON.
-        return STRUCT_TIME.TM_MON, ABBREVIATED_MONTH_NAMES.index(value)
-    elif directive == DIRECTIVES.MONTH_NAME:
-        # Return MONTH_NAME as TM_MON.
-        return STRUCT_TIME.TM_MON, MONTH_NAMES.index(value)
-    elif directive == DIRECTIVES.DAY_OF_MONTH:
-        # Return DAY_OF_MONTH as TM_MDAY
-        return STRUCT_TIME.TM_MDAY, value
-    elif directive == DIRECTIVES.HOUR_24:
-        # Return HOUR_24 as TM_HOUR
-        return STRUCT_TIME.TM_HOUR, value
-    elif directive == DIRECTIVES.HOUR_12:
-        # Return HOUR_12 as 0-based TM_HOUR
-        return STRUCT_TIME.TM_HOUR, 0 if value == 12 else value
-    elif directive == DIRECTIVES.MINUTE:
-        # Return MINUTE as TM_MIN
-        return STRUCT_TIME.TM_MIN, value
-    elif directive == DIRECTIVES.SECOND:
-        # Return SECOND as TM_SEC
-        return STRUCT_TIME.TM_SEC, value
-    elif directive == DIRECTIVES.DAY_OF_WEEK:
-        # Return DAY_OF_WEEK as TM_WDAY
-        return STRUCT_TIME.TM_WDAY, value
-    elif directive == DIRECTIVES.ABBREV_WEEKDAY_NAME:
-        # Return ABBREV_WEEKDAY_NAME as TM_WDAY
-        return STRUCT_TIME.TM_WDAY, ABBREVIATED_WEEKDAY_NAMES.index(value)
-    elif directive == DIRECTIVES.WEEKDAY_NAME:
-        # Return WEEKDAY_NAME as TM_WDAY
-        return STRUCT_TIME.TM_WDAY, WEEKDAY_NAMES.index(value)
-    elif directive == DIRECTIVES.DAY_OF_YEAR:
-        # Return DAY_OF_YEAR as TM_YDAY
-        return STRUCT_TIME.TM_YDAY, value
-    elif directive == DIRECTIVES.TIME_ZONE:
-        # Take no action for TIME_ZONE.
-        return None
-    elif directive == DIRECTIVES.TIME_ZONE_OFFSET:
-        # Return TIME_ZONE_OFFSET as TM_MIN - to be subtracted from any
-        # existing minute value to arrive at UTC.
-        return STRUCT_TIME.TM_MIN, -value
-    elif directive == DIRECTIVES.AM_PM:
-        # Return AM_PM as TM_HOUR
-        # If value = 'PM' return +12 to update hour value to 24-hour format.
-        return STRUCT_TIME.TM_HOUR, 12 if value == 'PM' else 0
-    elif directive == DIRECTIVES.PERCENT:
-        # Take no action for PERCENT.
-        return None
+    date_sep, time_sep, t, z, plus, minus, dot, comma, lower_t, lower_z, \
+        space = ISO8601_STR_CHARS if isinstance(s, str) else \
+        ISO8601_BYTES_CHARS
+    n = len(s)
+    if extended is None:
+        extended = n > 4 and s[4] == date_sep
+    # Check the separators and get the end offset of the date/time fields.
+    if extended:
+        if (n < 19 or s[4] != date_sep or s[7] != date_sep
+            or s[13] != time_sep or s[16] != time_sep):
+            return False
+        sep = s[10]
+        i = 19
     else:
-        raise NotImplementedError(
-            'struct_time conversion not defined for directive: {}'
-            .format(directive)
-        )
+        if n < 15:
+            return False
+        sep = s[8]
+        i = 15
+    if sep != t and not (lenient and (sep == lower_t or sep == space)):
+        return False
+    # Parse the fields, where the extended format is offset by one more
+    # separator before each field after the year. A non-digit maps to None,
+    # and the resulting TypeError is cheaper than checking each digit.
+    get = DIGIT_VALUES.get
+    x = 1 if extended else 0
+    try:
+        year = (get(s[0]) * 1000 + get(s[1]) * 100 + get(s[2]) * 10
+                + get(s[3]))
+        month = get(s[4 + x]) * 10 + get(s[5 + x])
+        day = get(s[6 + 2 * x]) * 10 + get(s[7 + 2 * x])
+        hour = get(s[9 + 2 * x]) * 10 + get(s[10 + 2 * x])
+        minute = get(s[11 + 3 * x]) * 10 + get(s[12 + 3 * x])
+        second = get(s[13 + 4 * x]) * 10 + get(s[14 + 4 * x])
+    except TypeError:
+        return False
+    if (month > 12 or day > 31 or hour > 23 or minute > 59 or second > 59):
+        return False
+    values[TM_YEAR_I] = year
+    values[TM_MON_I] = month
+    values[TM_MDAY_I] = day
+    values[TM_HOUR_I] = hour
+    values[TM_MIN_I] = minute
+    values[TM_SEC_I] = second
+    if i == n:
+        return not fraction and (zone is None or zone == ISO8601_ANY_ZONE)
+    c = s[i]
+    if (c == dot and (lenient or fraction)) or (lenient and c == comma):
+        # Parse the fractional second, accumulating up to 6 digits of
+        # microseconds and skipping any more if lenient.
+        i += 1
+        start = i
+        usec = 0
+        while i < n:
+            digit = get(s[i])
+            if digit is None:
+                break
+            if i - start < 6:
+                usec = usec * 10 + digit
+            i += 1
+        num_digits = i - start
+        if num_digits == 0 or (num_digits > 6 and not lenient):
+            return False
+        if len(values) > TM_USEC_I:
+            values[TM_USEC_I] = usec * MICROSECOND_MULTIPLIERS[
+                min(num_digits, 6)]
+        if i == n:
+            return zone is None or zone == ISO8601_ANY_ZONE
+        c = s[i]
+    elif fraction:
+        return False
+    if zone is None:
+        return False
+    if c == z or (lenient and c == lower_z):
+        # Match a 'Z' zone designator.
+        if zone != DIRECTIVES.TIME_ZONE and zone != ISO8601_ANY_ZONE:
+            return False
+        i += 1
+    elif c == plus or c == minus:
+        # Match a +HH:MM/-HH:MM offset, or if lenient, +HHMM/-HHMM in the basic
+        # format.
+        if zone != DIRECTIVES.TIME_ZONE_OFFSET and zone != ISO8601_ANY_ZONE:
+            return False
+        if lenient and not extended and i + 5 == n:
+            offset_hours = parse_two_digits(s, i + 1)
+            offset_minutes = parse_two_digits(s, i + 3)
+            end = i + 5
+        elif i + 6 <= n and s[i + 3] == time_sep:
+            offset_hours = parse_two_digits(s, i + 1)
+            offset_minutes = parse_two_digits(s, i + 4)
+            end = i + 6
+        else:
+            return False
+        if offset_hours < 0 or offset_minutes < 0:
+            return False
+        offset = offset_hours * 60 + offset_minutes
+        if gmtoff:
+            values[TM_GMTOFF_I] = offset * 60 if c == plus else -offset * 60
+        else:
+            values[TM_MIN_I] -= offset if c == plus else -offset
+        i = end
+    else:
+        return False
+    return i == n
 
-def strptime(date_string, format):
-    """Attempt to parse the date_string as the specified format and return a
-    struct_time tuple, or None if parsing fails.
+###############################################################################
+# Format Compiler
+###############################################################################
+
+# The maximum number of compiled formats that strptime() keeps in its cache.
+FORMAT_CACHE_SIZE = 32
+
+def compile_format(format, ignore_case=False, utc=True):
+    """Return the list of steps that strptime() needs to perform in order to
+    parse a string as the specified format, matching names (and AM/PM and 'Z')
+    case-insensitively if ignore_case, and if not utc, accumulating any UTC
+    offset into the TM_GMTOFF field rather than the time.
+
+    Each step is a tuple in the format:
+    ( <directive>, <parser>, <arg>, <convert-func>, <integer-spec> ) where,
+    for a run of literal characters, <directive> and <parser> are None and
+    <arg> is the string to match, and for a directive, <parser> is the
+    directive parser, <arg> is the index of the struct_time field to which
+    the converted value is added, or None if the value is to be discarded, and
+    <integer-spec> is the directive's DIRECTIVE_INTEGER_SPEC_MAP value, or None
+    if it's not an integer.
     """
+    steps = []
+    literal = ''
     i = 0
     format_len = len(format)
-    # Iterate through the format string, applying parsers and matching literal
-    # chars as appropriate.
-    struct_time_d = {}
     while i < format_len:
         c = format[i]
-        # If the character is not the start of a directive, attempt to match a
-        # literal character.
+        i += 1
+        # Accumulate literal chars.
         if c != '%':
-            if date_string[0] != c:
-                return None
-            date_string = date_string[1:]
+            literal += c
+            continue
+        # Read the next character of the directive, letting an IndexError
+        # raise if format is exhausted/malformed.
+        directive = format[i]
+        i += 1
+        # Raise a ValueError just like the built-in datetime.strptime()
+        # if the directive is invalid.
+        if directive not in DIRECTIVE_PARSER_MAP:
+            raise ValueError("{} is a bad directive in format {}".format(
+                repr(directive), repr(format)))
+        # A PERCENT directive is just a literal '%'.
+        if directive == DIRECTIVES.PERCENT:
+            literal += '%'
+            continue
+        # Get the parser.
+        if ignore_case and directive in DIRECTIVE_IGNORE_CASE_PARSER_MAP:
+            parser = DIRECTIVE_IGNORE_CASE_PARSER_MAP[directive]
         else:
-            # Read the next character of the directive, letting an IndexError
-            # raise if format is exhausted/malformed.
-            i += 1
-            directive = format[i]
-            # Raise a ValueError just like the built-in datetime.strptime()
-            # if the directive is invalid.
-            if directive not in DIRECTIVE_PARSER_MAP:
-                raise ValueError("{} is a bad directive in format {}".format(
-                    repr(directive[1]), repr(directive)))
-            # Get the parser.
             parser = DIRECTIVE_PARSER_MAP[directive]
-            # Check whether the parser is yet to be implemented.
-            if parser is NOT_IMPLEMENTED:
-                raise NotImplementedError(
-                    'parser not defined for directive: {}'.format(directive)
-                )
-            # Do the parsing.
-            result = parser(date_string)
-            # Return None on any parsing failure.
-            if result is False:
-                return None
-            value, date_string = result
-            # Convert the directive value to a struct_time item.
-            struct_time_item = directive_to_struct_time_item(directive, value)
-            if struct_time_item is not None:
-                k, v = struct_time_item
-                # If the key already exists, accumulate, otherwise set.
-                if k in struct_time_d:
-                    struct_time_d[k] += v
-                else:
-                    struct_time_d[k] = v
-        i += 1
+        # Check whether the parser is yet to be implemented.
+        if parser is NOT_IMPLEMENTED:
+            raise NotImplementedError(
+                'parser not defined for directive: {}'.format(directive)
+            )
+        # Flush any pending literal.
+        if literal:
+            steps.append((None, None, literal, None, None))
+            literal = ''
+        # Resolve the struct_time field index and converter.
+        spec = DIRECTIVE_INTEGER_SPEC_MAP.get(directive)
+        if not utc and directive in DIRECTIVE_LOCAL_STRUCT_TIME_ITEM_MAP:
+            item = DIRECTIVE_LOCAL_STRUCT_TIME_ITEM_MAP[directive]
+        else:
+            item = DIRECTIVE_STRUCT_TIME_ITEM_MAP[directive]
+        if item is None:
+            steps.append((directive, parser, None, None, spec))
+        else:
+            k, convert = item
+            steps.append((directive, parser,
+                          STRUCT_TIME_GMTOFF_FIELDS.index(k), convert, spec))
+    if literal:
+        steps.append((None, None, literal, None, None))
+    return steps
 
-    # Return None if the date string has not been completely consumed.
-    if len(date_string) > 0:
-        return None
+def encode_steps(steps):
+    """Return a copy of the compile_format() steps for parsing bytes-like
+    input, with literals UTF-8 encoded.
+    """
+    return [
+        (directive, parser, arg.encode(), convert, spec) if parser is None
+        else (directive, parser, arg, convert, spec)
+        for directive, parser, arg, convert, spec in steps
+    ]
 
-    # Return None if a +12 hour AM_PM = 'PM' accumulation overflowed a parsed
+def compile_strftime_plan(steps):
+    """Return the ( <template>, <formatters>, <ranges> ) tuple with which
+    strftime() formats a struct_time as the format of the compile_format()
+    steps, where <template> is a str.format() template with a replacement
+    field for each directive, <formatters> is the list of the directive
+    formatters, and <ranges> is the list of the ( <index>, <min>, <max> )
+    ranges of the fields that they format, each field's intersected into one.
+    """
+    template = ''
+    formatters = []
+    ranges = {}
+    for directive, parser, arg, _, _ in steps:
+        if parser is None:
+            template += arg.replace('{', '{{').replace('}', '}}')
+        else:
+            template += '{}'
+            formatters.append(DIRECTIVE_FORMATTER_MAP[directive])
+            for index, _min, _max in \
+                    DIRECTIVE_FORMATTER_RANGE_MAP.get(directive, ()):
+                prev_min, prev_max = ranges.get(index, (_min, _max))
+                ranges[index] = (max(_min, prev_min), min(_max, prev_max))
+    return template, formatters, [
+        (index, _min, _max) for index, (_min, _max) in ranges.items()]
+
+def resolve_values(values, has_date, has_year_day, first_day_of_week=None,
+                   lazy=False):
+    """Validate the parsed struct_time field values, derive any missing date
+    fields, normalize any time zone offset adjustment, and return a bool
+    indicating whether the values are valid.
+    has_date and has_year_day indicate whether the values include a full date
+    or a year and day of year respectively, and first_day_of_week, if not
+    None, indicates that they include a year, a day of week, and, in place of
+    the day of year, a week of year whose weeks start on that day.
+    If lazy, the day of week and day of year of a full date that needs no
+    normalization are left for the caller to derive.
+    """
+    # Fail if a +12 hour AM_PM = 'PM' accumulation overflowed a parsed
     # HOUR_24 value.
-    if not (0 <= struct_time_d.get(STRUCT_TIME.TM_HOUR, 0) <= 23):
+    if not 0 <= values[TM_HOUR_I] <= 23:
+        return False
+
+    if first_day_of_week is not None:
+        # Derive the date from the week of year and day of week, which may
+        # fall in the previous or next year.
+        year = values[TM_YEAR_I]
+        day_of_year = week_of_year_to_day_of_year(
+            year, values[TM_YDAY_I], values[TM_WDAY_I], first_day_of_week)
+        if 1 <= day_of_year <= days_in_year(year):
+            month, day = day_of_year_to_month_day(year, day_of_year)
+        else:
+            year, month, day = civil_from_days(
+                days_from_civil(year, 1, 1) + day_of_year - 1)
+            values[TM_YEAR_I] = year
+        values[TM_MON_I] = month
+        values[TM_MDAY_I] = day
+    elif has_year_day:
+        # Derive the month and day from the day of year, failing if the day of
+        # year is not valid for the year.
+        year, day_of_year = values[TM_YEAR_I], values[TM_YDAY_I]
+        if not 1 <= day_of_year <= days_in_year(year):
+            return False
+        month, day = day_of_year_to_month_day(year, day_of_year)
+        values[TM_MON_I] = month
+        values[TM_MDAY_I] = day
+    elif has_date:
+        year, month, day = values[TM_YEAR_I], values[TM_MON_I], \
+            values[TM_MDAY_I]
+        if lazy and 0 <= values[TM_MIN_I] <= 59:
+            # Just validate the date.
+            if not (1 <= month <= 12
+                    and 1 <= day <= days_in_month(year, month)):
+                return False
+            return True
+    else:
+        return True
+
+    # Get the derived calendar fields, failing if the specified month or day is
+    # not valid.
+    get_fields = calendar_fields if _calendar_cache is None \
+        else _calendar_cache.get
+    fields = get_fields(year, month, day)
+    if fields is None:
+        return False
+
+    # Check whether accumulated minute value exceeds its max as a result of
+    # accumulating a time zone offset, requiring some calendar day math.
+    minute = values[TM_MIN_I]
+    if not 0 <= minute <= 59:
+        # Carry the minutes into the hours.
+        hour, minute = divmod(minute, 60)
+        hour += values[TM_HOUR_I]
+        values[TM_MIN_I] = minute
+        if 0 <= hour <= 23:
+            # The date is unchanged.
+            values[TM_HOUR_I] = hour
+        else:
+            # Carry the hours into the days and normalize the date via its
+            # epoch day.
+            carry, values[TM_HOUR_I] = divmod(hour, 24)
+            year, month, day = civil_from_days(fields[2] + carry)
+            values[TM_YEAR_I] = year
+            values[TM_MON_I] = month
+            values[TM_MDAY_I] = day
+            fields = get_fields(year, month, day)
+
+    values[TM_WDAY_I] = fields[0]
+    values[TM_YDAY_I] = fields[1]
+    return True
+
+class CompiledFormat:
+    """A strptime() format compiled into a reusable list of parsing steps.
+    """
+    def __init__(self, format, ignore_case=False, lazy=False, utc=True):
+        self.format = format
+        self.ignore_case = ignore_case
+        self.lazy = lazy
+        self.utc = utc
+        steps = compile_format(format, ignore_case, utc)
+        # Determine up front whether this format yields a full date.
+        indices = set(
+            step[2] for step in steps if step[1] is not None
+            and step[0] not in DIRECTIVE_FIRST_DAY_OF_WEEK_MAP
+        )
+        self.has_date = (TM_YEAR_I in indices and TM_MON_I in indices
+                         and TM_MDAY_I in indices)
+        # Determine whether the month and day need to be derived from a year
+        # and day of year.
+        self.has_year_day = (not self.has_date and TM_YEAR_I in indices
+                             and TM_YDAY_I in indices)
+        # Determine whether the date needs to be derived from a year, week of
+        # year and day of week, in which case the first week of year directive
+        # accumulates into the TM_YDAY value and any others are discarded.
+        self.first_day_of_week = None
+        has_year_week_day = (
+            TM_YEAR_I in indices and TM_WDAY_I in indices
+            and not self.has_date and TM_YDAY_I not in indices
+        )
+        for k, step in enumerate(steps):
+            if step[0] in DIRECTIVE_FIRST_DAY_OF_WEEK_MAP:
+                if has_year_week_day and self.first_day_of_week is None:
+                    self.first_day_of_week = \
+                        DIRECTIVE_FIRST_DAY_OF_WEEK_MAP[step[0]]
+                else:
+                    steps[k] = (step[0], step[1], None, step[3], step[4])
+        self.steps = steps
+        self.bytes_steps = encode_steps(steps)
+        # A format with microseconds yields a struct_time_usec, for which
+        # the parsed values need an extra field.
+        self.has_usec = TM_USEC_I in indices
+        if not utc:
+            # A local time format yields a struct_time_gmtoff.
+            self.num_fields = len(STRUCT_TIME_GMTOFF_FIELDS)
+            self.result_type = struct_time_gmtoff
+        elif self.has_usec:
+            self.num_fields = len(STRUCT_TIME_USEC_FIELDS)
+            self.result_type = struct_time_usec
+        else:
+            self.num_fields = len(STRUCT_TIME_FIELDS)
+            self.result_type = struct_time
+        # A lazy format of a full date yields a lazy_struct_time, which
+        # derives the day of week and day of year only if they're read.
+        if lazy and self.has_date:
+            self.result_type = lazy_struct_time
+        # Get the ( <extended>, <zone>, <fraction> ) options for the ISO 8601
+        # fast path, or None if it's not equivalent to this format.
+        self.iso8601 = None if ignore_case else ISO8601_FORMATS.get(format)
+        # Compile the strftime() plan on first use.
+        self._strftime_plan = None
+        # Map each tuple of field names passed to strptime() to its
+        # ( <extract-func>, <lazy> ) plan.
+        self._fields_plans = {}
+
+    def __repr__(self):
+        options = ''
+        if self.ignore_case:
+            options += ', ignore_case=True'
+        if self.lazy:
+            options += ', lazy=True'
+        if not self.utc:
+            options += ', utc=False'
+        return 'CompiledFormat({}{})'.format(repr(self.format), options)
+
+    def _parse_into(self, date_string, values, lazy=None):
+        # Attempt to parse the date_string, a str or bytes-like object, as this
+        # format into values, a zero-initialized mutable sequence of
+        # num_fields struct_time field values, and return a bool indicating
+        # whether parsing succeeded. lazy, if not None, overrides the format's
+        # lazy option.
+        if self.iso8601 is not None:
+            # Use the ISO 8601 fast path.
+            extended, zone, fraction = self.iso8601
+            if not parse_iso8601_fields(date_string, values, extended, zone,
+                                        False, fraction, not self.utc):
+                return False
+        elif not self._match_steps(date_string, values):
+            return False
+        return resolve_values(values, self.has_date, self.has_year_day,
+                              self.first_day_of_week,
+                              self.lazy if lazy is None else lazy)
+
+    def _match_steps(self, date_string, values):
+        # Apply the steps to date_string, accumulating the parsed values into
+        # values, and return a bool indicating whether they all matched and
+        # date_string was completely consumed.
+        # Track the offset of the next unparsed char rather than slicing
+        # date_string so that no intermediate strings are created.
+        i = 0
+        end = len(date_string)
+        steps = self.steps if isinstance(date_string, str) else \
+            self.bytes_steps
+        for _, parser, arg, convert, spec in steps:
+            if parser is None:
+                # Match a run of literal characters.
+                n = len(arg)
+                if i + n > end:
+                    return False
+                k = 0
+                while k < n:
+                    if date_string[i] != arg[k]:
+                        return False
+                    i += 1
+                    k += 1
+                continue
+            if spec is not None:
+                # Inline the integer parser to avoid creating a result tuple.
+                _len, _max, _min = spec
+                if i + _len > end:
+                    return False
+                value = 0
+                j = i
+                i += _len
+                while j < i:
+                    digit = DIGIT_VALUES.get(date_string[j])
+                    if digit is None:
+                        return False
+                    value = value * 10 + digit
+                    j += 1
+                if not _min <= value <= _max:
+                    return False
+            else:
+                # Do the parsing.
+                result = parser(date_string, i)
+                # Fail on any parsing failure.
+                if result is False:
+                    return False
+                value, i = result
+            # Accumulate the converted value into its struct_time field.
+            if arg is not None:
+                values[arg] += value if convert is None else convert(value)
+
+        # Fail if the date string has not been completely consumed.
+        return i == end
+
+    def _fields_plan(self, fields):
+        # Return the ( <extract-func>, <lazy> ) plan for extracting the fields,
+        # where <extract-func> returns the tuple of their values from the
+        # parsed values and <lazy> indicates that none of them is to be
+        # derived.
+        plan = self._fields_plans.get(fields)
+        if plan is None:
+            names = STRUCT_TIME_GMTOFF_FIELDS[:self.num_fields]
+            for k in fields:
+                if k not in names:
+                    raise ValueError('{} is not a field of format {}'.format(
+                        repr(k), repr(self.format)))
+            indices = tuple(names.index(k) for k in fields)
+            if len(indices) == 1:
+                i = indices[0]
+                extract = lambda values: (values[i],)
+            else:
+                extract = lambda values: tuple([values[i] for i in indices])
+            plan = (extract,
+                    TM_WDAY_I not in indices and TM_YDAY_I not in indices)
+            self._fields_plans[fields] = plan
+        return plan
+
+    def strptime(self, date_string, fields=None):
+        """Attempt to parse the date_string as this format and return a
+        struct_time tuple, or None if parsing fails.
+        If fields, a tuple of STRUCT_TIME_FIELDS names, is specified, return
+        the tuple of just those field values instead, deriving tm_wday and
+        tm_yday only if they're among them.
+        """
+        values = [0] * self.num_fields
+        if fields is None:
+            if not self._parse_into(date_string, values):
+                return None
+            return self.result_type(*values)
+        extract, lazy = self._fields_plan(fields)
+        if not self._parse_into(date_string, values, lazy):
+            return None
+        return extract(values)
+
+    def matches(self, date_string):
+        """Return a bool indicating whether the date_string matches this
+        format, including the validity of its date, without building a
+        result.
+        """
+        return self._parse_into(date_string, [0] * self.num_fields, True)
+
+    def strptime_into(self, date_string, out):
+        """Attempt to parse the date_string as this format into out, a
+        preallocated mutable sequence of at least num_fields ints, such as an
+        array('h'), or an array('i') for a format with microseconds, and
+        return a bool indicating whether parsing succeeded, in which case out
+        holds the struct_time field values, in order.
+        A full date with integer directives only, or via the ISO 8601 fast
+        path, is parsed from a bytes-like date_string without allocating,
+        unless a time zone offset carries it into another day.
+        """
+        n = self.num_fields
+        if len(out) < n:
+            raise ValueError('out must have at least {} items'.format(n))
+        # Zero the fields without creating a range object.
+        i = 0
+        while i < n:
+            out[i] = 0
+            i += 1
+        if not self._parse_into(date_string, out, True):
+            return False
+        if self.has_date:
+            # Derive the fields deferred by the lazy resolution, which would
+            # otherwise allocate a calendar_fields() tuple.
+            year = out[TM_YEAR_I]
+            day_of_year = days_before_month_table(year)[out[TM_MON_I]] \
+                + out[TM_MDAY_I]
+            out[TM_WDAY_I] = (days_before_year(year) + day_of_year - 1) % 7
+            out[TM_YDAY_I] = day_of_year
+        return True
+
+    def strftime(self, _struct_time):
+        """Return the struct_time formatted as this format.
+        """
+        plan = self._strftime_plan
+        if plan is None:
+            plan = self._strftime_plan = compile_strftime_plan(self.steps)
+        template, formatters, ranges = plan
+        # Check the range of each formatted field, which would otherwise be
+        # silently wrapped by a negative index, or fail with a KeyError or
+        # IndexError.
+        for index, _min, _max in ranges:
+            if not _min <= _struct_time[index] <= _max:
+                raise ValueError('{} out of range: {}'.format(
+                    STRUCT_TIME_GMTOFF_FIELDS[index], _struct_time[index]))
+        # Format all of the fields with a single str.format() call.
+        return template.format(*[f(_struct_time) for f in formatters])
+
+_format_cache = LRUCache(FORMAT_CACHE_SIZE)
+
+###############################################################################
+# Columnar Results
+###############################################################################
+
+# Map each column array typecode to its item size in bytes.
+TYPECODE_ITEM_SIZES = {'h': 2, 'i': 4, 'q': 8}
+
+# The typecode of the struct_time field columns, which are all in the range
+# of a signed 16-bit integer.
+STRUCT_TIME_COLUMN_TYPECODE = 'h'
+
+# The typecode of the epoch seconds column.
+EPOCH_SECONDS_COLUMN_TYPECODE = 'q'
+
+# The typecode of the microseconds column.
+USEC_COLUMN_TYPECODE = 'i'
+
+# The typecode of the UTC offset seconds column.
+GMTOFF_COLUMN_TYPECODE = 'i'
+
+def zeros_array(typecode, size):
+    """Return a zero-filled array of the specified typecode and size.
+    """
+    # Both CPython and MicroPython copy a bytes initializer verbatim.
+    return array(typecode, bytes(TYPECODE_ITEM_SIZES[typecode] * size))
+
+class StructTimeColumns:
+    """A preallocated, fixed-size table of parse results stored as one array
+    per STRUCT_TIME_FIELDS field, or as a single epoch_seconds array, and if
+    usec, a tm_usec array, and if gmtoff, a tm_gmtoff array, along with a
+    validity bitmap.
+    """
+    def __init__(self, size, epoch_seconds=False, usec=False, gmtoff=False):
+        self.size = size
+        self.length = 0
+        self.epoch_seconds = None
+        self.columns = ()
+        self.tm_usec = zeros_array(USEC_COLUMN_TYPECODE, size) if usec \
+            else None
+        self.tm_gmtoff = zeros_array(GMTOFF_COLUMN_TYPECODE, size) if gmtoff \
+            else None
+        if epoch_seconds:
+            self.epoch_seconds = zeros_array(
+                EPOCH_SECONDS_COLUMN_TYPECODE, size)
+        else:
+            # Expose each field column as an attribute of the same name.
+            self.columns = tuple(
+                zeros_array(STRUCT_TIME_COLUMN_TYPECODE, size)
+                for _ in STRUCT_TIME_FIELDS
+            )
+            for k, column in zip(STRUCT_TIME_FIELDS, self.columns):
+                setattr(self, k, column)
+        # Bit (i % 8) of byte (i // 8) is set if row i parsed successfully.
+        self.valid = bytearray((size + 7) // 8)
+
+    def __len__(self):
+        return self.length
+
+    def is_valid(self, i):
+        return bool(self.valid[i >> 3] & (1 << (i & 7)))
+
+    def __getitem__(self, i):
+        # Return row i as a struct_time, or None if it failed to parse.
+        if not 0 <= i < self.length:
+            raise IndexError('row index out of range: {}'.format(i))
+        if not self.is_valid(i):
+            return None
+        if self.epoch_seconds is not None:
+            _struct_time = gmtime(self.epoch_seconds[i])
+        else:
+            _struct_time = struct_time(*[column[i] for column in self.columns])
+        if self.tm_usec is None and self.tm_gmtoff is None:
+            return _struct_time
+        values = tuple(_struct_time) + (
+            0 if self.tm_usec is None else self.tm_usec[i],)
+        if self.tm_gmtoff is None:
+            return struct_time_usec(*values)
+        return struct_time_gmtoff(*(values + (self.tm_gmtoff[i],)))
+
+    def clear(self):
+        # Reset the length and validity bitmap to allow the columns to be
+        # reused. Stale values are overwritten as new rows are added.
+        self.length = 0
+        valid = self.valid
+        for i in range(len(valid)):
+            valid[i] = 0
+
+###############################################################################
+# Incremental Parser
+###############################################################################
+
+class IncrementalParser:
+    """A stateful parser for a stream of date strings of a single format, e.g.
+    consecutive log timestamps, that only re-parses the directives that follow
+    the first char at which each date string differs from the previous one.
+    """
+    def __init__(self, format):
+        compiled = to_compiled_format(format)
+        self.compiled = compiled
+        steps = compiled.steps
+        # The struct_time field index, if any, of each step.
+        self._indices = [None if step[1] is None else step[2]
+                         for step in steps]
+        # The index of the first step after the last one that contributes to
+        # the date, from which a re-parse can reuse the previous date fields.
+        date_indices = (TM_YEAR_I, TM_MON_I, TM_MDAY_I, TM_YDAY_I)
+        if compiled.first_day_of_week is not None:
+            date_indices += (TM_WDAY_I,)
+        self._time_step = 0
+        for k, index in enumerate(self._indices):
+            if index in date_indices:
+                self._time_step = k + 1
+        # Whether each step's parser may examine the char at its end offset,
+        # as %f does to find the end of its digits.
+        self._greedy = [step[0] == DIRECTIVES.MICROSECOND for step in steps]
+        # The end offset and accumulated value of each step in the previous
+        # date string.
+        self._ends = [0] * len(steps)
+        self._values = [0] * len(steps)
+        self.reset()
+
+    def __repr__(self):
+        return 'IncrementalParser({})'.format(repr(self.compiled))
+
+    def reset(self):
+        """Forget the previous date string.
+        """
+        self._prev = None
+        self._prev_result = None
+        # The previous date string up to the end of its date steps.
+        self._prefix = ''
+        # The resolved ( <year>, <month>, <day>, <weekday>, <day of year> ) of
+        # the previous date string, or None if it has no date, and the number
+        # of days into which its time carried.
+        self._date = None
+        self._carry = 0
+
+    def strptime(self, date_string):
+        """Attempt to parse the date_string, a str or bytes-like object, as
+        this parser's format and return a struct_time tuple, or None if parsing
+        fails.
+        """
+        prev = self._prev
+        ends = self._ends
+        step_values = self._values
+        indices = self._indices
+        # Find the first step that isn't wholly within the prefix that
+        # date_string shares with the previous date string. Every parser only
+        # examines the chars between its start and end offsets, or for a
+        # greedy parser also the char at its end offset, so the steps before
+        # it would match exactly as they did before.
+        greedy = self._greedy
+        k = 0
+        num_steps = len(ends)
+        if prev is not None:
+            n = min(len(prev), len(date_string))
+            # Compare the date prefix, which rarely changes, in one go before
+            # comparing the remaining chars one by one.
+            prefix = self._prefix
+            p = len(prefix) if date_string[:len(prefix)] == prefix else 0
+            while p < n and date_string[p] == prev[p]:
+                p += 1
+            if p == len(prev) == len(date_string):
+                return self._prev_result
+            while k < num_steps and (ends[k] < p
+                                     or ends[k] == p and not greedy[k]):
+                k += 1
+        start = k
+        # Reapply the values of the reused steps.
+        values = [0] * self.compiled.num_fields
+        j = 0
+        while j < k:
+            index = indices[j]
+            if index is not None:
+                values[index] += step_values[j]
+            j += 1
+        i = ends[k - 1] if k else 0
+        end = len(date_string)
+        steps = self.compiled.steps if isinstance(date_string, str) else \
+            self.compiled.bytes_steps
+        # Forget the previous date string, whose step offsets and values are
+        # overwritten below, until parsing succeeds.
+        self._prev = None
+        # Apply the remaining steps, as CompiledFormat._match_steps() does but
+        # recording the end offset and value of each.
+        while k < num_steps:
+            _, parser, arg, convert, spec = steps[k]
+            value = 0
+            if parser is None:
+                n = len(arg)
+                if i + n > end:
+                    return None
+                j = 0
+                while j < n:
+                    if date_string[i] != arg[j]:
+                        return None
+                    i += 1
+                    j += 1
+            elif spec is not None:
+                _len, _max, _min = spec
+                if i + _len > end:
+                    return None
+                j = i
+                i += _len
+                while j < i:
+                    digit = DIGIT_VALUES.get(date_string[j])
+                    if digit is None:
+                        return None
+                    value = value * 10 + digit
+                    j += 1
+                if not _min <= value <= _max:
+                    return None
+            else:
+                result = parser(date_string, i)
+                if result is False:
+                    return None
+                value, i = result
+            if arg is not None and parser is not None:
+                if convert is not None:
+                    value = convert(value)
+                values[arg] += value
+            ends[k] = i
+            step_values[k] = value
+            k += 1
+        if i != end:
+            return None
+
+        compiled = self.compiled
+        hour = values[TM_HOUR_I]
+        minute = values[TM_MIN_I]
+        # Get the number of days into which the time carries after any time
+        # zone offset adjustment of the minutes, as resolve_values() does.
+        carried_hour = hour + minute // 60
+        carry = carried_hour // 24
+        if (self._date is not None and start >= self._time_step
+                and 0 <= hour <= 23 and carry == self._carry):
+            # The date steps were reused and the time carries into the same
+            # day as before, so reuse the previously resolved date fields.
+            values[TM_HOUR_I] = carried_hour % 24
+            values[TM_MIN_I] = minute % 60
+            values[TM_YEAR_I], values[TM_MON_I], values[TM_MDAY_I], \
+                values[TM_WDAY_I], values[TM_YDAY_I] = self._date
+        else:
+            if not resolve_values(values, compiled.has_date,
+                                  compiled.has_year_day,
+                                  compiled.first_day_of_week):
+                return None
+            if (compiled.has_date or compiled.has_year_day
+                    or compiled.first_day_of_week is not None):
+                self._date = (
+                    values[TM_YEAR_I], values[TM_MON_I], values[TM_MDAY_I],
+                    values[TM_WDAY_I], values[TM_YDAY_I]
+                )
+                self._carry = carry
+        result = compiled.result_type(*values)
+        # Keep an immutable copy of a mutable input.
+        prev = date_string if isinstance(date_string, (str, bytes)) \
+            else bytes(date_string)
+        if start < self._time_step:
+            self._prefix = prev[:ends[self._time_step - 1]]
+        self._prev = prev
+        self._prev_result = result
+        return result
+
+###############################################################################
+# Multi-Format Parser
+###############################################################################
+
+DIGIT_CHARS = '0123456789'
+
+# Map each directive that is neither an integer nor a name directive to its
+# ( <min-width>, <max-width>, <chars> ) pattern, where <chars> is the string
+# of chars that may occur at each of its leading offsets.
+DIRECTIVE_PATTERN_MAP = {
+    DIRECTIVES.TIME_ZONE_OFFSET: (
+        6, 6, ('+-', DIGIT_CHARS, DIGIT_CHARS, ':', DIGIT_CHARS, DIGIT_CHARS)
+    ),
+    DIRECTIVES.MICROSECOND: (1, 6, (DIGIT_CHARS,)),
+}
+
+def step_pattern(step, ignore_case=False, as_bytes=False):
+    """Return the ( <min-width>, <max-width>, <char-sets> ) pattern of the
+    input that a compile_format() or encode_steps() step can match, where
+    <char-sets> is the list of the sets of chars, or bytes items if as_bytes,
+    that may occur at each of its leading offsets, with None for any.
+    """
+    directive, parser, arg, _, spec = step
+    if parser is None:
+        # Iterating a literal yields str chars or, if encoded, ints.
+        return len(arg), len(arg), [set((c,)) for c in arg]
+    if spec is not None:
+        _min = _max = spec[0]
+        chars = (DIGIT_CHARS,) * _max
+    elif directive in DIRECTIVE_NAMES_MAP:
+        names = DIRECTIVE_NAMES_MAP[directive][0]
+        _min = min(len(name) for name in names)
+        _max = max(len(name) for name in names)
+        first = ''.join(name[0] for name in names)
+        if ignore_case:
+            first = first.lower() + first.upper()
+        chars = (first,)
+    else:
+        _min, _max, chars = DIRECTIVE_PATTERN_MAP[directive]
+    char_sets = [set(ord(c) for c in s) if as_bytes else set(s)
+                 for s in chars]
+    return _min, _max, char_sets + [None] * (_min - len(char_sets))
+
+def format_length_constraints(steps, ignore_case=False, as_bytes=False):
+    """Return a dict that maps each length of input that the steps can match
+    to a dict that maps the offsets at which the input is constrained to the
+    sets of chars that may occur there.
+    The chars of the steps before the first variable width step are at fixed
+    offsets from the start, and those of the steps after the last one at fixed
+    offsets from the end.
+    """
+    patterns = [step_pattern(step, ignore_case, as_bytes) for step in steps]
+    min_len = sum(pattern[0] for pattern in patterns)
+    max_len = sum(pattern[1] for pattern in patterns)
+    # Collect the char sets at the offsets from the start.
+    head = []
+    for _min, _max, char_sets in patterns:
+        if _min != _max:
+            # Only the leading chars of a variable width step are fixed.
+            head.extend(char_sets)
+            break
+        head.extend(char_sets)
+    # Collect the char sets at the offsets from the end, last first.
+    tail = []
+    if min_len != max_len:
+        for _min, _max, char_sets in reversed(patterns):
+            if _min != _max:
+                break
+            tail.extend(reversed(char_sets))
+    length_constraints = {}
+    for length in range(min_len, max_len + 1):
+        constraints = {}
+        for i, char_set in enumerate(head):
+            if char_set is not None:
+                constraints[i] = char_set
+        for k, char_set in enumerate(tail):
+            i = length - 1 - k
+            if char_set is None:
+                continue
+            if i in constraints:
+                char_set = constraints[i] & char_set
+            constraints[i] = char_set
+        # Skip a length at which the head and tail conflict.
+        if all(constraints.values()):
+            length_constraints[length] = constraints
+    return length_constraints
+
+def build_decision_tree(candidates):
+    """Return the decision tree that selects, from the list of
+    ( <index>, <constraints> ) candidates, where <constraints> is a
+    format_length_constraints() dict for a single length, those that an input
+    of that length may match.
+    Each node is a tuple in the format: ( <offset>, <branches>, <default> )
+    where <branches> maps the char at <offset> of the input to the next node
+    and <default> is the next node for any other char, and each leaf is a
+    tuple in the format: ( None, <indices>, None ) where <indices> is the tuple
+    of the indices of the remaining candidates, in their original order.
+    """
+    if len(candidates) > 1:
+        # Find the offset whose largest branch has the fewest candidates.
+        offsets = set()
+        for _, constraints in candidates:
+            offsets.update(constraints)
+        best = None
+        for i in sorted(offsets):
+            keys = set()
+            for _, constraints in candidates:
+                keys.update(constraints.get(i, ()))
+            worst = max(
+                sum(1 for _, constraints in candidates
+                    if key in constraints.get(i, (key,)))
+                for key in keys
+            )
+            if best is None or worst < best[0]:
+                best = (worst, i, keys)
+        if best is not None and best[0] < len(candidates):
+            _, i, keys = best
+            # Group the keys by the candidates they select so that the keys
+            # of each group share a subtree.
+            groups = {}
+            for key in keys:
+                members = tuple(
+                    k for k, (_, constraints) in enumerate(candidates)
+                    if key in constraints.get(i, (key,))
+                )
+                groups.setdefault(members, []).append(key)
+            members = tuple(k for k, (_, constraints) in enumerate(candidates)
+                            if i not in constraints)
+            groups.setdefault(members, [])
+            branches = {}
+            default = None
+            for members, group_keys in groups.items():
+                node = build_decision_tree([
+                    (candidates[k][0],
+                     dict((j, char_set) for j, char_set
+                          in candidates[k][1].items() if j != i))
+                    for k in members
+                ])
+                for key in group_keys:
+                    branches[key] = node
+                if all(i not in candidates[k][1] for k in members):
+                    default = node
+            return i, branches, default
+    return None, tuple(index for index, _ in candidates), None
+
+def build_length_trees(formats, as_bytes=False):
+    """Return a dict that maps each input length that any of the
+    CompiledFormats can match to the build_decision_tree() tree for the
+    formats, in order, that can match that length.
+    """
+    length_candidates = {}
+    for index, compiled in enumerate(formats):
+        steps = compiled.bytes_steps if as_bytes else compiled.steps
+        length_constraints = format_length_constraints(
+            steps, compiled.ignore_case, as_bytes)
+        for length, constraints in length_constraints.items():
+            length_candidates.setdefault(length, []).append(
+                (index, constraints))
+    return {
+        length: build_decision_tree(candidates)
+        for length, candidates in length_candidates.items()
+    }
+
+class MultiFormatParser:
+    """A parser for date strings that may be in any of several formats, which
+    compiles them together into decision trees that select, by the length of
+    a date string and the chars at its constrained offsets, the formats that
+    it may match, so that only those are tried.
+    """
+    def __init__(self, formats, ignore_case=False):
+        # The list of CompiledFormats, in the order in which they're tried.
+        self.formats = [
+            format if isinstance(format, CompiledFormat)
+            else compile(format, ignore_case)
+            for format in formats
+        ]
+        self._str_trees = build_length_trees(self.formats)
+        # Build the trees for bytes-like input on first use.
+        self._bytes_trees = None
+
+    def __repr__(self):
+        return 'MultiFormatParser({})'.format(repr(self.formats))
+
+    def candidates(self, date_string):
+        """Return the tuple of the indices within formats of the formats that
+        the date_string, a str or bytes-like object, may match, in order.
+        """
+        if isinstance(date_string, str):
+            trees = self._str_trees
+        else:
+            trees = self._bytes_trees
+            if trees is None:
+                trees = self._bytes_trees = build_length_trees(
+                    self.formats, as_bytes=True)
+        node = trees.get(len(date_string))
+        if node is None:
+            return ()
+        i, branches, default = node
+        while i is not None:
+            i, branches, default = branches.get(date_string[i], default)
+        return branches
+
+    def match(self, date_string):
+        """Attempt to parse the date_string, a str or bytes-like object, as
+        each of the formats that it may match, in order, and return a tuple in
+        the format: ( <index>, <struct_time> ) where <index> is the index
+        within formats of the first format that matched, or None if none did.
+        """
+        formats = self.formats
+        for index in self.candidates(date_string):
+            compiled = formats[index]
+            values = [0] * compiled.num_fields
+            if compiled._parse_into(date_string, values):
+                return index, compiled.result_type(*values)
         return None
 
-    # Attempt to get year/month/day for date ops.
-    year = struct_time_d.get(STRUCT_TIME.TM_YEAR)
-    month = struct_time_d.get(STRUCT_TIME.TM_MON)
-    day = struct_time_d.get(STRUCT_TIME.TM_MDAY)
-    has_date = year is not None and month is not None and day is not None
+    def strptime(self, date_string):
+        """Attempt to parse the date_string as the first of the formats that it
+        matches and return a struct_time tuple, or None if none do.
+        """
+        result = self.match(date_string)
+        return None if result is None else result[1]
+
+###############################################################################
+# Instrumentation
+###############################################################################
 
-    # Return None if the specified day is not valid for the month.
-    if has_date and not is_valid_month_day(year, month, day):
+def diagnose_failure(compiled, date_string):
+    """Return the FAILURES reason why the CompiledFormat failed to parse the
+    date_string.
+    """
+    values = [0] * compiled.num_fields
+    i = 0
+    end = len(date_string)
+    steps = compiled.steps if isinstance(date_string, str) else \
+        compiled.bytes_steps
+    for _, parser, arg, convert, spec in steps:
+        if parser is None:
+            for c in arg:
+                if i >= end:
+                    return FAILURES.TRUNCATED_INPUT
+                if date_string[i] != c:
+                    return FAILURES.LITERAL_MISMATCH
+                i += 1
+            continue
+        if i >= end:
+            return FAILURES.TRUNCATED_INPUT
+        if spec is not None:
+            # Parse any integer of the directive's length and check its range
+            # separately.
+            _len, _max, _min = spec
+            if i + _len > end:
+                return FAILURES.TRUNCATED_INPUT
+            result = parse_integer(date_string, i, _len, 0, 10 ** _len - 1)
+            if result is False:
+                return FAILURES.DIRECTIVE_MISMATCH
+            if not _min <= result[0] <= _max:
+                return FAILURES.INTEGER_RANGE
+        else:
+            result = parser(date_string, i)
+            if result is False:
+                return FAILURES.DIRECTIVE_MISMATCH
+        value, i = result
+        if arg is not None:
+            values[arg] += value if convert is None else convert(value)
+    if i != end:
+        return FAILURES.LEFTOVER_INPUT
+    if not 0 <= values[TM_HOUR_I] <= 23:
+        return FAILURES.HOUR_OVERFLOW
+    return FAILURES.INVALID_MONTH_DAY
+
+class ParseStats:
+    """Counts of the strptime() calls per format and per directive, and of the
+    failures per reason, and optionally the total seconds spent per format.
+    """
+    def __init__(self, timing=False):
+        self.clock = None
+        if timing:
+            try:
+                from time import perf_counter as clock
+            except ImportError:
+                from utime import ticks_us
+                clock = lambda: ticks_us() / 1e6
+            self.clock = clock
+        # Map each format to its directives, for deriving the directive
+        # counts from the format counts.
+        self._directives = {}
+        self.reset()
+
+    def reset(self):
+        """Reset all of the counts to zero.
+        """
+        self.calls = {}
+        self.format_failures = {}
+        self.failures = {}
+        self.seconds = {}
+
+    def record(self, compiled, date_string, ok, seconds=None):
+        """Record a call to the CompiledFormat's parser that did or did not
+        succeed and, if timing, took the specified number of seconds.
+        """
+        format = compiled.format
+        calls = self.calls
+        if format in calls:
+            calls[format] += 1
+        else:
+            calls[format] = 1
+            self._directives[format] = [
+                step[0] for step in compiled.steps if step[1] is not None]
+        if seconds is not None:
+            self.seconds[format] = self.seconds.get(format, 0) + seconds
+        if not ok:
+            self.format_failures[format] = \
+                self.format_failures.get(format, 0) + 1
+            reason = diagnose_failure(compiled, date_string)
+            self.failures[reason] = self.failures.get(reason, 0) + 1
+
+    def snapshot(self):
+        """Return a dict copy of the current counts, e.g. to export from a
+        long-running process, in the format:
+        { 'calls': { <format>: <count> },
+          'directives': { <directive>: <count> },
+          'format_failures': { <format>: <count> },
+          'failures': { <reason>: <count> },
+          'seconds': { <format>: <seconds> } }
+        where the directive counts are the number of times that each directive
+        was part of a call's format.
+        """
+        directives = {}
+        for format, count in self.calls.items():
+            for directive in self._directives[format]:
+                directives[directive] = directives.get(directive, 0) + count
+        return {
+            'calls': dict(self.calls),
+            'directives': directives,
+            'format_failures': dict(self.format_failures),
+            'failures': dict(self.failures),
+            'seconds': dict(self.seconds),
+        }
+
+# The ParseStats that records the strptime() calls, which is None unless
+# enabled via enable_parse_stats().
+_parse_stats = None
+
+# Keep the uninstrumented CompiledFormat._parse_into(), which
+# enable_parse_stats() replaces so that the instrumentation costs nothing
+# while it's disabled.
+uninstrumented_parse_into = CompiledFormat._parse_into
+
+def instrumented_parse_into(self, date_string, values, lazy=None):
+    # Call the uninstrumented CompiledFormat._parse_into() and record the call
+    # in the enabled ParseStats.
+    stats = _parse_stats
+    clock = stats.clock
+    if clock is None:
+        ok = uninstrumented_parse_into(self, date_string, values, lazy)
+        stats.record(self, date_string, ok)
+    else:
+        start = clock()
+        ok = uninstrumented_parse_into(self, date_string, values, lazy)
+        stats.record(self, date_string, ok, clock() - start)
+    return ok
+
+###############################################################################
+# API
+###############################################################################
+
+def directive_to_struct_time_item(directive, value):
+    """Return the struct_time (<key>, <value>) pair for the given matched
+    directive and value.
+    """
+    if directive not in DIRECTIVE_STRUCT_TIME_ITEM_MAP:
+        raise NotImplementedError(
+            'struct_time conversion not defined for directive: {}'
+            .format(directive)
+        )
+    item = DIRECTIVE_STRUCT_TIME_ITEM_MAP[directive]
+    if item is None:
         return None
+    k, convert = item
+    return k, value if convert is None else convert(value)
 
-    # Create an initial struct_time object.
-    _struct_time = struct_time(
-        *[struct_time_d.get(k, 0) for k in STRUCT_TIME_FIELDS]
-    )
+def compile(format, ignore_case=False, lazy=False, utc=True):
+    """Return a CompiledFormat for the specified format and options, reusing a
+    previously compiled one if it's still in the cache.
+    If utc, the default, a UTC offset is applied to the parsed time, otherwise
+    the local time is returned along with the offset as a struct_time_gmtoff.
+    """
+    key = (format, ignore_case, lazy, utc) if ignore_case or lazy or not utc \
+        else format
+    compiled = _format_cache.get(key)
+    if compiled is None:
+        compiled = CompiledFormat(format, ignore_case, lazy, utc)
+        _format_cache.put(key, compiled)
+    return compiled
+
+def to_compiled_format(format):
+    """Return format if it's already a CompiledFormat, otherwise compile it.
+    """
+    return format if isinstance(format, CompiledFormat) else compile(format)
+
+def strptime(date_string, format, fields=None, utc=True):
+    """Attempt to parse the date_string, a str or bytes-like object such as a
+    memoryview slice of a receive buffer, as the specified format and return a
+    struct_time tuple, or None if parsing fails.
+    If fields, a tuple of STRUCT_TIME_FIELDS names, is specified, return the
+    tuple of just those field values instead, e.g. ('tm_hour',), skipping
+    the derivation of tm_wday and tm_yday unless they're among them.
+    If utc, the default, any UTC offset is applied to return the UTC time,
+    otherwise the local time is returned along with the offset as a
+    struct_time_gmtoff, which timegm() converts to UTC epoch seconds.
+    """
+    return compile(format, utc=utc).strptime(date_string, fields)
 
-    if has_date:
-        # Check whether accumulated minute value exceeds its max as a result of
-        # accumulating a time zone offset, requiring some calendar day math.
-        if not 0 <= struct_time_d.get(STRUCT_TIME.TM_MIN, 0) <= 59:
-            # Pass _struct_time along with an empty time_delta to
-            # add_struct_time_time_delta() to take advantage of its
-            # over/underflow logic. Note that add_struct_time_time_delta() will
-            # take care of setting the final day of week / year.
-            _struct_time = add_struct_time_time_delta(
-                _struct_time, time_delta())
+def strptime_into(date_string, format, out):
+    """Attempt to parse the date_string as the specified format, which may be
+    a CompiledFormat to avoid the cache lookup, into out, a preallocated
+    mutable sequence of ints such as an array('h'), and return a bool
+    indicating whether parsing succeeded. See CompiledFormat.strptime_into().
+    """
+    return to_compiled_format(format).strptime_into(date_string, out)
+
+def matches(date_string, format):
+    """Return a bool indicating whether the date_string matches the specified
+    format, including the validity of its date, like
+    strptime(date_string, format) is not None but without building a result.
+    """
+    return compile(format).matches(date_string)
+
+def strftime(format, _struct_time):
+    """Return the struct_time formatted as the specified format, like
+    time.strftime() but without locale support. Note that a struct_time is in
+    UTC, so %z and %Z are formatted as '+00:00' and 'Z' respectively, while
+    a struct_time_gmtoff is formatted at its tm_gmtoff, for which %Z is 'Z'
+    only if it's zero and otherwise the same +HH:MM or -HH:MM as %z.
+    Unlike time.strftime(), %w is formatted as tm_wday, where Monday is 0, so
+    that it round-trips through strptime(), which parses it the same way.
+    Raises ValueError if a formatted field is out of range.
+    """
+    return compile(format).strftime(_struct_time)
+
+def _strptime_many_or_raise(date_strings, compiled):
+    for date_string in date_strings:
+        result = compiled.strptime(date_string)
+        if result is None:
+            # Raise a ValueError just like the built-in datetime.strptime().
+            raise ValueError('time data {} does not match format {}'.format(
+                repr(date_string), repr(compiled.format)))
+        yield result
+
+def strptime_many(date_strings, format, errors=ERRORS.NONE):
+    """Return an iterator that lazily parses each string in the date_strings
+    iterable as the specified format, which is compiled only once, and yields
+    the resulting struct_time tuples.
+    A string that fails to parse is handled as specified by errors, which
+    must be one of the ERRORS values.
+    """
+    compiled = to_compiled_format(format)
+    if errors == ERRORS.NONE:
+        return map(compiled.strptime, date_strings)
+    elif errors == ERRORS.SKIP:
+        return (x for x in map(compiled.strptime, date_strings)
+                if x is not None)
+    elif errors == ERRORS.RAISE:
+        return _strptime_many_or_raise(date_strings, compiled)
+    raise ValueError('invalid errors value: {}'.format(repr(errors)))
+
+def strptime_columns(date_strings, format, columns=None, epoch_seconds=False):
+    """Parse each string in the date_strings iterable as the specified format
+    into consecutive rows of a StructTimeColumns, and return it.
+    If columns is None, a new StructTimeColumns is allocated with a size of
+    len(date_strings), the specified epoch_seconds option, a tm_usec column
+    if the format includes microseconds, and a tm_gmtoff column if it's
+    compiled with utc=False and not epoch_seconds, otherwise rows are appended
+    to columns until either date_strings or its free rows are exhausted.
+    A row that fails to parse has its validity bit cleared and its values left
+    unchanged.
+    """
+    compiled = to_compiled_format(format)
+    if columns is None:
+        columns = StructTimeColumns(len(date_strings), epoch_seconds,
+                                    compiled.has_usec,
+                                    not compiled.utc and not epoch_seconds)
+    if (columns.epoch_seconds is not None
+        and not (compiled.has_date or compiled.has_year_day
+                 or compiled.first_day_of_week is not None)):
+        raise ValueError(
+            'epoch seconds require a format that specifies a full date: {}'
+            .format(repr(compiled.format))
+        )
+    fields = columns.columns
+    seconds_column = columns.epoch_seconds
+    if seconds_column is not None and (compiled.utc or not compiled.lazy):
+        # Epoch seconds need neither a normalized time nor the day of week and
+        # day of year, so parse the local time and subtract the offset from
+        # the seconds instead.
+        compiled = compile(compiled.format, compiled.ignore_case, True, False)
+    parse_into = compiled._parse_into
+    usec_column = columns.tm_usec if compiled.has_usec else None
+    gmtoff_column = None if compiled.utc else columns.tm_gmtoff
+    valid = columns.valid
+    num_fields = compiled.num_fields
+    values = [0] * num_fields
+    i = columns.length
+    size = columns.size
+    for date_string in date_strings:
+        if i >= size:
+            break
+        if parse_into(date_string, values):
+            valid[i >> 3] |= 1 << (i & 7)
+            if seconds_column is not None:
+                seconds_column[i] = (
+                    days_from_civil(values[TM_YEAR_I], values[TM_MON_I],
+                                    values[TM_MDAY_I]) * SECONDS_PER_DAY
+                    + values[TM_HOUR_I] * 3600 + values[TM_MIN_I] * 60
+                    + values[TM_SEC_I] - values[TM_GMTOFF_I]
+                )
+            else:
+                if compiled.lazy and compiled.has_date:
+                    # Derive the fields that a lazy format deferred.
+                    values[TM_WDAY_I], values[TM_YDAY_I], _ = calendar_fields(
+                        values[TM_YEAR_I], values[TM_MON_I],
+                        values[TM_MDAY_I])
+                for j in range(8):
+                    fields[j][i] = values[j]
+            if usec_column is not None:
+                usec_column[i] = values[TM_USEC_I]
+            if gmtoff_column is not None:
+                gmtoff_column[i] = values[TM_GMTOFF_I]
         else:
-            # Calculate the final day of week / year.
-            _struct_time = struct_time_replace(
-                _struct_time,
-                tm_wday=date_to_day_of_week(year, month, day),
-                tm_yday=date_to_day_of_year(year, month, day)
-            )
+            valid[i >> 3] &= ~(1 << (i & 7))
+        # Reset the values for the next row.
+        for j in range(num_fields):
+            values[j] = 0
+        i += 1
+    columns.length = i
+    return columns
+
+def parse_iso8601(date_string):
+    """Attempt to parse the date_string, a str or bytes-like object, as an
+    ISO 8601 / RFC 3339 date and time in either the extended or basic format,
+    with an optional fractional second and an optional 'Z' or UTC offset, and
+    return a UTC struct_time tuple, or a struct_time_usec tuple if it has a
+    fractional second, or None if parsing fails.
+    """
+    # A fractional second overwrites the -1 microseconds.
+    values = [0, 0, 0, 0, 0, 0, 0, 0, -1]
+    if not (parse_iso8601_fields(date_string, values)
+            and resolve_values(values, True, False)):
+        return None
+    if values[TM_USEC_I] < 0:
+        return struct_time(*values[:TM_USEC_I])
+    return struct_time_usec(*values)
+
+def enable_calendar_cache(capacity=CALENDAR_CACHE_SIZE):
+    """Memoize the calendar fields that strptime() and
+    add_struct_time_time_delta() derive for each date in a new CalendarCache of
+    the specified capacity and return it, e.g. to inspect its hits and misses.
+    """
+    global _calendar_cache
+    _calendar_cache = CalendarCache(capacity)
+    return _calendar_cache
+
+def disable_calendar_cache():
+    """Stop memoizing calendar fields and discard the current cache.
+    """
+    global _calendar_cache
+    _calendar_cache = None
+
+def enable_year_table(first_year=YEAR_TABLE_FIRST_YEAR,
+                      last_year=YEAR_TABLE_LAST_YEAR, table=None):
+    """Replace is_leap_year() and date_to_day_of_week(), and thereby the
+    helpers that use them, with ones that look up the years from first_year to
+    last_year in a table, or in the specified table, e.g. one that was built
+    by build_year_table() and frozen into firmware, and return the table.
+    Note that any helpers previously imported from this module by name are not
+    replaced.
+    """
+    global is_leap_year, date_to_day_of_week
+    if table is None:
+        table = build_year_table(first_year, last_year)
+    is_leap_year, date_to_day_of_week = year_table_helpers(table, first_year)
+    return table
+
+def disable_year_table():
+    """Restore the arithmetic is_leap_year() and date_to_day_of_week().
+    """
+    global is_leap_year, date_to_day_of_week
+    is_leap_year = arithmetic_is_leap_year
+    date_to_day_of_week = arithmetic_date_to_day_of_week
 
-    return _struct_time
+def enable_parse_stats(timing=False):
+    """Record each call to strptime(), and to the functions built on it such as
+    strptime_many() and strptime_columns(), in a new ParseStats that also
+    accumulates the time spent per format if timing, and return it.
+    """
+    global _parse_stats
+    _parse_stats = ParseStats(timing)
+    CompiledFormat._parse_into = instrumented_parse_into
+    return _parse_stats
+
+def disable_parse_stats():
+    """Stop recording strptime() calls and discard the current ParseStats.
+    """
+    global _parse_stats
+    CompiledFormat._parse_into = uninstrumented_parse_into
+    _parse_stats = None
+
+def get_parse_stats():
+    """Return the enabled ParseStats, or None if it's disabled.
+    """
+    return _parse_stats
@@ -0,0 +1,710 @@
+"""
+Benchmarks for strptime(), strftime() and the calendar helpers, which run
+under both CPython and the MicroPython unix port.
+
+Each result reports the number of calls per second and, where measured, the
+number of bytes allocated per call and the ratio to a baseline, e.g. the
+built-in time.strptime() where it's available.
+
+Usage: python bench.py [--json <path>] [<name-substring> ...]
+
+where --json writes the results to the file at <path>, or to stdout if <path>
+is '-', as JSON so that runs can be diffed for regressions. In the latter
+case, the human-readable report is printed to stderr instead of stdout.
+"""
+
+import sys
+import time
+from array import array
+
+import __init__
+from __init__ import (
+    MONTH_NAMES,
+    CompiledFormat,
+    IncrementalParser,
+    MultiFormatParser,
+    add_struct_time_time_delta,
+    build_year_table,
+    compile,
+    compile_names,
+    date_to_day_of_week,
+    date_to_day_of_year,
+    day_of_year_to_month_day,
+    disable_calendar_cache,
+    disable_parse_stats,
+    disable_year_table,
+    enable_calendar_cache,
+    enable_parse_stats,
+    enable_year_table,
+    gmtime,
+    match_choice,
+    match_name,
+    matches,
+    parse_iso8601,
+    strftime,
+    strptime,
+    strptime_columns,
+    strptime_many,
+    struct_time,
+    time_delta,
+    timegm,
+)
+from tz import (
+    load_posix_tz,
+    load_zone,
+)
+
+###############################################################################
+# Helpers
+###############################################################################
+
+# Use the highest resolution clock available, falling back to the MicroPython
+# ticks API.
+if hasattr(time, 'perf_counter'):
+    _now = time.perf_counter
+else:
+    _now = lambda: time.ticks_us() / 1e6
+
+# The minimum number of seconds over which to measure each benchmark.
+MIN_DURATION = 0.2
+
+def _ops_per_sec(func, *args):
+    # Call func(*args) in batches of increasing size until MIN_DURATION has
+    # elapsed and return the number of calls per second.
+    number = 16
+    while True:
+        start = _now()
+        for _ in range(number):
+            func(*args)
+        elapsed = _now() - start
+        if elapsed >= MIN_DURATION:
+            return number / elapsed
+        number *= 2
+
+def _retained_bytes(func, *args):
+    # Return the number of bytes of memory retained by the result of
+    # func(*args), or None if tracemalloc is not available.
+    try:
+        import tracemalloc
+    except ImportError:
+        return None
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = func(*args)
+        return tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+def _allocated_bytes(func, *args):
+    # Return the number of bytes allocated during a call to func(*args),
+    # including memory that's freed before it returns.
+    # On CPython, this is the peak traced memory above the starting level,
+    # while on MicroPython, where the heap grows monotonically between
+    # collections, it's the growth of the heap with the collector disabled.
+    # Call once to warm up any caches.
+    func(*args)
+    try:
+        import tracemalloc
+    except ImportError:
+        import gc
+        gc.collect()
+        gc.disable()
+        try:
+            before = gc.mem_alloc()
+            func(*args)
+            return gc.mem_alloc() - before
+        finally:
+            gc.enable()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        func(*args)
+        return tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+# The results reported by the current run.
+_results = []
+
+# The stream to which the results are printed, which main() changes to stderr
+# when stdout is reserved for the JSON results.
+_output = sys.stdout
+
+def _report(name, ops=None, baseline=None, allocated=None, **counts):
+    # Print and record a result, which has any of the number of calls per
+    # second, the bytes allocated per call, the ratio of the calls per second
+    # to the baseline, and other counts, each named by its unit, e.g.
+    # bytes_retained.
+    result = {'name': name}
+    line = '{:<48}'.format(name)
+    if ops is not None:
+        result['ops_per_sec'] = round(ops)
+        line += ' {:>12.0f} ops/sec'.format(ops)
+    if allocated is not None:
+        result['bytes_allocated'] = allocated
+        line += ' {:>6} B'.format(allocated)
+    if baseline is not None:
+        result['ratio'] = round(ops / baseline, 3)
+        line += '  ({:.2f}x)'.format(ops / baseline)
+    for unit in sorted(counts):
+        result[unit] = counts[unit]
+        line += ' {:>12} {}'.format(counts[unit], unit.replace('_', ' '))
+    _results.append(result)
+    print(line, file=_output)
+
+###############################################################################
+# Benchmark strptime()
+###############################################################################
+
+ISO8601_DATE_STRING = '2020-12-23T04:01:20+05:00'
+ISO8601_FORMAT = '%Y-%m-%dT%H:%M:%S%z'
+
+# Common ( <date-string>, <format> ) pairs.
+COMMON_FORMATS = (
+    ('2020-12-23', '%Y-%m-%d'),
+    ('2020-12-23T04:01:20', '%Y-%m-%dT%H:%M:%S'),
+    (ISO8601_DATE_STRING, ISO8601_FORMAT),
+    ('2020-12-23T04:01:20.123456+00:00', '%Y-%m-%dT%H:%M:%S.%f%z'),
+    ('20201223T040120Z', '%Y%m%dT%H%M%SZ'),
+    ('Wed, 23 Dec 2020 04:01:20 +05:00', '%a, %d %b %Y %H:%M:%S %z'),
+    ('23/Dec/2020:04:01:20 +05:00', '%d/%b/%Y:%H:%M:%S %z'),
+    ('December 23 2020 04:01AM', '%B %d %Y %I:%M%p'),
+    ('2020 358', '%Y %j'),
+    ('2020 51 Wed', '%Y %W %a'),
+)
+
+def bench_strptime_common_formats():
+    # Compare each format with the built-in time.strptime(), where available.
+    # Note that the built-in doesn't accept a colon in a %z offset before
+    # Python 3.7.
+    builtin_strptime = getattr(time, 'strptime', None)
+    for date_string, fmt in COMMON_FORMATS:
+        # Don't time a failed parse against a successful one.
+        assert strptime(date_string, fmt) is not None, (date_string, fmt)
+        baseline = None
+        if builtin_strptime is not None:
+            baseline = _ops_per_sec(builtin_strptime, date_string, fmt)
+            _report('time.strptime({})'.format(fmt), baseline)
+        _report('strptime({})'.format(fmt),
+                _ops_per_sec(strptime, date_string, fmt), baseline,
+                _allocated_bytes(strptime, date_string, fmt))
+
+def bench_strptime_format_plans():
+    # Compare re-compiling the format on every call, which is equivalent to
+    # re-interpreting it each time, with the cached and precompiled plans.
+    recompile = lambda s, fmt: CompiledFormat(fmt).strptime(s)
+    baseline = _ops_per_sec(recompile, ISO8601_DATE_STRING, ISO8601_FORMAT)
+    _report('strptime() recompiled each call', baseline)
+    _report(
+        'strptime() with cached plan',
+        _ops_per_sec(strptime, ISO8601_DATE_STRING, ISO8601_FORMAT),
+        baseline
+    )
+    _report(
+        'CompiledFormat.strptime()',
+        _ops_per_sec(compile(ISO8601_FORMAT).strptime, ISO8601_DATE_STRING),
+        baseline
+    )
+
+def bench_strptime_allocations():
+    compiled = compile(ISO8601_FORMAT)
+    for name, func, args in (
+            ('CompiledFormat.strptime()', compiled.strptime,
+             (ISO8601_DATE_STRING,)),
+            ('CompiledFormat._parse_into()', compiled._parse_into,
+             (ISO8601_DATE_STRING, [0, 0, 0, 0, 0, 0, 0, 0])),
+        ):
+        _report(name, allocated=_allocated_bytes(func, *args))
+
+def bench_strptime_bytes():
+    compiled = compile(ISO8601_FORMAT)
+    buf = ISO8601_DATE_STRING.encode()
+    baseline = _ops_per_sec(lambda: compiled.strptime(buf.decode()))
+    _report('CompiledFormat.strptime(bytes.decode())', baseline)
+    _report('CompiledFormat.strptime(bytes)',
+            _ops_per_sec(compiled.strptime, buf), baseline)
+    _report('CompiledFormat.strptime(memoryview)',
+            _ops_per_sec(compiled.strptime, memoryview(buf)), baseline)
+
+def bench_iso8601_fast_path():
+    general = CompiledFormat(ISO8601_FORMAT)
+    general.iso8601 = None
+    for date_string in (ISO8601_DATE_STRING, '2020-12-23T14:01:20+00:00'):
+        baseline = _ops_per_sec(general.strptime, date_string)
+        _report('general path {}'.format(date_string), baseline)
+        _report(
+            'fast path {}'.format(date_string),
+            _ops_per_sec(compile(ISO8601_FORMAT).strptime, date_string),
+            baseline
+        )
+        _report(
+            'parse_iso8601() {}'.format(date_string),
+            _ops_per_sec(parse_iso8601, date_string),
+            baseline
+        )
+
+def bench_iso8601_fast_path_microseconds():
+    fmt = '%Y-%m-%dT%H:%M:%S.%f%z'
+    date_string = '2020-12-23T04:01:20.123456+00:00'
+    general = CompiledFormat(fmt)
+    general.iso8601 = None
+    assert general.strptime(date_string) is not None
+    assert compile(fmt).strptime(date_string) is not None
+    baseline = _ops_per_sec(general.strptime, date_string)
+    _report('general path {}'.format(date_string), baseline)
+    _report('fast path {}'.format(date_string),
+            _ops_per_sec(compile(fmt).strptime, date_string), baseline)
+    date_strings = [date_string] * 1000
+    _report('strptime_columns() of 1000 strings',
+            _ops_per_sec(strptime_columns, date_strings, fmt))
+
+def bench_lazy_struct_time():
+    # Compare parsing with eager and lazy results when the day of week and
+    # day of year go unused, and when they're read.
+    for date_string, fmt in (
+            ('2020-12-23T04:01:20Z', '%Y-%m-%dT%H:%M:%S%Z'),
+            ('2020-12-23 04:01:20', '%Y-%m-%d %H:%M:%S'),
+        ):
+        eager = compile(fmt)
+        lazy = compile(fmt, lazy=True)
+        baseline = _ops_per_sec(eager.strptime, date_string)
+        _report('strptime({})'.format(fmt), baseline, None,
+                _allocated_bytes(eager.strptime, date_string))
+        _report('lazy strptime({})'.format(fmt),
+                _ops_per_sec(lazy.strptime, date_string), baseline,
+                _allocated_bytes(lazy.strptime, date_string))
+        _report('lazy strptime({}).tm_wday'.format(fmt),
+                _ops_per_sec(lambda: lazy.strptime(date_string).tm_wday),
+                baseline)
+
+def bench_matches_and_fields():
+    # Compare parsing a full struct_time with only validating the date
+    # string, and with extracting a single field.
+    date_string, fmt = '2020-12-23 04:01:20', '%Y-%m-%d %H:%M:%S'
+    baseline = _ops_per_sec(strptime, date_string, fmt)
+    _report('strptime()', baseline, None,
+            _allocated_bytes(strptime, date_string, fmt))
+    _report('matches()', _ops_per_sec(matches, date_string, fmt), baseline,
+            _allocated_bytes(matches, date_string, fmt))
+    for fields in (('tm_hour',), ('tm_wday',)):
+        _report('strptime(fields={})'.format(fields),
+                _ops_per_sec(strptime, date_string, fmt, fields), baseline,
+                _allocated_bytes(strptime, date_string, fmt, fields))
+
+def bench_strptime_into():
+    # Compare parsing a bytes-like input, as read from a receive buffer, into
+    # a new struct_time and into a preallocated array.
+    for date_string, fmt in (
+            (b'2020-12-23T04:01:20Z', '%Y-%m-%dT%H:%M:%S%Z'),
+            (b'2020-12-23 04:01:20', '%Y-%m-%d %H:%M:%S'),
+        ):
+        compiled = compile(fmt)
+        out = array('h', bytes(2 * compiled.num_fields))
+        baseline = _ops_per_sec(compiled.strptime, date_string)
+        _report('CompiledFormat.strptime({})'.format(fmt), baseline, None,
+                _allocated_bytes(compiled.strptime, date_string))
+        _report('CompiledFormat.strptime_into({})'.format(fmt),
+                _ops_per_sec(compiled.strptime_into, date_string, out),
+                baseline,
+                _allocated_bytes(compiled.strptime_into, date_string, out))
+
+def bench_local_time():
+    # Compare parsing a non-UTC timestamp as UTC, which normalizes the time
+    # and date, and as local time plus offset, and converting each to epoch
+    # seconds.
+    for date_string, fmt in (
+            (ISO8601_DATE_STRING, ISO8601_FORMAT),
+            ('23/Dec/2020:04:01:20 +05:00', '%d/%b/%Y:%H:%M:%S %z'),
+        ):
+        utc = compile(fmt)
+        local = compile(fmt, utc=False)
+        baseline = _ops_per_sec(utc.strptime, date_string)
+        _report('UTC strptime({})'.format(fmt), baseline)
+        _report('local strptime({})'.format(fmt),
+                _ops_per_sec(local.strptime, date_string), baseline)
+        date_strings = [date_string] * 1000
+        baseline = _ops_per_sec(
+            lambda: [timegm(utc.strptime(s)) for s in date_strings])
+        _report('[timegm(strptime()) for 1000 strings]', baseline)
+        _report('strptime_columns(epoch_seconds) 1000 strings',
+                _ops_per_sec(strptime_columns, date_strings, fmt, None, True),
+                baseline)
+
+def bench_name_directives():
+    table = compile_names(MONTH_NAMES, range(1, 13))
+    baseline = _ops_per_sec(match_choice, 'December', 0, MONTH_NAMES)
+    _report("match_choice('December')", baseline)
+    _report("match_name('December')",
+            _ops_per_sec(match_name, 'December', 0, table), baseline)
+    _report(
+        'strptime() RFC 2822',
+        _ops_per_sec(strptime, 'Tue, 03 Mar 2020 14:05:09 +01:00',
+                     '%a, %d %b %Y %H:%M:%S %z')
+    )
+
+def bench_strptime_many():
+    date_strings = [ISO8601_DATE_STRING] * 1000
+    if hasattr(time, 'strptime'):
+        _report(
+            '[time.strptime() for 1000 strings]',
+            _ops_per_sec(
+                lambda: [time.strptime(s, ISO8601_FORMAT)
+                         for s in date_strings])
+        )
+    baseline = _ops_per_sec(
+        lambda: [strptime(s, ISO8601_FORMAT) for s in date_strings])
+    _report('[strptime() for 1000 strings]', baseline)
+    _report(
+        'list(strptime_many()) of 1000 strings',
+        _ops_per_sec(lambda: list(strptime_many(date_strings, ISO8601_FORMAT))),
+        baseline
+    )
+
+def bench_strptime_columns():
+    date_strings = [ISO8601_DATE_STRING] * 1000
+    baseline = _ops_per_sec(
+        lambda: list(strptime_many(date_strings, ISO8601_FORMAT)))
+    _report('list(strptime_many()) of 1000 strings', baseline)
+    _report(
+        'strptime_columns() of 1000 strings',
+        _ops_per_sec(strptime_columns, date_strings, ISO8601_FORMAT),
+        baseline
+    )
+    _report(
+        'strptime_columns(epoch) of 1000 strings',
+        _ops_per_sec(lambda: strptime_columns(date_strings, ISO8601_FORMAT,
+                                              epoch_seconds=True)),
+        baseline
+    )
+    # Compare the memory retained by the results.
+    for name, func in (
+            ('list(strptime_many())',
+             lambda: list(strptime_many(date_strings, ISO8601_FORMAT))),
+            ('strptime_columns()',
+             lambda: strptime_columns(date_strings, ISO8601_FORMAT)),
+            ('strptime_columns(epoch)',
+             lambda: strptime_columns(date_strings, ISO8601_FORMAT,
+                                      epoch_seconds=True)),
+        ):
+        num_bytes = _retained_bytes(func)
+        if num_bytes is not None:
+            _report('{} 1000 rows'.format(name), bytes_retained=num_bytes)
+
+def bench_parse_stats():
+    # The instrumentation should cost nothing while it's disabled.
+    baseline = _ops_per_sec(strptime, ISO8601_DATE_STRING, ISO8601_FORMAT)
+    _report('strptime() stats disabled', baseline)
+    for name, timing in (('stats enabled', False), ('stats with timing', True)):
+        enable_parse_stats(timing)
+        try:
+            _report(
+                'strptime() {}'.format(name),
+                _ops_per_sec(strptime, ISO8601_DATE_STRING, ISO8601_FORMAT),
+                baseline
+            )
+        finally:
+            disable_parse_stats()
+
+###############################################################################
+# Benchmark strftime()
+###############################################################################
+
+def bench_strftime():
+    _struct_time = strptime(ISO8601_DATE_STRING, ISO8601_FORMAT)
+    fmt = '%Y-%m-%dT%H:%M:%S'
+    baseline = None
+    if hasattr(time, 'strftime'):
+        baseline = _ops_per_sec(time.strftime, fmt, _struct_time + (0,))
+        _report('time.strftime()', baseline)
+    template = '{:04d}-{:02d}-{:02d}T{:02d}:{:02d}:{:02d}'
+    _report(
+        'str.format() of each field',
+        _ops_per_sec(lambda: template.format(*_struct_time[:6])),
+        baseline
+    )
+    _report('strftime()', _ops_per_sec(strftime, fmt, _struct_time), baseline)
+    _report('CompiledFormat.strftime()',
+            _ops_per_sec(compile(fmt).strftime, _struct_time), baseline)
+    fmt = '%a, %d %b %Y %H:%M:%S %Z'
+    if hasattr(time, 'strftime'):
+        baseline = _ops_per_sec(time.strftime, fmt, _struct_time + (0,))
+        _report('time.strftime() RFC 2822', baseline)
+    _report('strftime() RFC 2822',
+            _ops_per_sec(strftime, fmt, _struct_time), baseline)
+
+###############################################################################
+# Benchmark calendar helpers
+###############################################################################
+
+def bench_date_to_day_of_week_by_year():
+    # The cost should not depend on the distance of the year from 2000.
+    baseline = None
+    for year in (1, 1900, 2000, 2400, 9999):
+        ops = _ops_per_sec(date_to_day_of_week, year, 6, 15)
+        if baseline is None:
+            baseline = ops
+        _report('date_to_day_of_week({}, 6, 15)'.format(year), ops, baseline,
+                _allocated_bytes(date_to_day_of_week, year, 6, 15))
+
+def bench_date_to_day_of_year_by_month():
+    # The cost should not depend on the month.
+    baseline = _ops_per_sec(date_to_day_of_year, 2020, 1, 15)
+    _report('date_to_day_of_year(2020, 1, 15)', baseline)
+    _report(
+        'date_to_day_of_year(2020, 12, 15)',
+        _ops_per_sec(date_to_day_of_year, 2020, 12, 15),
+        baseline
+    )
+    _report(
+        'day_of_year_to_month_day(2020, 350)',
+        _ops_per_sec(day_of_year_to_month_day, 2020, 350),
+        baseline
+    )
+
+def bench_year_table():
+    # Report the memory footprint of the default table.
+    table = build_year_table()
+    name = 'build_year_table() {} years'.format(len(table))
+    if hasattr(sys, 'getsizeof'):
+        _report(name, bytes=len(table),
+                bytes_with_header=sys.getsizeof(table))
+    else:
+        _report(name, bytes=len(table))
+    # Compare the lookups with the arithmetic, for years both within and
+    # outside of the table, looking up the replaceable helpers via the module
+    # when they're called.
+    cases = (
+        ('is_leap_year(2020)', lambda: __init__.is_leap_year(2020)),
+        ('is_leap_year(2200)', lambda: __init__.is_leap_year(2200)),
+        ('date_to_day_of_week(2020, 6, 15)',
+         lambda: __init__.date_to_day_of_week(2020, 6, 15)),
+        ('date_to_day_of_week(2200, 6, 15)',
+         lambda: __init__.date_to_day_of_week(2200, 6, 15)),
+        ("strptime('2020-06-15')", lambda: strptime('2020-06-15', '%Y-%m-%d')),
+    )
+    baselines = [_ops_per_sec(func) for _, func in cases]
+    enable_year_table()
+    try:
+        for (name, func), baseline in zip(cases, baselines):
+            _report('{} arithmetic'.format(name), baseline)
+            _report('{} year table'.format(name), _ops_per_sec(func),
+                    baseline)
+    finally:
+        disable_year_table()
+
+def bench_epoch_seconds_conversions():
+    _struct_time = strptime(ISO8601_DATE_STRING, ISO8601_FORMAT)
+    seconds = timegm(_struct_time)
+    _report('timegm()', _ops_per_sec(timegm, _struct_time))
+    _report('gmtime()', _ops_per_sec(gmtime, seconds))
+    # Compare sorting parsed timestamps as struct_time tuples versus as
+    # epoch seconds.
+    struct_times = [gmtime(seconds - i * 7919) for i in range(1000)]
+    epoch_seconds = [timegm(x) for x in struct_times]
+    baseline = _ops_per_sec(sorted, struct_times)
+    _report('sorted() 1000 struct_times', baseline)
+    _report('sorted() 1000 epoch seconds', _ops_per_sec(sorted, epoch_seconds),
+            baseline)
+
+def bench_add_struct_time_time_delta():
+    # The cost should not depend on the size of the delta.
+    _struct_time = struct_time(2020, 12, 23, 1, 1, 20, 2, 358)
+    baseline = None
+    for name, _time_delta in (
+            ('tm_sec=1', time_delta(tm_sec=1)),
+            ('tm_min=-300', time_delta(tm_min=-300)),
+            ('tm_mday=400', time_delta(tm_mday=400)),
+            ('tm_mday=-100000', time_delta(tm_mday=-100000)),
+            ('tm_mon=13', time_delta(tm_mon=13)),
+        ):
+        ops = _ops_per_sec(add_struct_time_time_delta, _struct_time,
+                           _time_delta)
+        if baseline is None:
+            baseline = ops
+        _report('add_struct_time_time_delta({})'.format(name), ops, baseline,
+                _allocated_bytes(add_struct_time_time_delta, _struct_time,
+                                 _time_delta))
+
+def bench_incremental_parser():
+    # Compare parsing a sorted, high-rate log, in which most consecutive
+    # timestamps share their date and hour, with and without prefix reuse.
+    fmt = '%d/%b/%Y:%H:%M:%S %z'
+    date_strings = ['23/Dec/2020:{:02}:{:02}:{:02} +05:00'.format(
+        i // 3600, i // 60 % 60, i % 60) for i in range(0, 10000, 10)]
+    compiled = compile(fmt)
+    baseline = _ops_per_sec(lambda: [compiled.strptime(s)
+                                     for s in date_strings])
+    _report('CompiledFormat.strptime() 1000 log lines', baseline)
+    parser = IncrementalParser(fmt)
+    _report(
+        'IncrementalParser.strptime() 1000 log lines',
+        _ops_per_sec(lambda: [parser.strptime(s) for s in date_strings]),
+        baseline
+    )
+    # Every line repeats the previous one 4 times.
+    date_strings = [s for s in date_strings[:250] for _ in range(4)]
+    baseline = _ops_per_sec(lambda: [compiled.strptime(s)
+                                     for s in date_strings])
+    _report('CompiledFormat.strptime() 1000 repeating lines', baseline)
+    _report(
+        'IncrementalParser.strptime() 1000 repeating lines',
+        _ops_per_sec(lambda: [parser.strptime(s) for s in date_strings]),
+        baseline
+    )
+
+# The formats and a matching date string of each for the multi-format parser
+# benchmark.
+MULTI_FORMATS = (
+    ('2020-12-23T04:01:20+05:00', '%Y-%m-%dT%H:%M:%S%z'),
+    ('2020-12-23T04:01:20.123', '%Y-%m-%dT%H:%M:%S.%f'),
+    ('2020-12-23 04:01:20', '%Y-%m-%d %H:%M:%S'),
+    ('2020-12-23', '%Y-%m-%d'),
+    ('23/12/2020', '%d/%m/%Y'),
+    ('Dec 23 2020', '%b %d %Y'),
+    ('December 23, 2020', '%B %d, %Y'),
+    ('Wed, 23 Dec 2020 04:01:20 +05:00', '%a, %d %b %Y %H:%M:%S %z'),
+    ('20201223T040120', '%Y%m%dT%H%M%S'),
+    ('04:01:20', '%H:%M:%S'),
+    ('2020 358', '%Y %j'),
+    ('2020 51 Wed', '%Y %W %a'),
+    ('23/Dec/2020:04:01:20 +05:00', '%d/%b/%Y:%H:%M:%S %z'),
+    ('Wednesday 23 December 2020', '%A %d %B %Y'),
+    ('12-23-20 04:01 PM', '%m-%d-%y %I:%M %p'),
+    ('2020.12.23', '%Y.%m.%d'),
+)
+
+def bench_multi_format_parser():
+    # Compare parsing a mix of date strings in every one of an increasing
+    # number of formats by trying each format in turn, and by dispatching
+    # to the plausible ones.
+    for n in (4, 8, 16):
+        date_strings = [s for s, _ in MULTI_FORMATS[:n]]
+        formats = [compile(fmt) for _, fmt in MULTI_FORMATS[:n]]
+
+        def try_each_format():
+            for s in date_strings:
+                for compiled in formats:
+                    if compiled.strptime(s) is not None:
+                        break
+
+        baseline = _ops_per_sec(try_each_format)
+        _report('try each of {} formats'.format(n), baseline)
+        parser = MultiFormatParser(formats)
+        _report(
+            'MultiFormatParser of {} formats'.format(n),
+            _ops_per_sec(lambda: [parser.match(s) for s in date_strings]),
+            baseline
+        )
+
+def bench_calendar_cache():
+    # Compare parsing a log-like stream that repeats a few dates, and adding a
+    # time_delta, with and without the calendar cache.
+    date_strings = ['2020-12-{:02}T04:01:20'.format(23 + i // 400)
+                    for i in range(1000)]
+    fmt = '%Y-%m-%dT%H:%M:%S'
+    parse_all = lambda: list(strptime_many(date_strings, fmt))
+    _struct_time = struct_time(2020, 12, 23, 1, 1, 20, 2, 358)
+    _time_delta = time_delta(tm_min=1)
+    for capacity in (None, 1, 8):
+        if capacity is None:
+            label = 'no cache'
+            disable_calendar_cache()
+        else:
+            label = 'cache capacity={}'.format(capacity)
+            cache = enable_calendar_cache(capacity)
+        try:
+            ops = _ops_per_sec(parse_all)
+            if capacity is None:
+                baseline = ops
+            _report('strptime_many() 1000 strings, {}'.format(label), ops,
+                    baseline)
+            ops = _ops_per_sec(add_struct_time_time_delta, _struct_time,
+                               _time_delta)
+            if capacity is None:
+                delta_baseline = ops
+            _report('add_struct_time_time_delta(), {}'.format(label), ops,
+                    delta_baseline)
+        finally:
+            disable_calendar_cache()
+        if capacity is not None:
+            _report(label, hits=cache.hits, misses=cache.misses)
+
+def bench_time_zones():
+    # Compare looking up the UTC offset of a log-like stream of timestamps,
+    # which hits the last interval, of timestamps spread over the transitions,
+    # which bisects them, and of future timestamps, which use the POSIX TZ
+    # rule, and converting a parsed UTC time to local time.
+    try:
+        tz = load_zone('America/New_York')
+    except ValueError:
+        tz = load_posix_tz('EST5EDT,M3.2.0,M11.1.0')
+    try:
+        from datetime import datetime, timezone
+        from zoneinfo import ZoneInfo
+        zone = ZoneInfo('America/New_York')
+    except (ImportError, ValueError):
+        zone = None
+    start = timegm(struct_time(2021, 7, 1, 0, 0, 0, 0, 0))
+    for label, seconds in (
+            ('sequential', [start + i for i in range(1000)]),
+            ('spread', [start - i * 3170000 for i in range(1000)]),
+            ('rule', [start + (i + 20) * 31557600 for i in range(1000)]),
+        ):
+        baseline = None
+        if zone is not None:
+            baseline = _ops_per_sec(
+                lambda: [datetime.fromtimestamp(t, zone).utcoffset()
+                         for t in seconds])
+            _report('zoneinfo utcoffset() 1000 {}'.format(label), baseline)
+        _report('TimeZone.utcoffset() 1000 {}'.format(label),
+                _ops_per_sec(lambda: [tz.utcoffset(t) for t in seconds]),
+                baseline)
+    utc = strptime(ISO8601_DATE_STRING, ISO8601_FORMAT)
+    baseline = None
+    if zone is not None:
+        utc_datetime = datetime.fromtimestamp(timegm(utc), timezone.utc)
+        baseline = _ops_per_sec(utc_datetime.astimezone, zone)
+        _report('datetime(UTC).astimezone(ZoneInfo)', baseline)
+    _report('TimeZone.localtime(struct_time)',
+            _ops_per_sec(tz.localtime, utc), baseline)
+    local = tz.localtime(utc)
+    _report('TimeZone.localize(struct_time)', _ops_per_sec(tz.localize, local))
+
+def main(names, json_path=None):
+    global _output
+    if json_path == '-':
+        _output = sys.stderr
+    for k, v in sorted(globals().items()):
+        if (k.startswith('bench_') and callable(v)
+            and (not names or any(name in k for name in names))):
+            print('# {}'.format(k), file=_output)
+            start = len(_results)
+            v()
+            for result in _results[start:]:
+                result['bench'] = k
+    if json_path is None:
+        return
+    import json
+    implementation = getattr(sys, 'implementation', None)
+    doc = {
+        'implementation': sys.platform if implementation is None
+                          else implementation.name,
+        'version': sys.version,
+        'results': _results,
+    }
+    if json_path == '-':
+        print(json.dumps(doc))
+    else:
+        with open(json_path, 'w') as f:
+            f.write(json.dumps(doc))
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    json_path = None
+    if '--json' in args:
+        i = args.index('--json')
+        json_path = args[i + 1]
+        del args[i:i + 2]
+    main(args, json_path)
@@ -1,17 +1,90 @@
 
+import struct
 import time
-
+from array import array
+
+# The built-in modules against which some tests compare the results, which
+# MicroPython may not have.
+try:
+    import calendar
+except ImportError:
+    calendar = None
+try:
+    from datetime import date, datetime, timedelta, timezone
+except ImportError:
+    date = datetime = timedelta = timezone = None
+
+import __init__
 from __init__ import (
+    ABBREVIATED_WEEKDAY_NAMES,
     ABBREV_MONTH_NUM_DAYS_PAIRS,
+    DAYS_BEFORE_MONTH,
+    ERRORS,
+    FAILURES,
     JAN_1_2000_DAY_NUM,
+    FORMAT_CACHE_SIZE,
+    ISO8601_FORMATS,
+    LEAP_DAYS_BEFORE_MONTH,
     STRUCT_TIME_FIELDS,
+    TM_HOUR_I,
+    TM_MDAY_I,
+    TM_MIN_I,
+    TM_MON_I,
+    TM_SEC_I,
+    TM_USEC_I,
+    TM_WDAY_I,
+    TM_YDAY_I,
+    CalendarCache,
+    CompiledFormat,
+    IncrementalParser,
+    LRUCache,
+    MultiFormatParser,
+    StructTimeColumns,
+    civil_from_days,
+    compile,
     date_to_day_of_year,
+    day_of_year_to_month_day,
     date_to_day_of_week,
+    days_before_year,
+    days_from_civil,
+    days_in_month,
+    diagnose_failure,
+    gmtime,
     is_leap_year,
+    match_choice,
+    match_name,
+    matches,
+    compile_names,
+    parse_integer,
+    parse_iso8601,
+    parse_time_zone_offset,
+    strftime,
     strptime,
+    strptime_columns,
+    strptime_into,
+    strptime_many,
     struct_time,
+    struct_time_gmtoff,
+    struct_time_usec,
     add_struct_time_time_delta,
+    build_year_table,
+    calendar_fields,
+    disable_calendar_cache,
+    disable_parse_stats,
+    disable_year_table,
+    enable_calendar_cache,
+    enable_parse_stats,
+    enable_year_table,
+    lazy_struct_time,
     time_delta,
+    timegm,
+)
+from tz import (
+    load_posix_tz,
+    load_zone,
+    parse_posix_tz,
+    parse_tzif,
+    posix_tz_rule_time,
 )
 
 from testy import (
@@ -22,6 +95,12 @@ from testy import (
     cli,
 )
 
+def _require(*builtins):
+    # Skip a test that compares against a built-in that isn't available.
+    for builtin in builtins:
+        if builtin is None:
+            raise Skip
+
 ###############################################################################
 # Test date_to_day_of_year()
 ###############################################################################
@@ -45,6 +124,27 @@ def test_date_to_day_of_year():
         ):
         assertEqual(date_to_day_of_year(year, month, day), day_of_year)
 
+def test_days_before_month_tables():
+    for month in range(1, 13):
+        assertEqual(DAYS_BEFORE_MONTH[month], _days_in_months(month - 1))
+        assertEqual(
+            LEAP_DAYS_BEFORE_MONTH[month],
+            _days_in_months(month - 1) + (1 if month > 2 else 0)
+        )
+    assertEqual(DAYS_BEFORE_MONTH[13], 365)
+    assertEqual(LEAP_DAYS_BEFORE_MONTH[13], 366)
+
+def test_day_of_year_to_month_day():
+    # Check that every day of a common and a leap year round-trips.
+    for year in (1999, 2000):
+        for month in range(1, 13):
+            for day in range(1, days_in_month(year, month) + 1):
+                assertEqual(
+                    day_of_year_to_month_day(
+                        year, date_to_day_of_year(year, month, day)),
+                    (month, day)
+                )
+
 ###############################################################################
 # Test date_to_day_of_week()
 ###############################################################################
@@ -134,6 +234,93 @@ def test_date_to_day_of_week_spot_check():
         ):
         assertEqual(date_to_day_of_week(year, month, day), day_num)
 
+def test_date_to_day_of_week_identical_to_builtin():
+    _require(date)
+    # Check the first and last day of every month in the years 1 - 9999.
+    for year in range(1, 10000):
+        for month in range(1, 13):
+            for day in (1, days_in_month(year, month)):
+                assertEqual(
+                    date_to_day_of_week(year, month, day),
+                    date(year, month, day).weekday()
+                )
+
+def test_days_before_year():
+    _require(date)
+    for year in (1, 2, 4, 5, 100, 101, 400, 401, 1970, 2000, 2001, 9999):
+        assertEqual(days_before_year(year), date(year, 1, 1).toordinal() - 1)
+
+def test_build_year_table():
+    table = build_year_table(1999, 2001)
+    assertEqual(table, bytes([4, 5 | 8, 0]))
+
+def test_year_table_identical_to_arithmetic():
+    # Look up the replaceable helpers via the module when they're called.
+    year_facts = lambda year: (
+        __init__.is_leap_year(year), __init__.days_in_year(year),
+        days_in_month(year, 2), __init__.date_to_day_of_week(year, 3, 1)
+    )
+    years = (1, 1900, 1969, 1970, 1971, 2000, 2024, 2099, 2100, 2400)
+    expected = [year_facts(year) for year in years]
+    enable_year_table(1970, 2099)
+    try:
+        assertEqual([year_facts(year) for year in years], expected)
+        assertEqual(strptime('2024-02-29', '%Y-%m-%d').tm_yday, 60)
+        assertNone(strptime('2023-02-29', '%Y-%m-%d'))
+    finally:
+        disable_year_table()
+
+###############################################################################
+# Test days_from_civil() / civil_from_days() / timegm() / gmtime()
+###############################################################################
+
+# The proleptic Gregorian ordinal of January 1, 1970.
+_EPOCH_ORDINAL = 719163
+
+def test_days_from_civil_identical_to_builtin():
+    _require(date)
+    for year in range(1, 10000):
+        for month, day in ((1, 1), (2, 28), (3, 1), (12, 31)):
+            assertEqual(
+                days_from_civil(year, month, day),
+                date(year, month, day).toordinal() - _EPOCH_ORDINAL
+            )
+
+def test_civil_from_days_identical_to_builtin():
+    _require(date)
+    # Check every 7th day between the years 1 and 9999, along with the days
+    # immediately surrounding the epoch.
+    first = date(1, 1, 1).toordinal() - _EPOCH_ORDINAL
+    last = date(9999, 12, 31).toordinal() - _EPOCH_ORDINAL
+    for days in list(range(first, last + 1, 7)) + [last, -1, 0, 1]:
+        d = date.fromordinal(days + _EPOCH_ORDINAL)
+        assertEqual(civil_from_days(days), (d.year, d.month, d.day))
+        assertEqual(days_from_civil(d.year, d.month, d.day), days)
+
+def test_timegm_identical_to_builtin():
+    _require(calendar)
+    for _struct_time in (
+            struct_time(1970, 1, 1, 0, 0, 0, 3, 1),
+            struct_time(1969, 12, 31, 23, 59, 59, 2, 365),
+            struct_time(2000, 2, 29, 12, 30, 45, 1, 60),
+            struct_time(2020, 12, 23, 1, 1, 20, 2, 358),
+            struct_time(1, 1, 1, 0, 0, 0, 0, 1),
+            struct_time(9999, 12, 31, 23, 59, 59, 4, 365),
+        ):
+        assertEqual(
+            timegm(_struct_time),
+            calendar.timegm(tuple(_struct_time) + (0,))
+        )
+
+def test_gmtime_identical_to_builtin():
+    for seconds in (0, 1, -1, 59, 86399, 86400, -86401, 951782400,
+                    1608685280, 4102444800, -2208988800):
+        assertEqual(
+            gmtime(seconds),
+            struct_time(*time.gmtime(seconds)[:8])
+        )
+        assertEqual(timegm(gmtime(seconds)), seconds)
+
 ###############################################################################
 # Test add_struct_time_time_delta()
 ###############################################################################
@@ -236,6 +423,60 @@ def test_add_struct_time_time_delta_month_underflow():
         struct_time(1999, 12, 1, 0, 0, 0, 2, 335),
     )
 
+def test_add_struct_time_time_delta_large_deltas():
+    _require(datetime)
+    start = datetime(2000, 1, 31, 12, 30, 15)
+    for kwargs in (
+            {'days': 400},
+            {'days': -400},
+            {'days': 2000000},
+            {'days': -700000},
+            {'hours': 100000},
+            {'minutes': -1000000},
+            {'seconds': 10 ** 9},
+            {'days': 31, 'hours': -25, 'minutes': 61, 'seconds': -3601},
+        ):
+        expected = start + timedelta(**kwargs)
+        assertEqual(
+            add_struct_time_time_delta(
+                struct_time(*start.timetuple()[:8]),
+                time_delta(
+                    tm_mday=kwargs.get('days', 0),
+                    tm_hour=kwargs.get('hours', 0),
+                    tm_min=kwargs.get('minutes', 0),
+                    tm_sec=kwargs.get('seconds', 0),
+                )
+            ),
+            struct_time(*expected.timetuple()[:8])
+        )
+
+def test_add_struct_time_time_delta_month_clamps_day():
+    _assertStructTimeDelta(
+        struct_time(2000, 1, 31, 0, 0, 0, 0, 31),
+        time_delta(tm_mon=1),
+        struct_time(2000, 2, 29, 0, 0, 0, 1, 60),
+    )
+    _assertStructTimeDelta(
+        struct_time(2000, 1, 31, 0, 0, 0, 0, 31),
+        time_delta(tm_mon=-3),
+        struct_time(1999, 10, 31, 0, 0, 0, 6, 304),
+    )
+
+def test_add_struct_time_time_delta_year_clamps_day():
+    _assertStructTimeDelta(
+        struct_time(2000, 2, 29, 0, 0, 0, 1, 60),
+        time_delta(tm_year=1),
+        struct_time(2001, 2, 28, 0, 0, 0, 2, 59),
+    )
+
+def test_add_struct_time_time_delta_month_then_day():
+    # Months are added before days.
+    _assertStructTimeDelta(
+        struct_time(2000, 1, 31, 0, 0, 0, 0, 31),
+        time_delta(tm_mon=1, tm_mday=1),
+        struct_time(2000, 3, 1, 0, 0, 0, 2, 61),
+    )
+
 def test_add_struct_time_time_delta_wday_not_implemented():
     assertRaises(
         NotImplementedError,
@@ -252,6 +493,44 @@ def test_add_struct_time_time_delta_yday_not_implemented():
         time_delta(tm_yday=1),
     )
 
+###############################################################################
+# Test parsers
+###############################################################################
+
+def test_match_choice_at_offset():
+    assertEqual(match_choice('Tue, 03', 0, ('Mon', 'Tue')), ('Tue', 3))
+    assertEqual(match_choice('03 Mar', 3, ('Feb', 'Mar')), ('Mar', 6))
+    assertEqual(match_choice('03 Mar', 2, ('Feb', 'Mar')), False)
+
+def test_match_name():
+    table = compile_names(('June', 'July', 'Jun'), (6, 7, 66))
+    assertEqual(match_name('x June', 2, table), (6, 6))
+    assertEqual(match_name('x July', 2, table), (7, 6))
+    assertEqual(match_name('x Jun', 2, table), (66, 5))
+    assertEqual(match_name(b'x July', 2, table), (7, 6))
+    assertEqual(match_name('x june', 2, table), False)
+    assertEqual(match_name('x Aug', 2, table), False)
+    assertEqual(match_name('x J', 2, table), False)
+    assertEqual(match_name('x ', 2, table), False)
+
+def test_match_name_ignore_case():
+    table = compile_names(('June', 'July'), (6, 7), ignore_case=True)
+    for s in ('june', 'JUNE', 'jUnE', b'jUNe'):
+        assertEqual(match_name(s, 0, table), (6, 4))
+    assertEqual(match_name('jume', 0, table), False)
+
+def test_parse_integer_at_offset():
+    assertEqual(parse_integer('T2020-', 1, 4, 0, 9999), (2020, 5))
+    assertEqual(parse_integer('T2020-', 2, 4, 0, 9999), False)
+    assertEqual(parse_integer('T20', 1, 4, 0, 9999), False)
+    assertEqual(parse_integer('T60', 1, 2, 0, 59), False)
+
+def test_parse_time_zone_offset_at_offset():
+    assertEqual(parse_time_zone_offset('00+05:30', 2), (330, 8))
+    assertEqual(parse_time_zone_offset('00-05:30', 2), (-330, 8))
+    assertEqual(parse_time_zone_offset('00-05:3', 2), False)
+    assertEqual(parse_time_zone_offset('00-05-30', 2), False)
+
 ###############################################################################
 # Test strptime()
 ###############################################################################
@@ -303,13 +582,13 @@ def test_abbrev_month_name_directive():
             'Apr',
             'May',
             'Jun',
-            'Jul'
+            'Jul',
             'Aug',
             'Sep',
             'Oct',
             'Nov',
             'Dec'
-        )):
+        ), 1):
         assertEqual(
             strptime(name, '%b'),
             struct_time(0, i, 0, 0, 0, 0, 0, 0)
@@ -326,13 +605,13 @@ def test_month_name_directive():
             'April',
             'May',
             'June',
-            'July'
+            'July',
             'August',
             'September',
             'October',
             'November',
             'December'
-        )):
+        ), 1):
         assertEqual(
             strptime(f'{name}', '%B'),
             struct_time(0, i, 0, 0, 0, 0, 0, 0)
@@ -428,9 +707,34 @@ def test_second_directive():
     # Test an invalid value.
     assertNone(strptime('60', '%S'))
 
-def test_week_of_year_sunday_directive_not_implemented():
-    # Test that week_of_year_sunday is not implemented.
-    assertRaises(NotImplementedError, strptime, '', '%U')
+def test_microsecond_directive():
+    # Test valid values, which are scaled from 1 - 6 digits.
+    for date_string, usec in (('0', 0), ('1', 100000), ('05', 50000),
+                              ('123', 123000), ('000001', 1),
+                              ('999999', 999999)):
+        assertEqual(
+            strptime(date_string, '%f'),
+            struct_time_usec(0, 0, 0, 0, 0, 0, 0, 0, usec)
+        )
+    # Test invalid values.
+    assertNone(strptime('', '%f'))
+    assertNone(strptime('x', '%f'))
+    assertNone(strptime('1234567', '%f'))
+
+def test_week_of_year_sunday_directive():
+    # Test valid values, which are discarded without a year and day of week.
+    for i in range(54):
+        assertEqual(
+            strptime(f'{i:02}', '%U'),
+            struct_time(0, 0, 0, 0, 0, 0, 0, 0)
+        )
+    # Test an invalid value.
+    assertNone(strptime('54', '%U'))
+    # Test a date, where week 1 starts on the first Sunday.
+    assertEqual(
+        strptime('2020 01 Sun', '%Y %U %a'),
+        struct_time(2020, 1, 5, 0, 0, 0, 6, 5)
+    )
 
 def test_day_of_week_directive():
     # Test valid values.
@@ -442,9 +746,20 @@ def test_day_of_week_directive():
     # Test an invalid value.
     assertNone(strptime('7', '%w'))
 
-def test_week_of_year_monday_directive_not_implemented():
-    # Test that week_of_year_monday is not implemented.
-    assertRaises(NotImplementedError, strptime, '', '%W')
+def test_week_of_year_monday_directive():
+    # Test valid values, which are discarded without a year and day of week.
+    for i in range(54):
+        assertEqual(
+            strptime(f'{i:02}', '%W'),
+            struct_time(0, 0, 0, 0, 0, 0, 0, 0)
+        )
+    # Test an invalid value.
+    assertNone(strptime('54', '%W'))
+    # Test a date, where week 1 starts on the first Monday.
+    assertEqual(
+        strptime('2020 01 Mon', '%Y %W %a'),
+        struct_time(2020, 1, 6, 0, 0, 0, 0, 6)
+    )
 
 def test_locale_date_directive_not_implemented():
     # Test that locale_date is not implemented.
@@ -540,6 +855,18 @@ def test_iso8601_datetime_with_nonzero_utc_offset_day_overflow():
         struct_time(2020, 12, 23, 4, 1, 20, 2, 358)
     )
 
+def test_iso8601_datetime_with_negative_half_hour_utc_offset():
+    assertEqual(
+        strptime('2020-12-23T01:01:20-03:30', '%Y-%m-%dT%H:%M:%S%z'),
+        struct_time(2020, 12, 23, 4, 31, 20, 2, 358)
+    )
+
+def test_time_zone_offset_followed_by_literal():
+    assertEqual(
+        strptime('01:01+01:00]', '%H:%M%z]'),
+        struct_time(0, 0, 0, 1, -59, 0, 0, 0)
+    )
+
 def test_iso8601_datetime_utc_timezone():
     assertEqual(
         strptime('2020-12-23T01:01:20Z', '%Y-%m-%dT%H:%M:%S%Z'),
@@ -577,6 +904,220 @@ def test_last_day_of_feb_during_leap_year():
     )
 
 
+def test_year_and_day_of_year():
+    _require(getattr(time, 'strptime', None))
+    for date_string in ('2020 001', '2020 060', '2020 366', '2021 059',
+                        '2021 060', '2021 365'):
+        assertEqual(
+            strptime(date_string, '%Y %j'),
+            struct_time(*time.strptime(date_string, '%Y %j')[:8])
+        )
+
+
+# Test bytes-like input.
+
+_BYTES_CASES = (
+    ('2020-12-23T04:01:20+05:00', '%Y-%m-%dT%H:%M:%S%z'),
+    ('2020-12-22T23:01:20-05:30', '%Y-%m-%dT%H:%M:%S%z'),
+    ('20201223T010120Z', '%Y%m%dT%H%M%S%Z'),
+    ('Wednesday, 23 Dec 2020 08:10PM', '%A, %d %b %Y %I:%M%p'),
+    ('100% 2020', '100%% %Y'),
+    ('2020-02-30', '%Y-%m-%d'),
+    ('2020-12-2x', '%Y-%m-%d'),
+    ('2020-12-23 ', '%Y-%m-%d'),
+    ('2020-12', '%Y-%m-%d'),
+)
+
+def test_bytes_like_input_identical_to_str():
+    for date_string, fmt in _BYTES_CASES:
+        expected = strptime(date_string, fmt)
+        encoded = date_string.encode()
+        assertEqual(strptime(encoded, fmt), expected)
+        assertEqual(strptime(bytearray(encoded), fmt), expected)
+        assertEqual(strptime(memoryview(encoded), fmt), expected)
+
+def test_memoryview_slice_input():
+    buf = bytearray(b'<14>2020-12-23T01:01:20Z host: message\n')
+    assertEqual(
+        strptime(memoryview(buf)[4:24], '%Y-%m-%dT%H:%M:%S%Z'),
+        struct_time(2020, 12, 23, 1, 1, 20, 2, 358)
+    )
+
+
+# Test the ISO 8601 fast path.
+
+def _iso8601_fast_path_cases():
+    # Yield each ISO8601_FORMATS format along with strings to parse, which
+    # include every single-char mutation and truncation of valid strings.
+    for fmt, (extended, zone, fraction) in ISO8601_FORMATS.items():
+        date_time = ('2020-12-23T04:01:20' if extended else '20201223T040120')
+        bases = [date_time, date_time + 'Z', date_time + '+05:30',
+                 date_time + '-05:30', date_time + '+0530',
+                 date_time + '.123Z']
+        if fraction:
+            bases += [date_time + '.1', date_time + '.123456+05:30',
+                      date_time + '.1234567Z', date_time + ',5Z']
+        for base in bases:
+            yield fmt, base
+            for i in range(len(base)):
+                yield fmt, base[:i]
+                for c in '09-:TZ+.x':
+                    yield fmt, base[:i] + c + base[i + 1:]
+
+def test_iso8601_fast_path_identical_to_general_path():
+    for fmt, date_string in _iso8601_fast_path_cases():
+        general = CompiledFormat(fmt)
+        general.iso8601 = None
+        assertEqual(
+            compile(fmt).strptime(date_string),
+            general.strptime(date_string)
+        )
+
+def test_parse_iso8601():
+    expected = struct_time(2020, 12, 23, 1, 1, 20, 2, 358)
+    for date_string, usec in (
+            ('2020-12-23T01:01:20', None),
+            ('2020-12-23T01:01:20Z', None),
+            ('2020-12-23t01:01:20z', None),
+            ('2020-12-23 01:01:20Z', None),
+            ('2020-12-23T01:01:20.5Z', 500000),
+            ('2020-12-23T01:01:20.0Z', 0),
+            ('2020-12-23T01:01:20,123456Z', 123456),
+            ('2020-12-23T01:01:20.1234567Z', 123456),
+            ('2020-12-23T06:31:20+05:30', None),
+            ('2020-12-22T23:01:20-02:00', None),
+            ('2020-12-22T23:01:20.999-02:00', 999000),
+            ('20201223T010120', None),
+            ('20201223T010120Z', None),
+            ('20201223T063120+05:30', None),
+            ('20201223T063120+0530', None),
+            ('20201223T010120.123456Z', 123456),
+        ):
+        if usec is not None:
+            _expected = struct_time_usec(*(expected + (usec,)))
+        else:
+            _expected = expected
+        for x in (date_string, date_string.encode()):
+            result = parse_iso8601(x)
+            assertEqual(result, _expected)
+            assertEqual(type(result), type(_expected))
+
+def test_iso8601_fast_path_microseconds():
+    for fmt, date_string, expected, formatted in (
+            ('%Y-%m-%dT%H:%M:%S.%f', '2020-12-23T04:01:20.1',
+             struct_time_usec(2020, 12, 23, 4, 1, 20, 2, 358, 100000),
+             '2020-12-23T04:01:20.100000'),
+            ('%Y-%m-%dT%H:%M:%S.%f%z', '2020-12-23T04:01:20.000001-01:00',
+             struct_time_usec(2020, 12, 23, 5, 1, 20, 2, 358, 1),
+             '2020-12-23T05:01:20.000001+00:00'),
+            ('%Y%m%dT%H%M%S.%f%Z', '20201223T040120.999999Z',
+             struct_time_usec(2020, 12, 23, 4, 1, 20, 2, 358, 999999),
+             '20201223T040120.999999Z'),
+        ):
+        assertEqual(compile(fmt).iso8601 is None, False)
+        assertEqual(strptime(date_string, fmt), expected)
+        assertEqual(strftime(fmt, expected), formatted)
+
+def test_parse_iso8601_invalid():
+    for date_string in (
+            '',
+            '2020-12-23',
+            '2020-12-23T01:01',
+            '2020-12-23T01:01:2',
+            '2020-12-23X01:01:20Z',
+            '2020-12-23T01:01:20.Z',
+            '2020-12-23T01:01:20+05',
+            '2020-12-23T01:01:20+0530',
+            '2020-12-23T01:01:20Z ',
+            '2020-13-23T01:01:20Z',
+            '2020-00-23T01:01:20Z',
+            '2020-12-00T01:01:20Z',
+            '2021-02-29T01:01:20Z',
+            '2020-12-23T24:01:20Z',
+            '2020-12-23T01:60:20Z',
+            '2020-12-23T01:01:60Z',
+            '2020-12-23T01:01:20+05:3x',
+            '20201223T010120+053',
+        ):
+        assertNone(parse_iso8601(date_string))
+
+
+# Test name directives.
+
+def test_rfc2822_date():
+    assertEqual(
+        strptime('Tue, 03 Mar 2020 14:05:09 +01:00', '%a, %d %b %Y %H:%M:%S %z'),
+        struct_time(2020, 3, 3, 13, 5, 9, 1, 63)
+    )
+
+def test_month_name_values_identical_to_builtin():
+    _require(getattr(time, 'strptime', None))
+    for month in range(1, 13):
+        for fmt in ('%Y %b %d', '%Y %B %d'):
+            date_string = time.strftime(fmt, (2021, month, 1, 0, 0, 0, 0, 1, 0))
+            assertEqual(
+                strptime(date_string, fmt),
+                struct_time(*time.strptime(date_string, fmt)[:8])
+            )
+
+def test_ignore_case():
+    compiled = compile('%a, %d %b %Y %I%p %Z', ignore_case=True)
+    assertEqual(
+        compiled.strptime('TUE, 03 mar 2020 01pm z'),
+        struct_time(2020, 3, 3, 13, 0, 0, 1, 63)
+    )
+    assertEqual(compiled is compile('%a, %d %b %Y %I%p %Z', ignore_case=True),
+                True)
+    assertNone(compile('%a, %d %b %Y %I%p %Z').strptime(
+        'TUE, 03 mar 2020 01pm z'))
+
+
+# Test week of year dates.
+
+def test_week_of_year_dates_identical_to_builtin():
+    _require(date)
+    for fmt in ('%Y %U %a', '%Y %W %A', '%a %W %Y %H'):
+        d = date(2018, 12, 20)
+        while d < date(2022, 1, 20):
+            date_string = d.strftime(fmt)
+            _struct_time = strptime(date_string, fmt)
+            assertEqual(
+                _struct_time[:3] + _struct_time[6:],
+                (d.year, d.month, d.day, d.weekday(), d.timetuple().tm_yday)
+            )
+            assertEqual(strftime(fmt, _struct_time), date_string)
+            d += timedelta(days=1)
+
+def test_week_of_year_dates_identical_to_datetime_strptime():
+    _require(datetime)
+    # Step through the years by 13 to cover every weekday of January 1 in
+    # both common and leap years.
+    for year in list(range(2, 9999, 13)) + [5517]:
+        for fmt in ('%Y %U %a', '%Y %W %a'):
+            for week in (0, 1, 2, 26, 52, 53):
+                for name in ABBREVIATED_WEEKDAY_NAMES:
+                    date_string = '{:04} {:02} {}'.format(year, week, name)
+                    try:
+                        d = datetime.strptime(date_string, fmt)
+                    except ValueError:
+                        continue
+                    assertEqual(strptime(date_string, fmt)[:3],
+                                (d.year, d.month, d.day))
+
+def test_week_of_year_date_in_adjacent_year():
+    # Week 0 of 2021 starts in 2020 and week 53 ends in 2022.
+    assertEqual(strptime('2021 00 Mon', '%Y %W %a')[:3], (2020, 12, 28))
+    assertEqual(strptime('2021 53 Sun', '%Y %W %a')[:3], (2022, 1, 9))
+    # Week 0 is week 1 when the year starts on the first day of the week.
+    assertEqual(strptime('5517 00 Mon', '%Y %W %a')[:3], (5517, 1, 1))
+
+def test_week_of_year_with_day_of_year():
+    # The day of year takes precedence.
+    assertEqual(
+        strptime('2020 10 100', '%Y %U %j'),
+        struct_time(2020, 4, 9, 0, 0, 0, 3, 100)
+    )
+
 # Test invalid value combinations.
 
 def test_invalid_day_of_month():
@@ -588,6 +1129,30 @@ def test_invalid_day_of_month():
     # Test day after last day of Feb during a leap year.
     assertNone(strptime('2000-02-30', '%Y-%m-%d'))
 
+def test_invalid_zero_month_or_day_of_full_date():
+    # As with the built-in time.strptime(), a zero month or day is only
+    # accepted without a full date.
+    date_strings = ['2020-00-23', '2020-12-00', '2020-00-00']
+    fmt = '%Y-%m-%d'
+    for date_string in date_strings:
+        assertNone(strptime(date_string, fmt))
+        assertNone(IncrementalParser(fmt).strptime(date_string))
+    assertEqual(list(strptime_many(date_strings, fmt)), [None] * 3)
+    columns = strptime_columns(date_strings, fmt)
+    assertEqual([columns.is_valid(i) for i in range(3)], [False] * 3)
+    enable_calendar_cache()
+    try:
+        for date_string in date_strings:
+            assertNone(strptime(date_string, fmt))
+    finally:
+        disable_calendar_cache()
+    assertEqual(strptime('00 00', '%m %d'),
+                struct_time(0, 0, 0, 0, 0, 0, 0, 0))
+
+def test_invalid_day_of_year():
+    assertNone(strptime('2021 366', '%Y %j'))
+    assertNone(strptime('2020 000', '%Y %j'))
+
 
 # Test illogical directive combinations.
 
@@ -621,5 +1186,942 @@ def test_time_struct_values_identical_to_builtin():
                     )
 
 
+###############################################################################
+# Test compile()
+###############################################################################
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    # Access 'a' to make 'b' the least recently used.
+    assertEqual(cache.get('a'), 1)
+    cache.put('c', 3)
+    assertEqual(len(cache), 2)
+    assertNone(cache.get('b'))
+    assertEqual(cache.get('a'), 1)
+    assertEqual(cache.get('c'), 3)
+
+def test_compile_returns_cached_instance():
+    fmt = '%Y-%m-%dT%H:%M:%S%z'
+    compiled = compile(fmt)
+    assertEqual(type(compiled), CompiledFormat)
+    assertEqual(compiled is compile(fmt), True)
+
+def test_compile_cache_is_bounded():
+    first = compile('%Y-first')
+    for i in range(FORMAT_CACHE_SIZE):
+        compile('%Y-{}'.format(i))
+    # The first format should have been evicted and compiled anew.
+    assertEqual(first is compile('%Y-first'), False)
+
+def test_compile_coalesces_literals():
+    steps = compile('%H:%M%%%S').steps
+    assertEqual([step[2] for step in steps if step[1] is None], [':', '%'])
+
+def test_compile_bad_directive():
+    assertRaises(ValueError, compile, '%Q')
+
+def test_compiled_strptime_matches_strptime():
+    for date_string, fmt in (
+            ('2020-12-23T04:01:20+05:00', '%Y-%m-%dT%H:%M:%S%z'),
+            ('20201223T010120Z', '%Y%m%dT%H%M%S%Z'),
+            ('08:10PM', '%I:%M%p'),
+            ('2000-02-30', '%Y-%m-%d'),
+            ('2020-12-23 extra', '%Y-%m-%d'),
+        ):
+        assertEqual(
+            CompiledFormat(fmt).strptime(date_string),
+            strptime(date_string, fmt)
+        )
+
+def test_literal_mismatch_on_exhausted_input():
+    assertNone(strptime('2020', '%Y-%m'))
+
+###############################################################################
+# Test matches() and strptime() fields
+###############################################################################
+
+_MATCHES_CASES = (
+    ('2020-12-23T04:01:20+05:00', '%Y-%m-%dT%H:%M:%S%z'),
+    ('2020-12-31T23:59:59-05:00', '%Y-%m-%dT%H:%M:%S%z'),
+    ('2020-12-23T04:01:20.5Z', '%Y-%m-%dT%H:%M:%S.%f%Z'),
+    ('2020-02-29 04:01', '%Y-%m-%d %H:%M'),
+    ('2021-02-29 04:01', '%Y-%m-%d %H:%M'),
+    ('2020-12-23 04:61', '%Y-%m-%d %H:%M'),
+    ('2020-12-23 extra', '%Y-%m-%d'),
+    ('2020 367', '%Y %j'),
+    ('2020 51 Wed', '%Y %W %a'),
+    ('12:10PM', '%H:%M%p'),
+    ('08:10PM', '%I:%M%p'),
+)
+
+def test_matches_identical_to_strptime():
+    for date_string, fmt in _MATCHES_CASES:
+        for x in (date_string, date_string.encode()):
+            assertEqual(matches(x, fmt), strptime(x, fmt) is not None)
+            assertEqual(compile(fmt).matches(x), matches(x, fmt))
+
+def test_strptime_fields():
+    for date_string, fmt in _MATCHES_CASES:
+        expected = strptime(date_string, fmt)
+        for fields in (('tm_hour',), ('tm_wday',), ('tm_mday', 'tm_year'),
+                       ('tm_yday', 'tm_min', 'tm_yday'), STRUCT_TIME_FIELDS):
+            result = strptime(date_string, fmt, fields)
+            if expected is None:
+                assertNone(result)
+            else:
+                assertEqual(result,
+                            tuple(getattr(expected, k) for k in fields))
+    assertEqual(
+        strptime('2020-12-23T04:01:20.5Z', '%Y-%m-%dT%H:%M:%S.%f%Z',
+                 ('tm_sec', 'tm_usec')),
+        (20, 500000)
+    )
+
+def test_strptime_fields_invalid():
+    assertRaises(ValueError, strptime, '2020', '%Y', ('tm_usec',))
+    assertRaises(ValueError, strptime, '2020', '%Y', ('tm_zone',))
+
+###############################################################################
+# Test strptime_into()
+###############################################################################
+
+def test_strptime_into_identical_to_strptime():
+    for date_string, fmt in _MATCHES_CASES:
+        expected = strptime(date_string, fmt)
+        for x in (date_string, date_string.encode()):
+            for out in (array('i', range(10)), [None] * 9):
+                ok = strptime_into(x, fmt, out)
+                assertEqual(ok, expected is not None)
+                if ok:
+                    assertEqual(tuple(out[:len(expected)]), tuple(expected))
+
+def test_strptime_into_short_buffer():
+    assertRaises(ValueError, strptime_into, '2020-12-23', '%Y-%m-%d',
+                 array('h', bytes(14)))
+    assertRaises(ValueError, strptime_into, '2020-12-23T04:01:20.5',
+                 '%Y-%m-%dT%H:%M:%S.%f', array('i', bytes(32)))
+
+def _strptime_into_allocated_bytes(compiled, date_string, out, n):
+    # Return the ( <retained>, <peak> ) number of bytes allocated by n calls
+    # to compiled.strptime_into(), as measured by tracemalloc, or on
+    # MicroPython, return the ( <allocated>, 0 ) number of bytes by which
+    # gc.mem_free() decreased with the collector disabled.
+    compiled.strptime_into(date_string, out)
+    try:
+        import tracemalloc
+    except ImportError:
+        import gc
+        gc.collect()
+        gc.disable()
+        try:
+            before = gc.mem_free()
+            for _ in range(n):
+                compiled.strptime_into(date_string, out)
+            return before - gc.mem_free(), 0
+        finally:
+            gc.enable()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(n):
+            compiled.strptime_into(date_string, out)
+        current, peak = tracemalloc.get_traced_memory()
+        return current - before, peak - before
+    finally:
+        tracemalloc.stop()
+
+def test_strptime_into_allocates_nothing():
+    out = array('i', bytes(36))
+    for date_string, fmt in (
+            (b'2020-12-23T04:01:20+00:00', '%Y-%m-%dT%H:%M:%S%z'),
+            (b'2020-12-23T04:01:20.123456Z', '%Y-%m-%dT%H:%M:%S.%f%Z'),
+            (b'2020-12-23 04:01:20', '%Y-%m-%d %H:%M:%S'),
+        ):
+        compiled = compile(fmt)
+        retained, peak = _strptime_into_allocated_bytes(
+            compiled, date_string, out, 1)
+        assertEqual(retained, 0)
+        # CPython allocates each int beyond its small int cache, e.g. the
+        # year, which is freed before the next is allocated, so a steady
+        # state parse allocates no more at its peak than a single one.
+        assertEqual(_strptime_into_allocated_bytes(
+            compiled, date_string, out, 100), (0, peak))
+
+###############################################################################
+# Test local time with tm_gmtoff
+###############################################################################
+
+_OFFSET_CASES = (
+    ('2020-12-23T04:01:20+05:30', '%Y-%m-%dT%H:%M:%S%z'),
+    ('2020-12-31T23:59:59-05:00', '%Y-%m-%dT%H:%M:%S%z'),
+    ('2021-01-01T00:00:00.5+00:01', '%Y-%m-%dT%H:%M:%S.%f%z'),
+    ('20200301T000000+01:00', '%Y%m%dT%H%M%S%z'),
+    ('01/Mar/2020:00:00:00 +01:00', '%d/%b/%Y:%H:%M:%S %z'),
+    ('28/Feb/2021:23:00:00 -01:00', '%d/%b/%Y:%H:%M:%S %z'),
+    ('2020 366 23:00 -01:00', '%Y %j %H:%M %z'),
+)
+
+def test_strptime_local_time():
+    for date_string, fmt in _OFFSET_CASES:
+        # Parse the date and time without the offset.
+        n = len(date_string) - 6
+        local = strptime(date_string[:n].rstrip(), fmt[:-2].rstrip())
+        offset = date_string[n:]
+        gmtoff = (int(offset[1:3]) * 3600 + int(offset[4:]) * 60) * (
+            -1 if offset[0] == '-' else 1)
+        for x in (date_string, date_string.encode()):
+            result = strptime(x, fmt, utc=False)
+            assertEqual(type(result), struct_time_gmtoff)
+            assertEqual(result[:8], tuple(local)[:8])
+            assertEqual(result.tm_gmtoff, gmtoff)
+            # The UTC time is a single subtraction from the epoch seconds.
+            utc = strptime(x, fmt)
+            assertEqual(timegm(result), timegm(utc))
+            assertEqual(gmtime(timegm(result))[:8], tuple(utc)[:8])
+            assertEqual(compile(fmt, utc=False).strftime(result)[-6:], offset)
+
+def test_strftime_local_time_zone():
+    # %Z is only 'Z' for a zero offset, since a local time isn't UTC.
+    for date_string, expected in (
+            ('2020-12-23T04:01:20+00:00', '2020-12-23T04:01:20 Z'),
+            ('2020-12-23T04:01:20+05:30', '2020-12-23T04:01:20 +05:30'),
+            ('2020-12-23T04:01:20-01:00', '2020-12-23T04:01:20 -01:00'),
+        ):
+        local = strptime(date_string, '%Y-%m-%dT%H:%M:%S%z', utc=False)
+        assertEqual(strftime('%Y-%m-%dT%H:%M:%S %Z', local), expected)
+
+def test_strptime_local_time_without_date():
+    # The UTC time of a format without a date is not normalized.
+    assertEqual(strptime('23:59+05:30', '%H:%M%z'),
+                struct_time(0, 0, 0, 23, -271, 0, 0, 0))
+    assertEqual(strptime('23:59+05:30', '%H:%M%z', utc=False),
+                struct_time_gmtoff(0, 0, 0, 23, 59, 0, 0, 0, 0, 19800))
+
+def test_local_time_helpers():
+    fmt = '%d/%b/%Y:%H:%M:%S %z'
+    compiled = compile(fmt, utc=False)
+    assertEqual(compiled is compile(fmt, utc=False), True)
+    assertEqual(compiled is compile(fmt), False)
+    date_strings = [s for s, f in _OFFSET_CASES if f == fmt]
+    columns = strptime_columns(date_strings, compiled)
+    for i, date_string in enumerate(date_strings):
+        assertEqual(columns[i], compiled.strptime(date_string))
+    for format in (fmt, compiled):
+        columns = strptime_columns(date_strings, format, epoch_seconds=True)
+        assertEqual(list(columns.epoch_seconds),
+                    [timegm(strptime(s, fmt)) for s in date_strings])
+    parser = IncrementalParser(compiled)
+    for date_string in date_strings:
+        assertEqual(parser.strptime(date_string),
+                    compiled.strptime(date_string))
+    assertEqual(compiled.strptime(date_strings[0], ('tm_gmtoff',)), (3600,))
+
+###############################################################################
+# Test lazy_struct_time
+###############################################################################
+
+def test_lazy_strptime_identical_to_strptime():
+    for date_string, fmt in (
+            ('2020-12-23T04:01:20+05:00', '%Y-%m-%dT%H:%M:%S%z'),
+            # The offset carries into the next year.
+            ('2020-12-31T23:59:59-05:00', '%Y-%m-%dT%H:%M:%S%z'),
+            ('2020-12-23T04:01:20.5Z', '%Y-%m-%dT%H:%M:%S.%f%Z'),
+            ('2020-02-29 04:01', '%Y-%m-%d %H:%M'),
+            ('2021-02-29 04:01', '%Y-%m-%d %H:%M'),
+            ('2020-00-10 04:01', '%Y-%m-%d %H:%M'),
+            ('2020 366', '%Y %j'),
+            ('2020 51 Wed', '%Y %W %a'),
+            ('08:10PM', '%I:%M%p'),
+        ):
+        expected = strptime(date_string, fmt)
+        result = compile(fmt, lazy=True).strptime(date_string)
+        if expected is None:
+            assertNone(result)
+            continue
+        assertEqual(type(result), lazy_struct_time if compile(fmt).has_date
+                    else type(expected))
+        assertEqual(result, expected)
+        assertEqual(expected, result)
+        assertEqual(result != expected, False)
+        assertEqual(tuple(result), tuple(expected))
+        assertEqual(hash(result), hash(expected))
+        assertEqual(len(result), len(expected))
+        for i in range(-len(expected), len(expected)):
+            assertEqual(result[i], expected[i])
+        assertEqual(result[2:], expected[2:])
+        for k in STRUCT_TIME_FIELDS:
+            assertEqual(getattr(result, k), getattr(expected, k))
+
+def test_lazy_struct_time_defers_weekday_and_yearday():
+    result = compile('%Y-%m-%d %H:%M', lazy=True).strptime('2020-12-23 04:01')
+    year, month, day = result.tm_year, result.tm_mon, result[2]
+    assertEqual((year, month, day), (2020, 12, 23))
+    assertEqual(result._resolved, False)
+    assertEqual(result.tm_yday, 358)
+    assertEqual(result._resolved, True)
+    assertEqual(result._values, (2020, 12, 23, 4, 1, 0, 2, 358))
+
+def test_lazy_struct_time_usec():
+    assertRaises(AttributeError, getattr, lazy_struct_time(*range(8)),
+                 'tm_usec')
+    assertEqual(lazy_struct_time(*range(1, 10)).tm_usec, 9)
+    assertEqual(lazy_struct_time(2020, 12, 23, 0, 0, 0, 0, 0),
+                struct_time(2020, 12, 23, 0, 0, 0, 2, 358))
+    assertEqual(lazy_struct_time(2020, 12, 23, 0, 0, 0, 2, 358) ==
+                [2020, 12, 23, 0, 0, 0, 2, 358], False)
+
+def test_lazy_format_helpers():
+    fmt = '%Y-%m-%d %H:%M'
+    date_strings = ['2020-12-23 04:01', '2020-12-24 04:01']
+    compiled = compile(fmt, lazy=True)
+    assertEqual(compiled is compile(fmt, lazy=True), True)
+    assertEqual(compiled is compile(fmt), False)
+    columns = strptime_columns(date_strings, compiled)
+    assertEqual(list(columns.tm_wday), [2, 3])
+    assertEqual(list(columns.tm_yday), [358, 359])
+    parser = IncrementalParser(compiled)
+    for date_string in date_strings:
+        assertEqual(parser.strptime(date_string), strptime(date_string, fmt))
+    assertEqual(MultiFormatParser([compiled]).match(date_strings[0]),
+                (0, strptime(date_strings[0], fmt)))
+
+###############################################################################
+# Test strftime()
+###############################################################################
+
+# The directives that strftime() formats just like the built-in
+# time.strftime() in the C locale.
+_PORTABLE_DIRECTIVES = 'aAbBdHIjmMpSUWyY%'
+
+def test_strftime_identical_to_builtin():
+    _require(getattr(time, 'strftime', None))
+    fmt = ' '.join('%' + c for c in _PORTABLE_DIRECTIVES)
+    for seconds in range(-86400 * 365 * 30, 86400 * 365 * 60,
+                         86400 * 7 + 3607):
+        _struct_time = gmtime(seconds)
+        assertEqual(strftime(fmt, _struct_time),
+                    time.strftime(fmt, tuple(_struct_time) + (0,)))
+
+def test_strftime_day_of_week():
+    _require(getattr(time, 'strftime', None))
+    # %w is tm_wday, where Monday is 0, rather than the built-in's Sunday.
+    thursday = gmtime(0)
+    assertEqual(time.strftime('%w', tuple(thursday) + (0,)), '4')
+    assertEqual(strftime('%w', thursday), '3')
+    assertEqual(strptime('3', '%w').tm_wday, thursday.tm_wday)
+
+def test_strftime_round_trip():
+    for fmt in (
+            '%Y-%m-%dT%H:%M:%S%z',
+            '%Y%m%dT%H%M%SZ',
+            '%a, %d %b %Y %H:%M:%S %Z',
+            '%A %B %d %y %I:%M%p',
+            '%Y %j',
+            '%w %H',
+            '100%% {%Y}',
+        ):
+        # Start in 2000 since strptime() assumes that %y is 20xx.
+        for seconds in range(946684800, 946684800 + 86400 * 365 * 60,
+                             86400 * 11 + 3607):
+            _struct_time = gmtime(seconds)
+            date_string = strftime(fmt, _struct_time)
+            assertEqual(strftime(fmt, strptime(date_string, fmt)), date_string)
+
+def test_strftime_utc_zone():
+    _struct_time = gmtime(0)
+    assertEqual(strftime('%z %Z', _struct_time), '+00:00 Z')
+
+def test_strftime_year_padding():
+    for year, expected in ((1, '0001'), (999, '0999'), (12345, '12345')):
+        _struct_time = struct_time(year, 1, 1, 0, 0, 0, 0, 1)
+        assertEqual(strftime('%Y', _struct_time), expected)
+
+def test_strftime_out_of_range():
+    # The UTC time of a format without a date isn't normalized.
+    assertRaises(ValueError, strftime, '%H:%M',
+                 strptime('02:17+00:59', '%H:%M%z'))
+    valid = struct_time(2020, 12, 23, 4, 1, 20, 2, 358)
+    for fmt, index, values in (
+            ('%a', TM_WDAY_I, (-1, 7)),
+            ('%A', TM_WDAY_I, (-1, 7)),
+            ('%w', TM_WDAY_I, (-1, 7)),
+            ('%b', TM_MON_I, (-1, 0, 13)),
+            ('%B', TM_MON_I, (0, 13)),
+            ('%m', TM_MON_I, (-1, 13)),
+            ('%d', TM_MDAY_I, (-1, 32)),
+            ('%H', TM_HOUR_I, (-1, 24)),
+            ('%I', TM_HOUR_I, (-1, 24)),
+            ('%p', TM_HOUR_I, (-1, 24)),
+            ('%M', TM_MIN_I, (-1, 60)),
+            ('%S', TM_SEC_I, (-1, 62)),
+            ('%j', TM_YDAY_I, (-1, 367)),
+            ('%U', TM_YDAY_I, (-1, 367)),
+            ('%W', TM_WDAY_I, (-1, 7)),
+            ('%f', TM_USEC_I, (-1, 1000000)),
+        ):
+        for value in values:
+            _struct_time = list(valid) + [0]
+            _struct_time[index] = value
+            _struct_time = struct_time_usec(*_struct_time)
+            assertRaises(ValueError, strftime, fmt, _struct_time)
+    # Zero, as of a time-only result, and a leap second are in range.
+    assertEqual(strftime('%m %d %j %S', struct_time(0, 0, 0, 0, 0, 61, 0, 0)),
+                '00 00 000 61')
+
+def test_strftime_not_implemented():
+    for fmt in ('%c', '%x', '%X'):
+        assertRaises(NotImplementedError, strftime, fmt, gmtime(0))
+
+###############################################################################
+# Test IncrementalParser
+###############################################################################
+
+_LOG_FORMAT = '%d/%b/%Y:%H:%M:%S %z'
+
+def test_incremental_parser_identical_to_strptime():
+    parser = IncrementalParser(_LOG_FORMAT)
+    for date_string in (
+            '31/Dec/2020:23:59:58 +00:00',
+            '31/Dec/2020:23:59:59 +00:00',
+            # The offset carries into the next day.
+            '31/Dec/2020:23:59:59 -05:00',
+            '31/Dec/2020:23:59:59 -05:00',
+            '31/Dec/2020:23:59:59 +00:00',
+            '01/Jan/2021:00:00:00 +00:00',
+            '01/Jan/2021:00:00:00 +00:0',
+            '01/Jan/2021:00:00:01 +00:00',
+            '01/Jan/2021:00:00:01 +00:00 extra',
+            '31/Feb/2021:00:00:01 +00:00',
+            '28/Feb/2021:00:00:01 +00:00',
+        ):
+        for x in (date_string, date_string.encode(),
+                  bytearray(date_string.encode())):
+            assertEqual(parser.strptime(x), strptime(x, _LOG_FORMAT))
+
+def test_incremental_parser_greedy_microseconds():
+    # Each date string extends, or is extended by, the digits of the previous
+    # one, which %f must re-parse rather than reuse.
+    for fmt, date_strings in (
+            ('%H:%M:%S.%f', ('12:00:00.12', '12:00:00.123', '12:00:00.1',
+                             '12:00:00.1234567', '12:00:00.123456')),
+            ('%S.%fZ', ('00.12Z', '00.123Z', '00.1Z', '00.1x', '00.12Z')),
+        ):
+        parser = IncrementalParser(fmt)
+        for date_string in date_strings:
+            assertEqual(parser.strptime(date_string),
+                        strptime(date_string, fmt))
+
+def test_incremental_parser_reuses_date():
+    parser = IncrementalParser('%Y %j %H:%M')
+    assertEqual(parser.strptime('2020 366 23:58'),
+                strptime('2020 366 23:58', '%Y %j %H:%M'))
+    # Change the cached date fields to show that they're reused.
+    parser._date = (2020, 1, 2, 3, 4)
+    assertEqual(parser.strptime('2020 366 23:59'),
+                struct_time(2020, 1, 2, 23, 59, 0, 3, 4))
+    assertEqual(parser.strptime('2019 365 23:59'),
+                strptime('2019 365 23:59', '%Y %j %H:%M'))
+
+def test_incremental_parser_reset():
+    parser = IncrementalParser(_LOG_FORMAT)
+    date_string = '31/Dec/2020:23:59:58 +00:00'
+    result = parser.strptime(date_string)
+    assertEqual(parser.strptime(date_string) is result, True)
+    parser.reset()
+    assertEqual(parser.strptime(date_string) is result, False)
+
+###############################################################################
+# Test MultiFormatParser
+###############################################################################
+
+_MULTI_FORMATS = (
+    '%Y-%m-%dT%H:%M:%S%z',
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%d',
+    '%d/%m/%Y',
+    '%m/%d/%Y',
+    '%b %d %Y',
+    '%B %d, %Y',
+    '%a, %d %b %Y %H:%M:%S %z',
+    '%Y%m%dT%H%M%S',
+    '%H:%M:%S',
+    '%Y %j',
+    '%Y %W %a',
+)
+
+def _first_match(date_string, formats):
+    # Return the result of trying each format in turn.
+    for index, fmt in enumerate(formats):
+        result = strptime(date_string, fmt)
+        if result is not None:
+            return index, result
+    return None
+
+def test_multi_format_parser_identical_to_trying_each_format():
+    parser = MultiFormatParser(_MULTI_FORMATS)
+    for date_string in (
+            '2020-12-23T04:01:20+01:00',
+            '2020-12-23T04:01:20.1',
+            '2020-12-23T04:01:20.123456',
+            '2020-12-23T04:01:20.1234567',
+            '2020-12-23',
+            '2020-13-23',
+            '23/12/2020',
+            '12/23/2020',
+            '01/02/2020',
+            'Dec 23 2020',
+            'May 23, 2020',
+            'December 23, 2020',
+            'Wed, 23 Dec 2020 04:01:20 +01:00',
+            'Wed, 23 Dec 2020 04:01:20 +01-00',
+            '20201223T040120',
+            '04:01:20',
+            '2020 358',
+            '2020 51 Wed',
+            '',
+            'nope',
+        ):
+        for x in (date_string, date_string.encode(),
+                  memoryview(date_string.encode())):
+            assertEqual(parser.match(x), _first_match(x, _MULTI_FORMATS))
+
+def test_multi_format_parser_reports_format():
+    parser = MultiFormatParser(('%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y'))
+    assertEqual(parser.match('01/02/2020'),
+                (1, struct_time(2020, 2, 1, 0, 0, 0, 5, 32)))
+    assertEqual(parser.match('12/13/2020'),
+                (2, struct_time(2020, 12, 13, 0, 0, 0, 6, 348)))
+    assertEqual(parser.strptime('12/13/2020'),
+                struct_time(2020, 12, 13, 0, 0, 0, 6, 348))
+    assertNone(parser.match('2020/12/13'))
+    assertNone(parser.strptime('2020/12/13'))
+
+def test_multi_format_parser_candidates():
+    parser = MultiFormatParser(_MULTI_FORMATS)
+    # Formats of the same length are told apart by their literals...
+    assertEqual(parser.candidates('2020-12-23'), (2,))
+    assertEqual(parser.candidates('04:01:20'), (9,))
+    # ...and by the first chars of names.
+    assertEqual(parser.candidates('May 23 2020'), (5,))
+    assertEqual(parser.candidates('May 23, 2020'), (6,))
+    # Formats that only differ in their field order can't be.
+    assertEqual(parser.candidates('23/12/2020'), (3, 4))
+    assertEqual(parser.candidates('23/12/2020'.encode()), (3, 4))
+    assertEqual(parser.candidates('nope'), ())
+
+def test_multi_format_parser_ignore_case():
+    parser = MultiFormatParser(('%d %b %Y', '%Y-%m-%d'), ignore_case=True)
+    assertEqual(parser.match('23 dec 2020'),
+                (0, struct_time(2020, 12, 23, 0, 0, 0, 2, 358)))
+    assertNone(MultiFormatParser(('%d %b %Y',)).match('23 dec 2020'))
+
+###############################################################################
+# Test instrumentation
+###############################################################################
+
+def test_diagnose_failure():
+    for date_string, fmt, reason in (
+            ('2020/12/23', '%Y-%m-%d', FAILURES.LITERAL_MISMATCH),
+            ('2020-1x-23', '%Y-%m-%d', FAILURES.DIRECTIVE_MISMATCH),
+            ('Foo 23', '%b %d', FAILURES.DIRECTIVE_MISMATCH),
+            ('2020-13-23', '%Y-%m-%d', FAILURES.INTEGER_RANGE),
+            ('2020-12', '%Y-%m-%d', FAILURES.TRUNCATED_INPUT),
+            ('2020-12-2', '%Y-%m-%d', FAILURES.TRUNCATED_INPUT),
+            ('2020-12-23 ', '%Y-%m-%d', FAILURES.LEFTOVER_INPUT),
+            ('2021-02-29', '%Y-%m-%d', FAILURES.INVALID_MONTH_DAY),
+            ('2021 366', '%Y %j', FAILURES.INVALID_MONTH_DAY),
+            ('13:00PM', '%H:%M%p', FAILURES.HOUR_OVERFLOW),
+        ):
+        assertNone(strptime(date_string, fmt))
+        assertEqual(diagnose_failure(compile(fmt), date_string), reason)
+        assertEqual(diagnose_failure(compile(fmt), date_string.encode()),
+                    reason)
+
+def test_parse_stats():
+    fmt = '%Y-%m-%dT%H:%M:%S%z'
+    stats = enable_parse_stats()
+    try:
+        strptime('2020-12-23T04:01:20+05:00', fmt)
+        strptime('2020-12-23T04:01:20+05:00 ', fmt)
+        list(strptime_many(['2020-12-23', '2020-02-30'], '%Y-%m-%d'))
+        snapshot = stats.snapshot()
+        assertEqual(snapshot['calls'], {fmt: 2, '%Y-%m-%d': 2})
+        assertEqual(snapshot['directives'],
+                    {'Y': 4, 'm': 4, 'd': 4, 'H': 2, 'M': 2, 'S': 2, 'z': 2})
+        assertEqual(snapshot['format_failures'], {fmt: 1, '%Y-%m-%d': 1})
+        assertEqual(snapshot['failures'], {FAILURES.LEFTOVER_INPUT: 1,
+                                           FAILURES.INVALID_MONTH_DAY: 1})
+        assertEqual(snapshot['seconds'], {})
+        stats.reset()
+        assertEqual(stats.snapshot()['calls'], {})
+    finally:
+        disable_parse_stats()
+    # Nothing is recorded once disabled.
+    strptime('2020-12-23T04:01:20+05:00', fmt)
+    assertEqual(stats.snapshot()['calls'], {})
+
+def test_parse_stats_timing():
+    stats = enable_parse_stats(timing=True)
+    try:
+        strptime('2020-12-23', '%Y-%m-%d')
+    finally:
+        disable_parse_stats()
+    assertEqual(stats.snapshot()['seconds']['%Y-%m-%d'] >= 0, True)
+
+###############################################################################
+# Test the calendar cache
+###############################################################################
+
+def test_calendar_fields_identical_to_builtin():
+    _require(date)
+    for year in (1, 1900, 1970, 2000, 2020, 9999):
+        for month in range(1, 13):
+            for day in (1, 15, 28):
+                d = date(year, month, day)
+                assertEqual(
+                    calendar_fields(year, month, day),
+                    (d.weekday(), d.timetuple().tm_yday,
+                     d.toordinal() - _EPOCH_ORDINAL)
+                )
+
+def test_calendar_fields_invalid_date():
+    for year, month, day in ((2019, 2, 29), (2020, 0, 1), (2020, 13, 1),
+                             (2020, 1, 0), (2020, 4, 31)):
+        assertNone(calendar_fields(year, month, day))
+
+def test_calendar_cache_counts_hits_and_misses():
+    cache = CalendarCache(2)
+    assertEqual(cache.get(2020, 12, 23), calendar_fields(2020, 12, 23))
+    assertEqual(cache.get(2020, 12, 23), calendar_fields(2020, 12, 23))
+    assertNone(cache.get(2019, 2, 29))
+    assertNone(cache.get(2019, 2, 29))
+    assertEqual(cache.get(2020, 12, 23), calendar_fields(2020, 12, 23))
+    assertEqual((cache.hits, cache.misses), (3, 2))
+    cache.clear()
+    assertEqual((len(cache), cache.hits, cache.misses), (0, 0, 0))
+
+def test_calendar_cache_is_bounded():
+    cache = CalendarCache(2)
+    for day in range(1, 11):
+        cache.get(2020, 1, day)
+    assertEqual(len(cache), 2)
+    # Days that would produce an ambiguous key are not cached.
+    assertEqual(cache.get(2020, 1, 40), calendar_fields(2020, 1, 40))
+    assertEqual(cache.misses, 10)
+
+def test_calendar_cache_does_not_change_results():
+    fmt = '%Y-%m-%dT%H:%M:%S%z'
+    date_strings = ['2020-12-31T23:01:20-05:00', '2020-02-30T00:00:00Z',
+                    '2021-01-01T00:00:00+00:00'] * 3
+    _struct_time = struct_time(2020, 1, 31, 1, 1, 20, 4, 31)
+    time_deltas = (time_delta(tm_mday=30), time_delta(tm_mon=1, tm_min=-300))
+    expected = [strptime(s, fmt) for s in date_strings] + [
+        add_struct_time_time_delta(_struct_time, x) for x in time_deltas]
+    cache = enable_calendar_cache(4)
+    try:
+        assertEqual(
+            [strptime(s, fmt) for s in date_strings]
+            + [add_struct_time_time_delta(_struct_time, x)
+               for x in time_deltas],
+            expected
+        )
+    finally:
+        disable_calendar_cache()
+    assertEqual(cache.hits > 0 and cache.misses > 0, True)
+
+
+###############################################################################
+# Test time zones
+###############################################################################
+
+_NEW_YORK = 'EST5EDT,M3.2.0,M11.1.0'
+
+def _local_seconds(*fields):
+    # Return the local seconds from the epoch of the year, month, day, hour,
+    # minute and second.
+    return timegm(struct_time(*(fields + (0,) * (8 - len(fields)))))
+
+def test_parse_posix_tz():
+    for tz_string, expected in (
+            ('UTC0', ('UTC', 0, None, None, None, None)),
+            ('<+0330>-3:30', ('+0330', 12600, None, None, None, None)),
+            ('EST5EDT', ('EST', -18000, 'EDT', -14400, ('M', 3, 2, 0, 7200),
+                         ('M', 11, 1, 0, 7200))),
+            ('CET-1CEST,M3.5.0,M10.5.0/3',
+             ('CET', 3600, 'CEST', 7200, ('M', 3, 5, 0, 7200),
+              ('M', 10, 5, 0, 10800))),
+            ('IST-2IDT,M3.4.4/26,M10.5.0',
+             ('IST', 7200, 'IDT', 10800, ('M', 3, 4, 4, 93600),
+              ('M', 10, 5, 0, 7200))),
+            ('<-02>2<-01>,M3.5.0/-1,M10.5.0/0',
+             ('-02', -7200, '-01', -3600, ('M', 3, 5, 0, -3600),
+              ('M', 10, 5, 0, 0))),
+            ('AAA3BBB2:30,J60,300/1:02:03',
+             ('AAA', -10800, 'BBB', -9000, ('J', 60, 0, 0, 7200),
+              ('N', 300, 0, 0, 3723))),
+        ):
+        assertEqual(parse_posix_tz(tz_string), expected)
+    for tz_string in ('', 'E5', 'EST', 'EST5EDT,M13.1.0,M11.1.0',
+                      'EST5EDT,M3.2.0', 'EST5EDT,M3.2.0,M11.1.0x',
+                      'EST5EDT,J0,J365', '<EST5'):
+        assertRaises(ValueError, parse_posix_tz, tz_string)
+
+def test_posix_tz_rule_time():
+    for rule, year, expected in (
+            # The second Sunday of March.
+            (('M', 3, 2, 0, 7200), 2021, _local_seconds(2021, 3, 14, 2)),
+            # The last Sunday of October, when October has 5 Sundays.
+            (('M', 10, 5, 0, 3600), 2021, _local_seconds(2021, 10, 31, 1)),
+            # The last Saturday of February of a leap year.
+            (('M', 2, 5, 6, 0), 2020, _local_seconds(2020, 2, 29)),
+            # J60 is March 1 even in a leap year, unlike 59.
+            (('J', 60, 0, 0, 0), 2020, _local_seconds(2020, 3, 1)),
+            (('J', 60, 0, 0, 0), 2021, _local_seconds(2021, 3, 1)),
+            (('N', 59, 0, 0, 0), 2020, _local_seconds(2020, 2, 29)),
+            (('N', 59, 0, 0, -60), 2021, _local_seconds(2021, 2, 28, 23, 59)),
+        ):
+        assertEqual(posix_tz_rule_time(rule, year), expected)
+
+def test_posix_tz_offsets():
+    tz = load_posix_tz(_NEW_YORK)
+    start = _local_seconds(2021, 3, 14, 7)
+    end = _local_seconds(2021, 11, 7, 6)
+    for seconds, utoff, abbr in (
+            (start - 1, -18000, 'EST'),
+            (start, -14400, 'EDT'),
+            (end - 1, -14400, 'EDT'),
+            (end, -18000, 'EST'),
+        ):
+        assertEqual(tz.utcoffset(seconds), utoff)
+        assertEqual(tz.tzname(seconds), abbr)
+    tz = load_posix_tz('AEST-10AEDT,M10.1.0,M4.1.0/3')
+    assertEqual(tz.utcoffset(_local_seconds(2021, 1, 1)), 39600)
+    assertEqual(tz.utcoffset(_local_seconds(2021, 7, 1)), 36000)
+    assertEqual(load_posix_tz('UTC0').utcoffset(0), 0)
+
+def test_time_zone_utc_seconds_fold_and_gap():
+    tz = load_posix_tz(_NEW_YORK)
+    for local, fold, expected in (
+            # 01:30 occurs twice when the clock is set back from 02:00 EDT.
+            (_local_seconds(2021, 11, 7, 1, 30), 0,
+             _local_seconds(2021, 11, 7, 5, 30)),
+            (_local_seconds(2021, 11, 7, 1, 30), 1,
+             _local_seconds(2021, 11, 7, 6, 30)),
+            # 02:30 is skipped when the clock is set forward from 02:00 EST.
+            (_local_seconds(2021, 3, 14, 2, 30), 0,
+             _local_seconds(2021, 3, 14, 7, 30)),
+            (_local_seconds(2021, 3, 14, 2, 30), 1,
+             _local_seconds(2021, 3, 14, 6, 30)),
+            (_local_seconds(2021, 7, 1, 12), 1,
+             _local_seconds(2021, 7, 1, 16)),
+        ):
+        assertEqual(tz.utc_seconds(local, fold), expected)
+        assertEqual(tz.utc_seconds(gmtime(local), fold), expected)
+
+def test_time_zone_localtime_of_parsed():
+    tz = load_posix_tz(_NEW_YORK)
+    utc = strptime('2021-07-01T12:00:00.5Z', '%Y-%m-%dT%H:%M:%S.%f%Z')
+    local = struct_time_gmtoff(2021, 7, 1, 8, 0, 0, 3, 182, 500000, -14400)
+    assertEqual(tz.localtime(utc), local)
+    assertEqual(tz.localtime(timegm(utc)), local[:8] + (0, -14400))
+    # A local time at another offset is first converted to UTC.
+    assertEqual(
+        tz.localtime(strptime('2021-07-01T14:00:00+02:00',
+                              '%Y-%m-%dT%H:%M:%S%z', utc=False)),
+        local[:8] + (0, -14400)
+    )
+    wall = strptime('2021-07-01 08:00:00.5', '%Y-%m-%d %H:%M:%S.%f')
+    assertEqual(tz.localize(wall), local)
+    # A skipped local time is shifted by the transition.
+    assertEqual(tz.localize(struct_time(2021, 3, 14, 2, 30, 0, 0, 0)),
+                struct_time_gmtoff(2021, 3, 14, 3, 30, 0, 6, 73, 0, -14400))
+
+def test_time_zone_reuses_last_interval():
+    tz = load_posix_tz(_NEW_YORK)
+    seconds = _local_seconds(2021, 7, 1)
+    tz.utcoffset(seconds)
+    start, end, ttinfo = tz._last
+    assertEqual(start <= seconds < end, True)
+    # Change the cached local time type to show that it's reused.
+    tz._last = (start, end, (0, 0, 'X'))
+    assertEqual(tz.tzname(seconds + 1), 'X')
+    assertEqual(tz.tzname(end), 'EST')
+
+def _tzif(version, time_format, transitions, types, ttinfos, chars,
+          footer=b''):
+    # Return the bytes of a TZif file whose header is followed by the data in
+    # the specified time format, and if version is nonzero, by an empty
+    # 32-bit data block and the footer.
+    header = lambda timecnt, typecnt, charcnt: (
+        b'TZif' + bytes((version,)) + bytes(15)
+        + struct.pack('>6l', 0, 0, 0, timecnt, typecnt, charcnt))
+    data = (
+        header(len(transitions), len(ttinfos), len(chars))
+        + struct.pack('>{}{}'.format(len(transitions), time_format),
+                      *transitions)
+        + bytes(types)
+        + b''.join(struct.pack('>lBB', *ttinfo) for ttinfo in ttinfos)
+        + chars
+    )
+    if version == 0:
+        return data
+    return (header(0, 1, 1) + struct.pack('>lBB', 0, 0, 0) + b'\x00' + data
+            + b'\n' + footer + b'\n')
+
+def test_parse_tzif():
+    ttinfos = ((0, 0, 0), (3600, 1, 4))
+    chars = b'AAA\x00BBB\x00'
+    for data in (
+            _tzif(0, 'l', (1000, 2000), (1, 0), ttinfos, chars),
+            _tzif(ord('2'), 'q', (1000, 2000), (1, 0), ttinfos, chars,
+                  b'AAA0BBB-1,M3.2.0,M11.1.0'),
+        ):
+        tz = parse_tzif(data, 'Test')
+        assertEqual(repr(tz), "TimeZone('Test')")
+        for seconds, utoff, abbr in (
+                (-10 ** 10, 0, 'AAA'),
+                (999, 0, 'AAA'),
+                (1000, 3600, 'BBB'),
+                (1999, 3600, 'BBB'),
+                (2000, 0, 'AAA'),
+            ):
+            assertEqual(tz.utcoffset(seconds), utoff)
+            assertEqual(tz.tzname(seconds), abbr)
+        # Only the version 2 file has a footer rule for later times.
+        assertEqual(tz.tzname(_local_seconds(2021, 7, 1)),
+                    'AAA' if tz.rule is None else 'BBB')
+    assertRaises(ValueError, parse_tzif, b'nope')
+    assertRaises(ValueError, parse_tzif,
+                 _tzif(0, 'l', (1000,), (2,), ttinfos, chars))
+
+def test_load_zone_identical_to_zoneinfo():
+    _require(datetime)
+    try:
+        from zoneinfo import ZoneInfo
+        tz = load_zone('America/New_York')
+    except (ImportError, ValueError):
+        raise Skip
+    assertRaises(ValueError, load_zone, '../zoneinfo/UTC')
+    assertRaises(ValueError, load_zone, 'Nowhere/Nothing')
+    epoch = datetime(1970, 1, 1)
+    for key in ('America/New_York', 'Europe/London', 'Australia/Lord_Howe',
+                'Asia/Kolkata', 'America/Sao_Paulo', 'Pacific/Chatham'):
+        tz = load_zone(key)
+        zone = ZoneInfo(key)
+        for year in (1900, 1970, 2000, 2021, 2037, 2038, 2100):
+            for month in range(1, 13):
+                utc = datetime(year, month, 1, 12)
+                seconds = _local_seconds(year, month, 1, 12)
+                local = utc.replace(tzinfo=timezone.utc).astimezone(zone)
+                assertEqual(tz.utcoffset(seconds),
+                            int(local.utcoffset().total_seconds()))
+                assertEqual(tz.tzname(seconds), local.tzname())
+                wall = local.replace(tzinfo=None)
+                for fold in (0, 1):
+                    assertEqual(
+                        tz.utc_seconds(
+                            int((wall - epoch).total_seconds()), fold),
+                        int(wall.replace(tzinfo=zone, fold=fold).timestamp())
+                    )
+
+###############################################################################
+# Test strptime_many()
+###############################################################################
+
+_MANY_DATE_STRINGS = ('2020-12-23', '2020-02-30', '2021-01-01', 'nope')
+
+def test_strptime_many_errors_none():
+    assertEqual(
+        list(strptime_many(_MANY_DATE_STRINGS, '%Y-%m-%d')),
+        [strptime(s, '%Y-%m-%d') for s in _MANY_DATE_STRINGS]
+    )
+
+def test_strptime_many_errors_skip():
+    assertEqual(
+        list(strptime_many(_MANY_DATE_STRINGS, '%Y-%m-%d', ERRORS.SKIP)),
+        [
+            struct_time(2020, 12, 23, 0, 0, 0, 2, 358),
+            struct_time(2021, 1, 1, 0, 0, 0, 4, 1),
+        ]
+    )
+
+def test_strptime_many_errors_raise():
+    results = strptime_many(_MANY_DATE_STRINGS, '%Y-%m-%d', ERRORS.RAISE)
+    assertEqual(next(results), struct_time(2020, 12, 23, 0, 0, 0, 2, 358))
+    assertRaises(ValueError, next, results)
+
+def test_strptime_many_is_lazy():
+    def date_strings():
+        yield '2020-12-23'
+        raise AssertionError('consumed too eagerly')
+    results = strptime_many(date_strings(), compile('%Y-%m-%d'))
+    assertEqual(next(results), struct_time(2020, 12, 23, 0, 0, 0, 2, 358))
+
+def test_strptime_many_invalid_errors():
+    assertRaises(ValueError, strptime_many, [], '%Y', 'ignore')
+
+
+###############################################################################
+# Test strptime_columns()
+###############################################################################
+
+def test_strptime_columns():
+    columns = strptime_columns(_MANY_DATE_STRINGS, '%Y-%m-%d')
+    assertEqual(len(columns), 4)
+    assertEqual(list(columns.tm_year), [2020, 0, 2021, 0])
+    assertEqual(list(columns.tm_wday), [2, 0, 4, 0])
+    assertEqual([columns.is_valid(i) for i in range(4)],
+                [True, False, True, False])
+    assertEqual(
+        [columns[i] for i in range(4)],
+        [strptime(s, '%Y-%m-%d') for s in _MANY_DATE_STRINGS]
+    )
+
+def test_strptime_columns_epoch_seconds():
+    date_strings = ('2020-12-23T04:01:20+05:00', 'nope',
+                    '1969-12-31T23:59:59Z')
+    columns = strptime_columns(
+        date_strings, '%Y-%m-%dT%H:%M:%S%z', epoch_seconds=True)
+    assertEqual(columns.columns, ())
+    assertEqual(columns.epoch_seconds[0], 1608678080)
+    assertEqual(columns[0], strptime(date_strings[0], '%Y-%m-%dT%H:%M:%S%z'))
+    assertNone(columns[1])
+    # The last string doesn't match the format's %z.
+    assertNone(columns[2])
+
+def test_strptime_columns_appends_until_full():
+    columns = StructTimeColumns(3)
+    strptime_columns(['2020-01-01', '2020-01-02'], '%Y-%m-%d', columns)
+    strptime_columns(['2020-01-03', '2020-01-04'], '%Y-%m-%d', columns)
+    assertEqual(len(columns), 3)
+    assertEqual(list(columns.tm_mday), [1, 2, 3])
+    columns.clear()
+    assertEqual(len(columns), 0)
+    assertEqual(columns.valid, bytearray(1))
+
+def test_strptime_columns_epoch_seconds_requires_date():
+    assertRaises(ValueError, strptime_columns, ['01:00'], '%H:%M', None, True)
+
+def test_strptime_columns_microseconds():
+    fmt = '%Y-%m-%dT%H:%M:%S.%f%z'
+    date_strings = ['2020-12-23T04:01:20.123456+05:00', 'nope',
+                    '2020-12-23T04:01:20.5Z']
+    for epoch_seconds in (False, True):
+        columns = strptime_columns(date_strings, fmt,
+                                   epoch_seconds=epoch_seconds)
+        assertEqual(list(columns.tm_usec), [123456, 0, 0])
+        assertEqual(columns[0], strptime(date_strings[0], fmt))
+        assertNone(columns[1])
+        assertNone(columns[2])
+
+def test_strptime_columns_validity_bitmap_spans_bytes():
+    date_strings = ['2020-01-{:02}'.format(i) for i in range(1, 21)]
+    date_strings[9] = 'nope'
+    columns = strptime_columns(date_strings, '%Y-%m-%d')
+    assertEqual(columns.valid, bytearray((0xff, 0xfd, 0x0f)))
+
+
 if __name__ == '__main__':
     cli(globals())
@@ -0,0 +1,480 @@
+"""
+Time zones, from POSIX TZ strings and compiled TZif files, for the struct_time
+values of this package. This is a separate module so that the core strptime()
+and strftime() don't pay for it unless time zones are used.
+"""
+
+import struct
+from array import array
+
+try:
+    from . import (
+        DIGIT_VALUES,
+        SECONDS_PER_DAY,
+        TM_HOUR_I,
+        TM_MDAY_I,
+        TM_MIN_I,
+        TM_MON_I,
+        TM_SEC_I,
+        TM_USEC_I,
+        TM_YEAR_I,
+        civil_from_days,
+        days_from_civil,
+        days_in_month,
+        gmtime,
+        is_leap_year,
+        struct_time_gmtoff,
+        timegm,
+    )
+except ImportError:
+    # Support importing this module from the package directory, as the tests
+    # and benchmarks do.
+    from __init__ import (
+        DIGIT_VALUES,
+        SECONDS_PER_DAY,
+        TM_HOUR_I,
+        TM_MDAY_I,
+        TM_MIN_I,
+        TM_MON_I,
+        TM_SEC_I,
+        TM_USEC_I,
+        TM_YEAR_I,
+        civil_from_days,
+        days_from_civil,
+        days_in_month,
+        gmtime,
+        is_leap_year,
+        struct_time_gmtoff,
+        timegm,
+    )
+
+###############################################################################
+# Time Zones
+###############################################################################
+
+
+# The directories in which load_zone() looks for compiled TZif files.
+ZONEINFO_DIRS = ('/usr/share/zoneinfo', '/usr/lib/zoneinfo',
+                 '/usr/share/lib/zoneinfo', '/etc/zoneinfo')
+
+# The bounds of the interval before the first and after the last transition.
+MIN_TRANSITION_TIME = -(1 << 63)
+MAX_TRANSITION_TIME = 1 << 63
+
+# The default local time of day at which a POSIX TZ string rule takes effect.
+POSIX_TZ_DEFAULT_RULE_TIME = 7200
+
+# The rules of a POSIX TZ string that has a DST name but no rules, which are
+# those of the US.
+POSIX_TZ_DEFAULT_RULES = ',M3.2.0,M11.1.0'
+
+def parse_posix_tz_number(s, i, max_len):
+    # Attempt to parse an unsigned integer of 1 to max_len digits at offset i
+    # and return a tuple in the format: ( <number>, <offset> ), or return
+    # False if no match is found.
+    end = min(len(s), i + max_len)
+    num = 0
+    j = i
+    while j < end:
+        digit = DIGIT_VALUES.get(s[j])
+        if digit is None:
+            break
+        num = num * 10 + digit
+        j += 1
+    if j == i:
+        return False
+    return num, j
+
+def parse_posix_tz_name(s, i):
+    # Attempt to parse a time zone abbreviation of at least 3 letters, or of
+    # any chars within <>, at offset i and return a tuple in the format:
+    # ( <name>, <offset> ), or return False if no match is found.
+    if i < len(s) and s[i] == '<':
+        j = s.find('>', i)
+        if j < 0:
+            return False
+        return s[i + 1:j], j + 1
+    j = i
+    while j < len(s) and s[j].isalpha():
+        j += 1
+    if j - i < 3:
+        return False
+    return s[i:j], j
+
+def parse_posix_tz_time(s, i):
+    # Attempt to parse a signed time in the format [+|-]hh[:mm[:ss]] at offset
+    # i, where hh may be up to 167 as RFC 8536 allows, and return a tuple in
+    # the format: ( <seconds>, <offset> ), or return False if no match is
+    # found.
+    sign = 1
+    if i < len(s) and s[i] in '+-':
+        if s[i] == '-':
+            sign = -1
+        i += 1
+    result = parse_posix_tz_number(s, i, 3)
+    if result is False:
+        return False
+    seconds, i = result
+    seconds *= 3600
+    for multiplier in (60, 1):
+        if i >= len(s) or s[i] != ':':
+            break
+        result = parse_posix_tz_number(s, i + 1, 2)
+        if result is False:
+            return False
+        seconds += result[0] * multiplier
+        i = result[1]
+    return sign * seconds, i
+
+def parse_posix_tz_rule(s, i):
+    # Attempt to parse a rule in the format Jn, n or Mm.w.d, followed by an
+    # optional /time, at offset i and return a tuple in the format:
+    # ( ( <kind>, <n-or-m>, <w>, <d>, <time> ), <offset> ) where <kind> is
+    # 'J', 'N' or 'M' and <time> is in seconds, or return False if no match
+    # is found.
+    if i >= len(s):
+        return False
+    kind = s[i]
+    if kind == 'M':
+        fields = []
+        for max_len in (2, 1, 1):
+            result = parse_posix_tz_number(s, i + 1, max_len)
+            if result is False:
+                return False
+            fields.append(result[0])
+            i = result[1]
+            if len(fields) < 3 and (i >= len(s) or s[i] != '.'):
+                return False
+        month, week, weekday = fields
+        if not (1 <= month <= 12 and 1 <= week <= 5 and weekday <= 6):
+            return False
+    else:
+        if kind == 'J':
+            i += 1
+        else:
+            kind = 'N'
+        result = parse_posix_tz_number(s, i, 3)
+        if result is False:
+            return False
+        month, i = result
+        week = weekday = 0
+        if month > 365 or (kind == 'J' and month == 0):
+            return False
+    time = POSIX_TZ_DEFAULT_RULE_TIME
+    if i < len(s) and s[i] == '/':
+        result = parse_posix_tz_time(s, i + 1)
+        if result is False:
+            return False
+        time, i = result
+    return (kind, month, week, weekday, time), i
+
+def parse_posix_tz(tz_string):
+    """Parse a POSIX TZ string, e.g. 'EST5EDT,M3.2.0,M11.1.0', and return a
+    tuple in the format: ( <std-abbr>, <std-utoff>, <dst-abbr>, <dst-utoff>,
+    <dst-start-rule>, <dst-end-rule> ) where each <utoff> is in seconds east
+    of UTC, unlike in the string, and the DST items are None if there's no
+    DST, or raise a ValueError if tz_string is invalid.
+    """
+    error = ValueError('invalid POSIX TZ string: {}'.format(repr(tz_string)))
+    result = parse_posix_tz_name(tz_string, 0)
+    if result is False:
+        raise error
+    std_abbr, i = result
+    result = parse_posix_tz_time(tz_string, i)
+    if result is False:
+        raise error
+    std_utoff, i = -result[0], result[1]
+    if i == len(tz_string):
+        return std_abbr, std_utoff, None, None, None, None
+    result = parse_posix_tz_name(tz_string, i)
+    if result is False:
+        raise error
+    dst_abbr, i = result
+    # The DST offset defaults to one hour ahead of standard time.
+    dst_utoff = std_utoff + 3600
+    if i < len(tz_string) and tz_string[i] != ',':
+        result = parse_posix_tz_time(tz_string, i)
+        if result is False:
+            raise error
+        dst_utoff, i = -result[0], result[1]
+    rules = tz_string[i:] if i < len(tz_string) else POSIX_TZ_DEFAULT_RULES
+    result = rules[:1] == ',' and parse_posix_tz_rule(rules, 1)
+    if result is False:
+        raise error
+    start_rule, i = result
+    result = rules[i:i + 1] == ',' and parse_posix_tz_rule(rules, i + 1)
+    if result is False or result[1] != len(rules):
+        raise error
+    end_rule = result[0]
+    return std_abbr, std_utoff, dst_abbr, dst_utoff, start_rule, end_rule
+
+def posix_tz_rule_time(rule, year):
+    """Return the local time, as seconds from the epoch, at which the
+    parse_posix_tz_rule() rule takes effect in the specified year.
+    """
+    kind, month, week, weekday, time = rule
+    if kind == 'M':
+        # Find the first day of month that falls on the POSIX weekday, for
+        # which 0 is Sunday, then advance by weeks, where week 5 is the last.
+        # The epoch fell on a Thursday.
+        days = days_from_civil(year, month, 1)
+        day = (weekday - days - 4) % 7 + (week - 1) * 7
+        last_day = days_in_month(year, month) - 1
+        while day > last_day:
+            day -= 7
+        days += day
+    else:
+        days = days_from_civil(year, 1, 1) + month
+        if kind == 'J':
+            # Jn counts from 1 and never counts February 29.
+            days -= 1
+            if month >= 60 and is_leap_year(year):
+                days += 1
+    return days * SECONDS_PER_DAY + time
+
+def bisect_right(a, x):
+    """Return the number of items in the sorted sequence a that are less than
+    or equal to x.
+    """
+    lo = 0
+    hi = len(a)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if x < a[mid]:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+class TimeZone:
+    """A time zone, as a sorted array of the UTC times, in seconds from the
+    epoch, of its transitions, the bytes of the index of the local time type
+    that takes effect at each, and the tuple of ( <utoff>, <isdst>, <abbr> )
+    local time types, where <utoff> is in seconds east of UTC, along with the
+    parse_posix_tz() rule, if any, for times after the last transition.
+    Times before the first transition are in the first local time type.
+    """
+    def __init__(self, transitions, types, ttinfos, rule=None, name=None):
+        self.transitions = transitions
+        self.types = types
+        self.ttinfos = ttinfos
+        self.rule = rule
+        self.name = name
+        if rule is not None:
+            std_abbr, std_utoff, dst_abbr, dst_utoff, _, _ = rule
+            self._rule_ttinfos = ((std_utoff, 0, std_abbr),
+                                  (dst_utoff, 1, dst_abbr))
+        # The ( <start>, <end>, <ttinfo> ) interval of the last lookup.
+        self._last = None
+
+    def __repr__(self):
+        return 'TimeZone({})'.format(repr(self.name))
+
+    def _rule_interval(self, seconds):
+        # Return the ( <start>, <end>, <ttinfo> ) interval of the rule that
+        # contains the UTC seconds.
+        std_ttinfo, dst_ttinfo = self._rule_ttinfos
+        _, std_utoff, dst_abbr, dst_utoff, start_rule, end_rule = self.rule
+        if dst_abbr is None:
+            return MIN_TRANSITION_TIME, MAX_TRANSITION_TIME, std_ttinfo
+        # Get the UTC times of the transitions of the year, each of which is
+        # in the local time that precedes it, and those of the neighbouring
+        # year only if the seconds fall outside them.
+        transitions = lambda year: sorted((
+            (posix_tz_rule_time(start_rule, year) - std_utoff, dst_ttinfo),
+            (posix_tz_rule_time(end_rule, year) - dst_utoff, std_ttinfo),
+        ))
+        year = civil_from_days(seconds // SECONDS_PER_DAY)[0]
+        times = transitions(year)
+        if times[0][0] <= seconds < times[1][0]:
+            return times[0][0], times[1][0], times[0][1]
+        if seconds < times[0][0]:
+            times = transitions(year - 1) + times
+        else:
+            times += transitions(year + 1)
+        k = 0
+        while k < 3 and times[k + 1][0] <= seconds:
+            k += 1
+        end = times[k + 1][0] if k < 3 else MAX_TRANSITION_TIME
+        return times[k][0], end, times[k][1]
+
+    def _lookup(self, seconds):
+        # Return the ( <utoff>, <isdst>, <abbr> ) local time type in effect at
+        # the UTC seconds.
+        last = self._last
+        if last is not None and last[0] <= seconds < last[1]:
+            return last[2]
+        transitions = self.transitions
+        n = len(transitions)
+        k = bisect_right(transitions, seconds)
+        if k == n and self.rule is not None:
+            start, end, ttinfo = self._rule_interval(seconds)
+            if n and start < transitions[-1]:
+                start = transitions[-1]
+        elif k == 0:
+            start, end = MIN_TRANSITION_TIME, \
+                transitions[0] if n else MAX_TRANSITION_TIME
+            ttinfo = self.ttinfos[0]
+        else:
+            start = transitions[k - 1]
+            end = transitions[k] if k < n else MAX_TRANSITION_TIME
+            ttinfo = self.ttinfos[self.types[k - 1]]
+        self._last = (start, end, ttinfo)
+        return ttinfo
+
+    def utcoffset(self, seconds):
+        """Return the offset, in seconds east of UTC, of local time from UTC
+        at the specified UTC seconds from the epoch.
+        """
+        return self._lookup(seconds)[0]
+
+    def tzname(self, seconds):
+        """Return the abbreviation of the local time, e.g. 'EST', at the
+        specified UTC seconds from the epoch.
+        """
+        return self._lookup(seconds)[2]
+
+    def _localtime(self, seconds, usec):
+        # Return the struct_time_gmtoff for the UTC seconds and microseconds.
+        offset = self._lookup(seconds)[0]
+        return struct_time_gmtoff(
+            *(tuple(gmtime(seconds + offset)) + (usec, offset)))
+
+    def localtime(self, utc):
+        """Return the local time as a struct_time_gmtoff for utc, either an
+        int of UTC seconds from the epoch or a parsed struct_time,
+        struct_time_usec or struct_time_gmtoff, whose microseconds are kept.
+        """
+        if isinstance(utc, int):
+            return self._localtime(utc, 0)
+        return self._localtime(
+            timegm(utc), utc[TM_USEC_I] if len(utc) > TM_USEC_I else 0)
+
+    def utc_seconds(self, local, fold=0):
+        """Return the UTC seconds from the epoch for local, either local
+        seconds from the epoch or a struct_time of the local wall time, whose
+        tm_gmtoff, if any, is ignored.
+        As in PEP 495, fold selects the earlier (0) or later (1) of the two
+        times at which an ambiguous local time occurs when the clock is set
+        back, and for a local time that's skipped when the clock is set
+        forward, whether the offset before (0) or after (1) the transition
+        applies. Transitions are assumed to be at least 2 days apart.
+        """
+        if not isinstance(local, int):
+            local = (
+                days_from_civil(local[TM_YEAR_I], local[TM_MON_I],
+                                local[TM_MDAY_I]) * SECONDS_PER_DAY
+                + local[TM_HOUR_I] * 3600 + local[TM_MIN_I] * 60
+                + local[TM_SEC_I]
+            )
+        # Get the offsets in effect well before and after the local time,
+        # which are equal unless a transition is near.
+        before = self.utcoffset(local - 2 * SECONDS_PER_DAY)
+        after = self.utcoffset(local + 2 * SECONDS_PER_DAY)
+        if before == after:
+            return local - before
+        is_before = self.utcoffset(local - before) == before
+        is_after = self.utcoffset(local - after) == after
+        if is_before and is_after:
+            # The local time is ambiguous.
+            return local - (before if fold == 0 else after)
+        if is_before:
+            return local - before
+        if is_after:
+            return local - after
+        # The local time was skipped.
+        return local - (before if fold == 0 else after)
+
+    def localize(self, local, fold=0):
+        """Return the struct_time_gmtoff for the struct_time of the local wall
+        time, where, as for utc_seconds(), fold disambiguates a repeated or
+        skipped time, the latter of which is shifted by the transition.
+        """
+        return self._localtime(
+            self.utc_seconds(local, fold),
+            local[TM_USEC_I] if len(local) > TM_USEC_I else 0)
+
+# The offsets of the version and the counts within a TZif header, the format
+# of the ( <isutcnt>, <isstdcnt>, <leapcnt>, <timecnt>, <typecnt>,
+# <charcnt> ) counts, and the size of the header.
+TZIF_VERSION_OFFSET = 4
+TZIF_COUNTS_OFFSET = 20
+TZIF_COUNTS_FORMAT = '>6l'
+TZIF_HEADER_SIZE = 44
+
+def parse_tzif(data, name=None):
+    """Return the TimeZone of the compiled TZif file data, as described by RFC
+    8536, using its 64-bit data if it has any and its footer rule, or raise a
+    ValueError if it's invalid. Leap second records are skipped.
+    """
+    if data[:4] != b'TZif':
+        raise ValueError('not a TZif file: {}'.format(repr(name)))
+    i = 0
+    time_size = 4
+    while True:
+        version = data[i + TZIF_VERSION_OFFSET]
+        isutcnt, isstdcnt, leapcnt, timecnt, typecnt, charcnt = \
+            struct.unpack_from(TZIF_COUNTS_FORMAT, data,
+                               i + TZIF_COUNTS_OFFSET)
+        i += TZIF_HEADER_SIZE
+        if time_size == 8 or version == 0:
+            break
+        # Skip the 32-bit data to the 64-bit version of the header and data.
+        i += (timecnt * 5 + typecnt * 6 + charcnt + leapcnt * 8 + isstdcnt
+              + isutcnt)
+        time_size = 8
+    transitions = array('q')
+    if timecnt:
+        transitions = array('q', struct.unpack_from(
+            '>{}{}'.format(timecnt, 'q' if time_size == 8 else 'l'), data, i))
+        i += timecnt * time_size
+    types = bytes(data[i:i + timecnt])
+    i += timecnt
+    if any(k >= typecnt for k in types):
+        raise ValueError('invalid TZif local time type: {}'.format(
+            repr(name)))
+    ttinfos = []
+    abbrs = data[i + typecnt * 6:i + typecnt * 6 + charcnt]
+    for _ in range(typecnt):
+        utoff, isdst, abbrind = struct.unpack_from('>lBB', data, i)
+        i += 6
+        end = abbrs.find(b'\x00', abbrind)
+        ttinfos.append((utoff, isdst, bytes(abbrs[abbrind:end]).decode()))
+    i += charcnt + leapcnt * (time_size + 4) + isstdcnt + isutcnt
+    rule = None
+    if time_size == 8:
+        # Parse the footer's POSIX TZ string, which may be empty.
+        end = data.find(b'\n', i + 1)
+        if data[i:i + 1] == b'\n' and end > i + 1:
+            rule = parse_posix_tz(bytes(data[i + 1:end]).decode())
+    return TimeZone(transitions, types, tuple(ttinfos), rule, name)
+
+###############################################################################
+# API
+###############################################################################
+
+def load_posix_tz(tz_string):
+    """Return the TimeZone of the POSIX TZ string, e.g.
+    'CET-1CEST,M3.5.0,M10.5.0/3'.
+    """
+    return TimeZone(array('q'), b'', (), parse_posix_tz(tz_string), tz_string)
+
+def load_tzif(path, name=None):
+    """Return the TimeZone of the compiled TZif file at the specified path.
+    """
+    with open(path, 'rb') as f:
+        return parse_tzif(f.read(), name or path)
+
+def load_zone(key, dirs=ZONEINFO_DIRS):
+    """Return the TimeZone of the IANA time zone key, e.g. 'Europe/Berlin',
+    loaded from the first of dirs that has its TZif file, or raise a
+    ValueError if none does.
+    """
+    if key.startswith('/') or '..' in key.split('/'):
+        raise ValueError('invalid time zone key: {}'.format(repr(key)))
+    for directory in dirs:
+        try:
+            return load_tzif('{}/{}'.format(directory, key), key)
+        except OSError:
+            pass
+    raise ValueError('time zone not found: {}'.format(repr(key)))